@@ -0,0 +1,134 @@
+"""Peak RSS of the cleaner -> html_extractor path on one large page.
+
+Usage: python benchmarks/artifact_memory_benchmark.py [--size-mb 50] [--page FILE]
+
+Compares the old whole-file I/O (read the page into a string, return
+cleaned_html / extracted_text in the JSON response) with the artifact path
+the tools now take by default (chunked parse, streamed writes, handles in
+the response) and with inline=True. Every stage runs in a fresh process so
+each peak RSS is that stage's own; the last row extracts straight from the
+scraped page, skipping the cleaner.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tools"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from cleaner_benchmark import peak_rss_mb  # noqa: E402
+
+URL = "https://www.regulator.example/news"
+
+
+def write_large_page(path: Path, size_mb: int) -> None:
+    # Written section by section so the generator itself stays small
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html><html><head><title>Regulator</title><style>p{color:red}</style></head>")
+        f.write("<body><header><nav>Home</nav></header><main>")
+        i = 0
+        while f.tell() < target:
+            f.write(
+                f"<section><h2>Update {i}</h2><div class='item'><div><p>Notice {i} on capital requirements, "
+                f"effective {2020 + i % 6}-0{1 + i % 9}-15. <a href='/n/{i}'>Read notice {i}</a></p>"
+                f"<span></span><div> </div></div></div><aside>related</aside><script>track({i})</script></section>"
+            )
+            i += 1
+        f.write("</main><footer>Footer</footer></body></html>")
+
+
+def legacy_stage(stage: str, source: Path) -> dict:
+    # What the tools did before: whole-file reads and full payloads in every response
+    from shared.html_engine import clean_html, extract_content
+
+    if stage == "cleaner":
+        cleaned_html = clean_html(source.read_text(encoding="utf-8").strip())
+        cleaned_file = Path("legacy_cleaned.html")
+        cleaned_file.write_text(cleaned_html, encoding="utf-8")
+        response = {"url": URL, "cleaned_html": cleaned_html, "cleaned_file": str(cleaned_file)}
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            html = f.read()
+        extraction = extract_content(html, URL)
+        response = {
+            "url": URL,
+            "extracted_text": extraction.text,
+            "extracted_links": [link._asdict() for link in extraction.links],
+        }
+    return response
+
+
+def tool_stage(stage: str, source: Path, inline: bool) -> dict:
+    if stage == "cleaner":
+        from cleaner_tool import cleaner_tool
+
+        return cleaner_tool._run(url=URL, scraped_file=str(source), inline=inline)
+    from html_extractor_tool import html_extractor_tool
+
+    return html_extractor_tool._run(url=URL, cleaned_file=str(source), inline=inline)
+
+
+def run_stage(mode: str, stage: str, source: str, workdir: str, queue) -> None:
+    os.chdir(workdir)  # tools write under ./regulatory_outputs
+    # Import first so the tool modules (crewai, pydantic) land in the baseline
+    if mode == "legacy":
+        import shared.html_engine  # noqa: F401
+    elif stage == "cleaner":
+        import cleaner_tool  # noqa: F401
+    else:
+        import html_extractor_tool  # noqa: F401
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "legacy":
+        response = legacy_stage(stage, Path(source))
+    else:
+        response = tool_stage(stage, Path(source), inline=mode == "inline")
+    body = json.dumps(response)  # what the server would send back
+    seconds = time.perf_counter() - start
+    queue.put((seconds, baseline, peak_rss_mb(), len(body), response.get("cleaned_file")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--page", help="Use this saved page instead of a generated one")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="artifact_bench_")
+    page = Path(args.page) if args.page else Path(workdir) / "large_scraped.html"
+    if not args.page:
+        write_large_page(page, args.size_mb)
+    print(f"Page: {page} ({page.stat().st_size / (1024 * 1024):.1f} MB)")
+
+    # spawn, not fork: a forked child would start out sharing the parent's pages
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+
+    def measure(mode: str, stage: str, source: str):
+        proc = ctx.Process(target=run_stage, args=(mode, stage, source, workdir, queue))
+        proc.start()
+        seconds, baseline, peak, response_bytes, cleaned_file = queue.get()
+        proc.join()
+        label = f"{mode} {stage}"
+        print(
+            f"{label:<28} {seconds:6.2f} s  peak RSS={peak:7.1f} MB (+{peak - baseline:6.1f} MB over imports)  "
+            f"response={response_bytes / 1024:,.0f} KB"
+        )
+        return cleaned_file
+
+    page_path = str(page.resolve())
+    for mode in ("legacy", "inline", "handles"):
+        cleaned_file = measure(mode, "cleaner", page_path)
+        measure(mode, "extractor", str(Path(workdir) / cleaned_file))
+    measure("handles", "extractor (raw page)", page_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Time and peak RSS of the HTML cleaning engines over a corpus of saved pages.
+
+Usage: python benchmarks/cleaner_benchmark.py [PAGE_DIR] [--repeat 3]
+
+PAGE_DIR defaults to regulatory_outputs/site_outputs (*_scraped.html); when it
+has no pages a synthetic corpus of large regulator-style pages is generated.
+Each engine runs in its own process so peak RSS is not shared between them.
+"""
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from shared import html_engine  # noqa: E402
+
+
+def legacy_clean(html: str) -> str:
+    # Pre-rewrite CleanerTool: one find_all per tag, get_text per element, prettify
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in html_engine.TAGS_TO_REMOVE:
+        for el in soup.find_all(tag):
+            el.decompose()
+    for tag in soup.find_all():
+        if not tag.get_text(strip=True) and tag.name not in ["br", "hr"]:
+            tag.decompose()
+    return soup.prettify()
+
+
+def soup_clean(html: str) -> str:
+    return str(html_engine._clean_soup(BeautifulSoup(html, "html.parser")))
+
+
+ENGINES = {
+    "legacy": legacy_clean,
+    "bs4-single-pass": soup_clean,
+    "lxml-single-pass": html_engine._clean_lxml,
+}
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:  # Windows
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def synthetic_page(sections: int, depth: int) -> str:
+    def nested(level: int, i: int) -> str:
+        if level == depth:
+            return f'<p>Notice {i} text <a href="/n/{i}">link {i}</a></p><span></span><div> </div>'
+        return f"<div class='l{level}'>{nested(level + 1, i)}<!-- spacer --><br></div>"
+
+    body = "".join(
+        f"<section><h2>Update {i}</h2>{nested(0, i)}<aside>related</aside>"
+        f"<script>track({i})</script><div><span></span></div></section>"
+        for i in range(sections)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Regulator</title><style>p{color:red}</style></head>"
+        f"<body><header><nav>Home</nav></header><main>{body}</main><footer>Footer</footer></body></html>"
+    )
+
+
+def load_corpus(page_dir: Path) -> list:
+    pages = sorted(page_dir.glob("*_scraped.html")) if page_dir.exists() else []
+    if pages:
+        return pages
+    tmp = Path(tempfile.mkdtemp(prefix="cleaner_corpus_"))
+    for n, (sections, depth) in enumerate([(500, 8), (1000, 12), (2000, 6)]):
+        path = tmp / f"synthetic_{n}_scraped.html"
+        path.write_text(synthetic_page(sections, depth), encoding="utf-8")
+        pages.append(path)
+    print(f"📄 No saved pages in {page_dir}; generated synthetic corpus in {tmp}")
+    return pages
+
+
+def run_engine(engine: str, pages: list, repeat: int, queue) -> None:
+    clean = ENGINES[engine]
+    htmls = [p.read_text(encoding="utf-8") for p in pages]
+    baseline_rss = peak_rss_mb()
+    best = float("inf")
+    output_bytes = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = [clean(html) for html in htmls]
+        best = min(best, time.perf_counter() - start)
+        output_bytes = sum(len(o) for o in outputs)
+        del outputs
+    queue.put((engine, best, peak_rss_mb() - baseline_rss, peak_rss_mb(), output_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("page_dir", nargs="?", default="regulatory_outputs/site_outputs")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_corpus(Path(args.page_dir))
+    total_mb = sum(p.stat().st_size for p in pages) / (1024 * 1024)
+    print(f"Corpus: {len(pages)} page(s), {total_mb:.1f} MB")
+
+    queue = multiprocessing.Queue()
+    for engine in ENGINES:
+        if engine == "lxml-single-pass" and html_engine.lxml_html is None:
+            print(f"{engine:<18} skipped (lxml not installed)")
+            continue
+        proc = multiprocessing.Process(target=run_engine, args=(engine, pages, args.repeat, queue))
+        proc.start()
+        name, seconds, rss_delta, rss_peak, output_bytes = queue.get()
+        proc.join()
+        print(
+            f"{name:<18} best={seconds:7.2f} s  ({total_mb / seconds:6.1f} MB/s)  "
+            f"peak RSS={rss_peak:7.1f} MB (+{rss_delta:.1f} MB while cleaning)  output={output_bytes / 1024:.0f} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Text/link extraction on link-heavy and deeply nested pages: legacy vs streaming engine.
+
+Usage: python benchmarks/extractor_benchmark.py [--links 10000] [--depth 1500] [--repeat 3]
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from bs4.element import NavigableString, Tag  # noqa: E402
+from shared import html_engine  # noqa: E402
+
+BASE_URL = "https://www.regulator.gov/news/"
+
+
+def legacy_extract(html: str, url: str):
+    # Pre-rewrite HTMLExtractorTool: recursive traverse, links recovered by splitting on " ("
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(html_engine.TAGS_TO_REMOVE):
+        tag.decompose()
+    result = []
+
+    def traverse(node):
+        if isinstance(node, NavigableString):
+            text = node.strip()
+            if text:
+                result.append(text)
+        elif isinstance(node, Tag):
+            if node.name == "a" and node.get("href"):
+                text = node.get_text(strip=True)
+                if text:
+                    result.append(f"{text} ({urljoin(url, node['href'])})")
+            else:
+                for child in node.children:
+                    traverse(child)
+
+    traverse(soup.body or soup)
+    links = [part.split(" (")[-1].rstrip(")") for part in result if " (" in part]
+    return " ".join(result), links
+
+
+def streaming_extract(html: str, url: str):
+    return html_engine.extract_content(html, url, out=io.StringIO())
+
+
+def soup_streaming_extract(html: str, url: str):
+    return html_engine.extract_content(BeautifulSoup(html, "html.parser"), url, out=io.StringIO())
+
+
+ENGINES = {
+    "legacy": legacy_extract,
+    "stream-bs4": soup_streaming_extract,
+    "stream-lxml": streaming_extract,
+}
+
+
+def link_heavy_page(links: int) -> str:
+    items = "".join(
+        f'<li><a href="/rules/{i % (links // 2)}">Rule {i} (amended {2000 + i % 25})</a> '
+        f"<span>posted</span></li>"
+        for i in range(links)
+    )
+    return f"<html><body><nav><a href='/'>Home</a></nav><main><ul>{items}</ul></main></body></html>"
+
+
+def deep_page(depth: int) -> str:
+    opening = "".join(f"<div class='d{i}'>level {i} " for i in range(depth))
+    closing = "</div>" * depth
+    return f"<html><body><main>{opening}<a href='/deep'>Deep link</a>{closing}</main></body></html>"
+
+
+def bench(label: str, html: str, repeat: int) -> None:
+    print(f"\n{label} ({len(html) / 1024:.0f} KB)")
+    for name, extract in ENGINES.items():
+        if name == "stream-lxml" and html_engine.lxml_html is None:
+            print(f"  {name:<12} skipped (lxml not installed)")
+            continue
+        best, result = float("inf"), None
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                result = extract(html, BASE_URL)
+                best = min(best, time.perf_counter() - start)
+        except RecursionError:
+            print(f"  {name:<12} RecursionError")
+            continue
+        text, links = result
+        print(f"  {name:<12} best={best * 1000:9.1f} ms  text={len(text):>9} chars  links={len(links)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--depth", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bench(f"{args.links} links", link_heavy_page(args.links), args.repeat)
+    bench(f"{args.depth}-level nesting", deep_page(args.depth), args.repeat)
+    print("\nlegacy returns every href (duplicates included); the streaming engine de-duplicates by href")
+
+
+if __name__ == "__main__":
+    main()
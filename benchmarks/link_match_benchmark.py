@@ -0,0 +1,108 @@
+"""Link matching for unlinked LLM items: difflib.get_close_matches vs the TF-IDF LinkIndex.
+
+Usage: python benchmarks/link_match_benchmark.py [--links 5000] [--items 500] [--difflib-items 50] [--seed 7]
+
+difflib is timed on the first --difflib-items queries only; at 5k links it
+takes seconds per item.
+"""
+import argparse
+import random
+import sys
+import time
+from difflib import get_close_matches
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tools"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from link_match_cases import ACCURACY_ITEMS, ACCURACY_LINKS, BASE_URL  # noqa: E402
+from shared.link_index import LinkIndex, links_from_text  # noqa: E402
+
+SUBJECTS = [
+    "capital", "liquidity", "stress testing", "climate risk", "consumer protection", "anti-money laundering",
+    "sanctions", "cyber resilience", "third-party risk", "mortgage servicing", "overdraft fees", "fair lending",
+    "resolution planning", "deposit insurance", "market risk", "operational resilience", "payments", "crypto assets",
+]
+ACTIONS = [
+    "Final rule on", "Proposed rule on", "Guidance on", "Statement on", "Request for comment on",
+    "Enforcement action concerning", "FAQ update on", "Supervisory letter on", "Interagency notice on",
+]
+QUALIFIERS = ["requirements", "reporting", "disclosures", "standards", "examinations", "framework", "thresholds"]
+
+def synthetic_page(links: int, rng: random.Random):
+    titles = []
+    parts = []
+    for i in range(links):
+        title = f"{rng.choice(ACTIONS)} {rng.choice(SUBJECTS)} {rng.choice(QUALIFIERS)} ({2015 + i % 10}-{i:05d})"
+        slug = title.lower().replace(" ", "-").replace("(", "").replace(")", "")
+        titles.append(title)
+        parts.append(f"Posted {1 + i % 28} March. {title} ({BASE_URL}/news/{slug})")
+    return " ".join(parts), titles
+
+
+def perturb(title: str, rng: random.Random) -> str:
+    # LLM-style paraphrase: drop a word, reorder, change case, occasional typo
+    words = title.replace("(", "").replace(")", "").split()
+    if len(words) > 4:
+        words.pop(rng.randrange(1, len(words) - 1))
+    if rng.random() < 0.5:
+        cut = rng.randrange(1, len(words))
+        words = words[cut:] + words[:cut]
+    topic = " ".join(words)
+    if rng.random() < 0.3:
+        i = rng.randrange(1, len(topic) - 1)
+        topic = topic[:i] + topic[i + 1:]
+    return topic.title() if rng.random() < 0.5 else topic
+
+
+def difflib_match(topic: str, urls):
+    # What llm_extractor_tool did before: topic vs raw URLs
+    match = get_close_matches(topic.lower(), urls, n=1, cutoff=0.3)
+    return match[0] if match else None
+
+
+def evaluate(label, links, queries, repeat=1, difflib_items=None):
+    urls = [href for _, href in links]
+    start = time.perf_counter()
+    index = LinkIndex(links)
+    build = time.perf_counter() - start
+    print(f"\n{label}: {len(urls)} links, {len(queries)} items (index build {build * 1000:.1f} ms)")
+
+    engines = (
+        ("difflib", lambda q: difflib_match(q, urls), queries[:difflib_items]),
+        ("link-index", index.best_match, queries),
+    )
+    for name, match, sample in engines:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            answers = [match(query) for query, _ in sample]
+        elapsed = (time.perf_counter() - start) / repeat
+        correct = sum(answer == expected for answer, (_, expected) in zip(answers, sample))
+        print(
+            f"  {name:<11} {elapsed * 1000 / len(sample):8.3f} ms/item  items={len(sample):<4} "
+            f"total={elapsed:7.2f} s  accuracy={correct / len(sample):6.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--links", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--difflib-items", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    text, titles = synthetic_page(args.links, rng)
+    links = links_from_text(text)
+    picks = rng.sample(range(len(links)), min(args.items, len(links)))
+    queries = [(perturb(titles[i], rng), links[i][1]) for i in picks]
+    evaluate("synthetic page", links, queries, difflib_items=args.difflib_items)
+
+    accuracy_queries = [(topic, ACCURACY_LINKS[i][1]) for topic, i in ACCURACY_ITEMS]
+    evaluate("hand-labelled set", ACCURACY_LINKS, accuracy_queries, repeat=20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Hand-labelled link matching cases, shared by tests/test_link_index.py and link_match_benchmark.py."""
+
+BASE_URL = "https://www.regulator.gov"
+
+# Hand-written cases: anchor texts as they appear on a page, and topics as an LLM tends to phrase them
+ACCURACY_LINKS = [
+    ("Agencies issue final rule to strengthen Community Reinvestment Act regulations", f"{BASE_URL}/news/press/cra-final-rule"),
+    ("Federal Reserve Board announces results of annual bank stress test", f"{BASE_URL}/news/press/2024-stress-test-results"),
+    ("Proposal to revise the Basel III endgame capital requirements", f"{BASE_URL}/rules/basel-iii-endgame-proposal.pdf"),
+    ("Interagency guidance on third-party relationships: risk management", f"{BASE_URL}/supervision/third-party-guidance"),
+    ("CFPB finalizes rule to cap overdraft fees at large banks", f"{BASE_URL}/rules/overdraft-lending-final"),
+    ("Request for information on bank-fintech arrangements", f"{BASE_URL}/news/rfi-bank-fintech"),
+    ("Statement on crypto-asset risks to banking organizations", f"{BASE_URL}/news/statement/crypto-asset-risks"),
+    ("Climate-related financial risk management principles for large institutions", f"{BASE_URL}/supervision/climate-principles"),
+    ("Enforcement action against Example Bank for AML/BSA deficiencies", f"{BASE_URL}/enforcement/example-bank-bsa"),
+    ("Updated FAQ on deposit insurance coverage for trust accounts", f"{BASE_URL}/deposit-insurance/faq-trust-accounts"),
+    ("Resolution plan guidance for large foreign banking organizations", f"{BASE_URL}/resolution/fbo-guidance"),
+    ("Final rule amending the Fair Credit Reporting Act medical debt provisions", f"{BASE_URL}/rules/fcra-medical-debt"),
+    ("Joint statement on liquidity risk and contingency funding plans", f"{BASE_URL}/news/statement/liquidity-contingency-funding"),
+    ("Press release: Board approves changes to the Regulation II debit interchange fee cap", f"{BASE_URL}/news/press/reg-ii-debit-interchange"),
+    ("Operational resilience: sound practices to strengthen operational resilience", f"{BASE_URL}/supervision/operational-resilience"),
+]
+ACCURACY_ITEMS = [
+    ("Final CRA rule strengthening Community Reinvestment Act", 0),
+    ("2024 bank stress test results announced", 1),
+    ("Basel III endgame capital proposal", 2),
+    ("Third party relationship risk management guidance", 3),
+    ("Overdraft fee cap for large banks finalized", 4),
+    ("RFI on bank fintech arrangements", 5),
+    ("Crypto asset risks statement", 6),
+    ("Climate related financial risk principles", 7),
+    ("BSA/AML enforcement action against Example Bank", 8),
+    ("Deposit insurance coverage for trust accounts FAQ", 9),
+    ("Guidance on resolution plans for foreign banking organizations", 10),
+    ("FCRA medical debt final rule", 11),
+    ("Liquidity risk and contingency funding joint statement", 12),
+    ("Regulation II debit interchange fee cap changes", 13),
+    ("Sound practices for operational resilience", 14),
+]
@@ -0,0 +1,112 @@
+"""PDF rendering throughput for a batch of cleaned HTML documents, per backend and worker count.
+
+Usage: python benchmarks/pdf_render_benchmark.py [--docs 100] [--workers 1 4 8] [--cold-docs 10]
+
+chromium-cold launches a browser per document (what a per-call renderer
+costs); it is timed on --cold-docs documents only. wkhtmltopdf is skipped
+when the executable cannot be found.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--cold-docs", type=int, default=10)
+    return parser.parse_args()
+
+
+ARGS = parse_args()
+# The pool needs at least as many contexts as the widest worker count
+os.environ.setdefault("SCRAPER_POOL_CONTEXTS", str(max(ARGS.workers)))
+
+from playwright.async_api import async_playwright  # noqa: E402
+from shared import pdf_render  # noqa: E402
+from shared.browser_pool import get_browser_pool  # noqa: E402
+
+DOCUMENT = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Update {n}</title></head>
+<body><h1>Regulatory update {n}</h1>
+{paragraphs}
+<ul>{links}</ul>
+</body></html>
+"""
+
+
+def write_corpus(root: Path, docs: int):
+    sources = []
+    for n in range(docs):
+        paragraphs = "\n".join(
+            f"<p>Section {i}: the agencies are issuing guidance on capital, liquidity and "
+            f"operational resilience requirements for institutions (notice {n}-{i}).</p>"
+            for i in range(40)
+        )
+        links = "".join(f'<li><a href="https://www.regulator.gov/n/{n}/{i}">Notice {i}</a></li>' for i in range(30))
+        source = root / f"doc_{n:03d}.html"
+        source.write_text(DOCUMENT.format(n=n, paragraphs=paragraphs, links=links), encoding="utf-8")
+        sources.append(source)
+    return sources
+
+
+async def chromium_cold(sources, out_dir: Path):
+    for source in sources:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            try:
+                page = await browser.new_page()
+                await page.goto(source.resolve().as_uri(), wait_until="load")
+                await page.pdf(path=str(out_dir / f"{source.stem}.pdf"), format="A4")
+            finally:
+                await browser.close()
+
+
+def report(label: str, docs: int, seconds: float, failed: int = 0) -> None:
+    print(f"  {label:<22} {docs:>4} docs  {seconds:7.2f} s  {docs / seconds:7.1f} docs/s  failed={failed}")
+
+
+def run_batch(label: str, backend: str, sources, out_dir: Path, workers: int) -> None:
+    jobs = [(source, out_dir / f"{source.stem}_{backend}_{workers}.pdf") for source in sources]
+    start = time.perf_counter()
+    results = asyncio.run(pdf_render.render_many(jobs, workers, backend))
+    report(label, len(jobs), time.perf_counter() - start, sum(r["pdf_file"] is None for r in results))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        out_dir = root / "pdf"
+        out_dir.mkdir()
+        sources = write_corpus(root, ARGS.docs)
+        print(f"📄 {len(sources)} documents in {root}")
+
+        print("\nchromium")
+        start = time.perf_counter()
+        asyncio.run(chromium_cold(sources[:ARGS.cold_docs], out_dir))
+        report("cold launch per doc", min(ARGS.cold_docs, len(sources)), time.perf_counter() - start)
+
+        start = time.perf_counter()
+        get_browser_pool().start()
+        print(f"  pool warm-up (one-off) {time.perf_counter() - start:7.2f} s")
+        for workers in ARGS.workers:
+            run_batch(f"pooled, {workers} workers", "chromium", sources, out_dir, workers)
+        get_browser_pool().close()
+
+        print("\nwkhtmltopdf")
+        if pdf_render.find_wkhtmltopdf() is None:
+            print("  skipped (executable not found; set WKHTMLTOPDF_PATH)")
+            return
+        for workers in ARGS.workers:
+            run_batch(f"process per doc, {workers}w", "wkhtmltopdf", sources, out_dir, workers)
+
+
+if __name__ == "__main__":
+    main()
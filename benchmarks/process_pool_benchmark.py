@@ -0,0 +1,115 @@
+"""Parsing throughput of cleaner_tool + html_extractor_tool versus worker processes.
+
+Usage: python benchmarks/process_pool_benchmark.py [--pages 200] [--sections 300] [--workers 1,2,4,8]
+
+Every page of a synthetic corpus goes through cleaner_tool and then
+html_extractor_tool via the server's ToolExecutor: once on a thread pool (the
+GIL serializes the parsing) and once on the shared process pool, for each
+worker count. As at server startup, the process pool is started and the tools
+imported in every worker before timing; that start-up cost is reported
+separately. Worker counts above the machine's core count are skipped.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tools"))
+sys.path.insert(0, str(ROOT / "mcp_server"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from cleaner_benchmark import synthetic_page  # noqa: E402
+
+SOURCES = {
+    "cleaner_tool": str(ROOT / "tools" / "cleaner_tool.py"),
+    "html_extractor_tool": str(ROOT / "tools" / "html_extractor_tool.py"),
+}
+
+
+def write_corpus(root: Path, pages: int, sections: int) -> list:
+    paths = []
+    for i in range(pages):
+        path = root / f"page_{i}_scraped.html"
+        # Varying sizes so the artifact store does not dedupe the whole corpus into one object
+        path.write_text(synthetic_page(sections + i % 17, 3), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+async def run_corpus(executor, tools: dict, pages: list, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, page: Path) -> None:
+        url = f"https://www.regulator.example/notices/{i}"
+        async with semaphore:
+            cleaned = await executor.run(
+                tools["cleaner_tool"], {"url": url, "scraped_file": str(page)}, SOURCES["cleaner_tool"], wait=True
+            )
+            await executor.run(
+                tools["html_extractor_tool"],
+                {"url": url, "cleaned_file": cleaned["cleaned_file"]},
+                SOURCES["html_extractor_tool"],
+                wait=True,
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, page) for i, page in enumerate(pages)))
+    return time.perf_counter() - start
+
+
+def measure(mode: str, workers: int, tools: dict, pages: list) -> tuple:
+    from tool_executor import ToolExecutor
+
+    if mode == "thread":
+        limits = {name: {"mode": "thread", "max_concurrency": workers} for name in SOURCES}
+        executor = ToolExecutor(limits, process_workers=0)
+        startup = 0.0
+    else:
+        executor = ToolExecutor({}, process_workers=workers)
+        started = time.perf_counter()
+        executor.start_process_pool(SOURCES.values())
+        startup = time.perf_counter() - started
+    try:
+        # Twice the workers in flight so a worker never waits on the event loop
+        seconds = asyncio.run(run_corpus(executor, tools, pages, workers * 2))
+    finally:
+        executor.shutdown()
+    return seconds, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=300, help="Sections per synthetic page (300 is ~100 KB)")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = [n for n in (int(w) for w in args.workers.split(",")) if n <= cores] or [1]
+
+    workdir = Path(tempfile.mkdtemp(prefix="process_pool_bench_"))
+    pages = write_corpus(workdir, args.pages, args.sections)
+    os.chdir(workdir)  # tools write under ./regulatory_outputs
+    size_mb = sum(p.stat().st_size for p in pages) / (1024 * 1024)
+    print(f"Corpus: {len(pages)} pages, {size_mb:.1f} MB in {workdir} ({cores} cores)")
+
+    from cleaner_tool import cleaner_tool
+    from html_extractor_tool import html_extractor_tool
+
+    tools = {"cleaner_tool": cleaner_tool, "html_extractor_tool": html_extractor_tool}
+    for workers in counts:
+        thread_seconds, _ = measure("thread", workers, tools, pages)
+        process_seconds, startup = measure("process", workers, tools, pages)
+        print(
+            f"workers={workers:<3} threads {thread_seconds:6.2f} s ({len(pages) / thread_seconds:6.1f} pages/s)   "
+            f"processes {process_seconds:6.2f} s ({len(pages) / process_seconds:6.1f} pages/s, "
+            f"x{thread_seconds / process_seconds:.2f})   pool start {startup:5.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Cold-launch vs pooled scrape latency against a local static fixture server.
+
+Usage: python benchmarks/scraper_pool_benchmark.py [--requests 20] [--contexts 4]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "tools"))
+
+from scraper_tool import fetch_html_cold, load_html  # noqa: E402
+from shared.browser_pool import BrowserPool  # noqa: E402
+
+FIXTURE_HTML = """<!DOCTYPE html>
+<html><head><title>Fixture</title><style>body {{ font-family: sans-serif; }}</style></head>
+<body><header><nav>Home | Updates</nav></header>
+<main>{items}</main>
+<footer>Fixture footer</footer></body></html>
+"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(root: Path) -> ThreadingHTTPServer:
+    items = "\n".join(
+        f'<article><h2>Update {i}</h2><p>Regulatory notice {i}.</p><a href="/n/{i}">Read more</a></article>'
+        for i in range(200)
+    )
+    (root / "index.html").write_text(FIXTURE_HTML.format(items=items), encoding="utf-8")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(label: str, samples: list) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))]
+    print(
+        f"{label:<10} n={len(samples_ms):<4} mean={statistics.mean(samples_ms):8.1f} ms  "
+        f"p50={statistics.median(samples_ms):8.1f} ms  p95={p95:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--browsers", type=int, default=1)
+    parser.add_argument("--contexts", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_fixture_server(Path(tmp))
+        url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+        print(f"📄 Fixture server at {url}")
+
+        cold = []
+        for _ in range(args.requests):
+            t0 = time.perf_counter()
+            asyncio.run(fetch_html_cold(url, settle_ms=0))
+            cold.append(time.perf_counter() - t0)
+
+        pool = BrowserPool(browsers=args.browsers, contexts_per_browser=args.contexts)
+        t0 = time.perf_counter()
+        pool.start()
+        warmup = time.perf_counter() - t0
+        pooled = []
+        try:
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                pool.run(lambda page: load_html(page, url, settle_ms=0))
+                pooled.append(time.perf_counter() - t0)
+        finally:
+            pool.close()
+            server.shutdown()
+
+    summarize("cold", cold)
+    summarize("pooled", pooled)
+    print(f"pool warm-up (one-off): {warmup * 1000:.1f} ms")
+    print(f"speedup (mean): {statistics.mean(cold) / statistics.mean(pooled):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
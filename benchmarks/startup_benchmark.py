@@ -0,0 +1,84 @@
+"""MCP server cold-start time: lazy tool registry vs importing every tool at startup.
+
+Usage: python benchmarks/startup_benchmark.py [--runs 5] [--call-tool cleaner_tool]
+
+Each run is a fresh interpreter that imports mcp_server, starts the app and
+answers /tools/list, then makes one /tools/spec and, optionally, one first call
+to --call-tool (which, when lazy, pays for importing that tool). Runs once with
+no manifest cache (cold) and then with it (warm).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {server_dir!r})
+import mcp_server
+from fastapi.testclient import TestClient
+timings = {{"import": time.perf_counter() - started}}
+with TestClient(mcp_server.app) as client:
+    client.get("/tools/list").raise_for_status()
+    timings["first_list"] = time.perf_counter() - started
+    tool = {call_tool!r}
+    if tool:
+        before = time.perf_counter()
+        client.get("/tools/spec", params={{"tool": tool}}).raise_for_status()
+        timings["first_spec"] = time.perf_counter() - before
+        before = time.perf_counter()
+        client.post("/tools/call", json={{"tool": tool, "input": {call_input}}})
+        timings["first_call"] = time.perf_counter() - before
+print(json.dumps(timings))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--call-tool", default="debug_proxy_tool")
+    parser.add_argument("--call-input", default='{"scraped_html": "<html><body><p>hi</p></body></html>"}')
+    return parser.parse_args()
+
+
+def run_once(lazy: bool, manifest: Path, args) -> dict:
+    env = {
+        **os.environ,
+        "MCP_TOOLS_PATH": str(ROOT / "tools"),
+        "MCP_LAZY_TOOLS": "1" if lazy else "0",
+        "MCP_TOOL_MANIFEST": str(manifest),
+        "MCP_WARM_TOOLS": "",
+    }
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    code = CHILD.format(server_dir=str(ROOT / "mcp_server"), call_tool=args.call_tool, call_input=args.call_input)
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=str(ROOT), capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def report(label: str, runs: list) -> None:
+    keys = [k for k in ("import", "first_list", "first_spec", "first_call") if k in runs[0]]
+    cells = "  ".join(f"{k}={statistics.median(r[k] for r in runs):6.3f}s" for k in keys)
+    print(f"  {label:<14} {cells}")
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = Path(tmp) / "tool_manifest.json"
+        print(f"⏱️  median of {args.runs} runs (first call: {args.call_tool or 'none'})")
+        for lazy in (False, True):
+            label = "lazy" if lazy else "eager"
+            manifest.unlink(missing_ok=True)
+            report(f"{label}, cold", [run_once(lazy, manifest, args)])
+            report(f"{label}, cached", [run_once(lazy, manifest, args) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
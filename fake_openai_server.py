@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+# Local stand-in for the OpenAI chat completions API, for load-testing the LLM tools.
+# Run:  uvicorn fake_openai_server:app --port 8001
+# Then: OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake ...
+LATENCY_SECONDS = float(os.getenv("FAKE_OPENAI_LATENCY", "0.2"))
+RATE_LIMIT_PROBABILITY = float(os.getenv("FAKE_OPENAI_429_RATE", "0.05"))
+SERVER_ERROR_PROBABILITY = float(os.getenv("FAKE_OPENAI_500_RATE", "0.02"))
+# Chance that an item is left out of a batched answer (exercises the single-row fallback)
+BATCH_DROP_PROBABILITY = float(os.getenv("FAKE_OPENAI_BATCH_DROP_RATE", "0.05"))
+# Chance that an answer is cut off mid-way with finish_reason="length"
+TRUNCATE_PROBABILITY = float(os.getenv("FAKE_OPENAI_TRUNCATE_RATE", "0"))
+# Streamed answers arrive in pieces of this many characters, one per STREAM_DELAY seconds
+STREAM_PIECE_CHARS = int(os.getenv("FAKE_OPENAI_STREAM_PIECE_CHARS", "40"))
+STREAM_DELAY_SECONDS = float(os.getenv("FAKE_OPENAI_STREAM_DELAY", "0.002"))
+
+app = FastAPI()
+stats = {"requests": 0, "rate_limited": 0, "server_errors": 0}
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ChatRequest(BaseModel):
+    model: str
+    messages: List[ChatMessage]
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    stream: bool = False
+    stream_options: Optional[Dict[str, Any]] = None
+
+
+def fake_answer(prompt: str) -> str:
+    # Classification prompts get a verdict; anything else gets an empty update list
+    batch_ids = re.findall(r"^Update ID: (\d+)$", prompt, flags=re.MULTILINE)
+    if batch_ids:
+        return json.dumps([
+            {"id": int(row_id), "recommendation": "Include" if int(row_id) % 2 else "Exclude", "reason": "fake batch verdict"}
+            for row_id in batch_ids
+            if random.random() >= BATCH_DROP_PROBABILITY
+        ])
+    if '"recommendation"' in prompt:
+        verdict = "Include" if "Topic:" in prompt and len(prompt) % 2 == 0 else "Exclude"
+        return json.dumps({"recommendation": verdict, "reason": "fake classifier verdict"})
+    if "DOCUMENT CONTENT" in prompt:
+        # Extraction prompts: one update per "text (link)" anchor in the document
+        document = prompt.split("DOCUMENT CONTENT:", 1)[1]
+        return json.dumps([
+            {"date": "2024-01-01", "topic": text.strip()[-80:], "additional_context": "", "link": link, "regulator": "Fake"}
+            for text, link in re.findall(r"([^()]{1,200}) \((https?://[^\s)]+)\)", document)
+        ])
+    if "JSON array" in prompt:
+        return "[]"
+    return "Fake completion."
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: ChatRequest):
+    stats["requests"] += 1
+    roll = random.random()
+    if roll < RATE_LIMIT_PROBABILITY:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+            headers={"retry-after": "0.1"},
+        )
+    if roll < RATE_LIMIT_PROBABILITY + SERVER_ERROR_PROBABILITY:
+        stats["server_errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"message": "Fake server error", "type": "server_error"}})
+
+    await asyncio.sleep(LATENCY_SECONDS)
+    prompt = body.messages[-1].content
+    answer = fake_answer(prompt)
+    finish_reason = "stop"
+    if random.random() < TRUNCATE_PROBABILITY:
+        answer = answer[:random.randint(0, len(answer))]
+        finish_reason = "length"
+    prompt_tokens = sum(len(m.content) for m in body.messages) // 4
+    completion_tokens = len(answer) // 4
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+    if body.stream:
+        include_usage = bool((body.stream_options or {}).get("include_usage"))
+        return StreamingResponse(
+            stream_answer(body.model, answer, finish_reason, usage if include_usage else None),
+            media_type="text/event-stream",
+        )
+    return {
+        "id": f"chatcmpl-fake-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+async def stream_answer(model: str, answer: str, finish_reason: str, usage: Optional[Dict[str, int]] = None):
+    completion_id = f"chatcmpl-fake-{stats['requests']}"
+
+    def event(delta: Dict[str, Any], reason: Optional[str] = None) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    for i in range(0, len(answer), STREAM_PIECE_CHARS):
+        await asyncio.sleep(STREAM_DELAY_SECONDS)
+        yield event({"content": answer[i:i + STREAM_PIECE_CHARS]})
+    yield event({}, finish_reason)
+    if usage is not None:
+        # stream_options={"include_usage": true}: a last chunk with no choices, only usage
+        chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/stats")
+def get_stats() -> Dict[str, Any]:
+    return stats
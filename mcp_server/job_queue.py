@@ -0,0 +1,383 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from shared import metrics
+
+# Tool calls submitted to /jobs survive restarts here; the client polls instead of holding a connection
+MCP_JOBS_PATH = Path(os.getenv("MCP_JOBS_PATH", "regulatory_outputs/jobs.sqlite3"))
+# Jobs running at once; each still goes through its tool's executor lane and limits
+MCP_JOB_WORKERS = int(os.getenv("MCP_JOB_WORKERS", "8"))
+# Idle workers re-check the store this often (picks up jobs submitted by other server processes)
+MCP_JOB_POLL_SECONDS = float(os.getenv("MCP_JOB_POLL_SECONDS", "2"))
+# Finished jobs and their results are kept this long
+MCP_JOB_RETENTION_SECONDS = float(os.getenv("MCP_JOB_RETENTION_HOURS", "72")) * 3600
+# A running job belongs to its server process while the lease is renewed; after it lapses
+# (the process died) any server puts the job back in the queue
+MCP_JOB_LEASE_SECONDS = float(os.getenv("MCP_JOB_LEASE_SECONDS", "60"))
+# Jobs whose server died this many times (e.g. a tool that crashes the process) fail instead
+MCP_JOB_MAX_ATTEMPTS = int(os.getenv("MCP_JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Pruning needs a table scan, so it only runs every N submits
+PRUNE_EVERY_N_SUBMITS = 100
+
+_COLUMNS = "id, tool, priority, status, created_at, started_at, finished_at, attempts, error, status_code"
+
+
+class JobStore:
+    """SQLite-backed job records: the queue itself, status and results.
+
+    claim() moves the best queued job (highest priority, then oldest) to
+    running with a conditional UPDATE and records the claiming `owner` with a
+    lease, so several server processes can share one store without running a
+    job twice. Owners renew() their leases; recover() requeues jobs whose lease
+    expired, or fails them after `max_attempts`.
+    """
+
+    def __init__(self, path: Path = MCP_JOBS_PATH, max_attempts: int = MCP_JOB_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._submits = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                tool TEXT NOT NULL,
+                input TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                status_code INTEGER,
+                owner TEXT,
+                lease_expires_at REAL
+            )
+            """
+        )
+        # Stores created before leases existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, seq)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _doc(row) -> Dict[str, Any]:
+        return dict(zip(["job_id"] + [c.strip() for c in _COLUMNS.split(",")[1:]], row))
+
+    def submit(self, tool: str, kwargs: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, tool, input, priority, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, tool, json.dumps(kwargs), priority, QUEUED, now),
+            )
+            self._conn.commit()
+            self._submits += 1
+            if self._submits % PRUNE_EVERY_N_SUBMITS == 0:
+                self._prune(now - MCP_JOB_RETENTION_SECONDS)
+        return self.get(job_id)
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS}, seq, result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            doc = self._doc(row[:-2])
+            if doc["status"] == QUEUED:
+                # Queued jobs that will be picked before this one
+                doc["position"] = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND seq < ?))",
+                    (QUEUED, doc["priority"], doc["priority"], row[-2]),
+                ).fetchone()[0]
+        if with_result and row[-1] is not None:
+            doc["result"] = json.loads(row[-1])
+        return doc
+
+    def claim(self, owner: str, lease_seconds: float = MCP_JOB_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Mark the next queued job running under `owner` and return it with its input, or None."""
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    "SELECT seq FROM jobs WHERE status = ? ORDER BY priority DESC, seq LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                claimed = self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, owner = ?, lease_expires_at = ? "
+                    "WHERE seq = ? AND status = ?",
+                    (RUNNING, now, owner, now + lease_seconds, row[0], QUEUED),
+                ).rowcount
+                self._conn.commit()
+                if claimed:
+                    job = self._conn.execute(f"SELECT {_COLUMNS}, input FROM jobs WHERE seq = ?", (row[0],)).fetchone()
+                    doc = self._doc(job[:-1])
+                    doc["input"] = json.loads(job[-1])
+                    return doc
+                # Another process took it first; try the next one
+
+    def finish(
+        self, job_id: str, owner: str, status: str, result: Optional[str] = None,
+        error: Optional[str] = None, status_code: Optional[int] = None,
+    ) -> bool:
+        # Only the owner of a running job can finish it; one cancelled (or recovered by another
+        # server after its lease lapsed) meanwhile keeps that state and this result is dropped
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, status_code = ?, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                (status, time.time(), result, error, status_code, job_id, RUNNING, owner),
+            ).rowcount
+            self._conn.commit()
+        return bool(updated)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+            )
+            self._conn.commit()
+        return self.get(job_id)
+
+    def renew(self, owner: str, lease_seconds: float = MCP_JOB_LEASE_SECONDS) -> int:
+        with self._lock:
+            count = self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE owner = ? AND status = ?",
+                (time.time() + lease_seconds, owner, RUNNING),
+            ).rowcount
+            self._conn.commit()
+        return count
+
+    def release(self, owner: str, job_ids: List[str]) -> int:
+        """Put `owner`'s running jobs back in the queue (graceful shutdown; not counted as an attempt)."""
+        with self._lock:
+            count = self._conn.executemany(
+                "UPDATE jobs SET status = ?, started_at = NULL, attempts = attempts - 1, owner = NULL, lease_expires_at = NULL "
+                "WHERE id = ? AND status = ? AND owner = ?",
+                [(QUEUED, job_id, RUNNING, owner) for job_id in job_ids],
+            ).rowcount
+            self._conn.commit()
+        return count
+
+    def recover(self) -> Dict[str, int]:
+        """Requeue running jobs whose lease expired; fail those already tried max_attempts times."""
+        now = time.time()
+        with self._lock:
+            failed = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ?, status_code = 500, owner = NULL, lease_expires_at = NULL "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= ?",
+                (FAILED, now, f"Server stopped while running the job ({self.max_attempts} attempts)", RUNNING, now, self.max_attempts),
+            ).rowcount
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires_at = NULL "
+                "WHERE status = ? AND lease_expires_at < ?",
+                (QUEUED, RUNNING, now),
+            ).rowcount
+            self._conn.commit()
+        return {"requeued": requeued, "failed": failed}
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs ORDER BY seq DESC LIMIT ?", (limit,))
+            else:
+                rows = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs WHERE status = ? ORDER BY seq DESC LIMIT ?", (status, limit)
+                )
+            return [self._doc(row) for row in rows.fetchall()]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, *FINISHED)} | dict(rows)
+
+    def _prune(self, before: float) -> None:
+        self._conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (before,))
+        self._conn.commit()
+
+
+class JobQueue:
+    """Runs jobs from a JobStore on the server's event loop with `workers` workers.
+
+    `runner(tool, input)` performs the call (the server passes one that goes
+    through the ToolExecutor). Status changes are pushed to subscribe()rs for
+    SSE. Cancelling a running job cancels its task; a tool already running in
+    a worker thread finishes in the background and its result is dropped.
+    Jobs still running at shutdown are put back in the queue; the leases of
+    jobs running here are renewed every lease_seconds / 3, and jobs of a server
+    that stopped renewing are recovered.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        store: Optional[JobStore] = None,
+        workers: int = MCP_JOB_WORKERS,
+        poll_seconds: float = MCP_JOB_POLL_SECONDS,
+        lease_seconds: float = MCP_JOB_LEASE_SECONDS,
+    ):
+        self.runner = runner
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        # Unique per process and queue, so a restarted server never finishes its predecessor's jobs
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._leases: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancelled: Set[str] = set()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def start(self) -> None:
+        if self.store is None:
+            self.store = await asyncio.to_thread(JobStore)
+        await self._recover()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._leases = asyncio.create_task(self._renew_leases())
+
+    async def stop(self) -> None:
+        for task in (*self._workers, self._leases):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*self._workers, *([self._leases] if self._leases else []), return_exceptions=True)
+        self._workers, self._leases = [], None
+        if self._running:
+            await asyncio.to_thread(self.store.release, self.owner, list(self._running))
+
+    async def _recover(self) -> None:
+        # Jobs whose lease lapsed belonged to a server that is gone
+        recovered = await asyncio.to_thread(self.store.recover)
+        if recovered["requeued"] or recovered["failed"]:
+            print(f"♻️ Recovered interrupted jobs: {recovered['requeued']} requeued, {recovered['failed']} failed")
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    async def _renew_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(self.store.renew, self.owner, self.lease_seconds)
+                await self._recover()
+            except Exception as e:
+                print(f"⚠️ Job lease renewal failed: {e}")
+
+    # ---- client side -----------------------------------------------------
+
+    async def submit(self, tool: str, kwargs: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        job = await asyncio.to_thread(self.store.submit, tool, kwargs, priority)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id, with_result)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        before = await self.get(job_id)
+        if before is None or before["status"] in FINISHED:
+            return before
+        job = await asyncio.to_thread(self.store.cancel, job_id)
+        if job["status"] == CANCELLED:
+            metrics.JOBS_FINISHED.inc(tool=job["tool"], status=CANCELLED)
+            task = self._running.get(job_id)
+            if task is not None:
+                self._cancelled.add(job_id)
+                task.cancel()
+        self._notify(job)
+        return job
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(job_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[job_id]
+
+    def _notify(self, job: Dict[str, Any]) -> None:
+        for queue in self._subscribers.get(job["job_id"], ()):
+            queue.put_nowait(job)
+
+    # ---- workers ---------------------------------------------------------
+
+    async def _worker(self) -> None:
+        while True:
+            # Cleared before claiming, so a submit that races the claim still wakes us
+            self._wakeup.clear()
+            try:
+                job = await asyncio.to_thread(self.store.claim, self.owner, self.lease_seconds)
+            except Exception as e:
+                print(f"⚠️ Job queue error: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Its own task, so cancelling the job does not cancel the worker
+            task = asyncio.create_task(self._run(job))
+            self._running[job["job_id"]] = task
+            try:
+                await asyncio.wait({task})
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                if task.done():
+                    self._running.pop(job["job_id"], None)
+                    self._cancelled.discard(job["job_id"])
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id, tool = job["job_id"], job["tool"]
+        metrics.JOB_WAIT.observe(job["started_at"] - job["created_at"], tool=tool)
+        self._notify({k: v for k, v in job.items() if k != "input"})
+        status, result, error, status_code = SUCCEEDED, None, None, None
+        try:
+            output = await self.runner(tool, job["input"])
+            result = json.dumps(output)
+        except asyncio.CancelledError:
+            if job_id in self._cancelled:
+                self._cancelled.discard(job_id)
+                return  # cancel() already recorded it
+            raise  # server shutdown; stop() releases the job
+        except Exception as e:
+            # HTTPException carries the status the synchronous call would have answered with
+            status = FAILED
+            error = str(getattr(e, "detail", None) or e)
+            status_code = getattr(e, "status_code", 500)
+
+        if await asyncio.to_thread(self.store.finish, job_id, self.owner, status, result, error, status_code):
+            metrics.JOBS_FINISHED.inc(tool=tool, status=status)
+        self._notify(await self.get(job_id))
@@ -1,75 +1,374 @@
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
-from typing import List, Dict, Any
-import importlib.util
+import time
+
+SERVER_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import json
 import os
-import inspect
-from crewai.tools import BaseTool
+import sys
+from pathlib import Path
+
+# Defaults to the repo's tools/ directory
+TOOLS_PATH = os.getenv("MCP_TOOLS_PATH", str(Path(__file__).resolve().parent.parent / "tools"))
+
+# Tools import their shared helpers (tools/shared) as a regular package; the server uses them too
+if TOOLS_PATH not in sys.path:
+    sys.path.insert(0, TOOLS_PATH)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from shared import metrics
+from tool_executor import ToolExecutor, ToolQueueFull
+from tool_registry import ToolRegistry
+from pipeline import DEFAULT_PIPELINE, PipelineError, build_pipeline, run_pipeline
+from job_queue import CANCELLED, FAILED, FINISHED, SUCCEEDED, JobQueue
+
+# "1": import a tool module on its first call; "0": import every tool at startup
+MCP_LAZY_TOOLS = os.getenv("MCP_LAZY_TOOLS", "1") == "1"
+# Tools imported in the background once the server is up: "all" or comma-separated names
+MCP_WARM_TOOLS = os.getenv("MCP_WARM_TOOLS", "")
+# Poll tool files every N seconds and hot-reload edited ones (0 = only via POST /tools/reload)
+MCP_TOOLS_WATCH_SECONDS = float(os.getenv("MCP_TOOLS_WATCH_SECONDS", "0"))
+# Clients may reuse a spec this long before revalidating it with If-None-Match
+MCP_SPEC_MAX_AGE = int(os.getenv("MCP_SPEC_MAX_AGE", "60"))
+# Idle /jobs/{id}/events streams send a comment this often (and re-check jobs run by other processes)
+MCP_SSE_HEARTBEAT_SECONDS = float(os.getenv("MCP_SSE_HEARTBEAT_SECONDS", "15"))
+# Swapped wholesale on reload; handlers read it once per request
+registry: ToolRegistry = None
+reload_lock = asyncio.Lock()
+executor = ToolExecutor()
+startup_timings: Dict[str, Any] = {}
+
+
+async def reload_tools() -> Dict[str, Any]:
+    """Re-import edited tool files and swap in the new registry.
+
+    Only tool modules are re-executed; tools/shared stays imported, so browser
+    pools, HTTP clients and caches survive the reload.
+    """
+    global registry
+    async with reload_lock:
+        start = time.perf_counter()
+        fresh, changes = await asyncio.to_thread(registry.reload)
+        registry = fresh
+    changes["seconds"] = round(time.perf_counter() - start, 4)
+    changed = [os.path.basename(p) for key in ("added", "changed", "removed") for p in changes[key]]
+    if changed:
+        print(f"🔄 Reloaded tools in {changes['seconds']:.2f}s: {', '.join(changed)}")
+    return changes
+
+
+async def watch_tools(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if registry.changed_files():
+                await reload_tools()
+        except Exception as e:
+            print(f"⚠️ Tool reload failed: {e}")
+
+
+async def start_process_pool(sources: List[str]) -> None:
+    # Starting the forkserver imports PROCESS_PRELOAD and every worker imports the
+    # cpu_bound tools, so it runs after the server is ready; until the pool is up,
+    # lane() sends cpu_bound tools to threads
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(executor.start_process_pool, sources)
+        startup_timings["process_pool_seconds"] = round(time.perf_counter() - started, 4)
+        print(f"⚙️ Started {executor.process_workers} tool worker processes in {startup_timings['process_pool_seconds']:.2f}s")
+    except Exception as e:
+        print(f"⚠️ Tool worker processes failed to start, cpu_bound tools run on threads: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_timings["ready_seconds"] = round(time.perf_counter() - SERVER_IMPORT_STARTED, 4)
+    print(f"🚀 Server ready in {startup_timings['ready_seconds']:.2f}s ({len(registry.names())} tools, {len(registry.loaded)} imported)")
+    if MCP_WARM_TOOLS:
+        names = None if MCP_WARM_TOOLS == "all" else [n.strip() for n in MCP_WARM_TOOLS.split(",") if n.strip()]
+        started = time.perf_counter()
+        thread = registry.warm_up(names)
+
+        def record_warm_up():
+            thread.join()
+            startup_timings["warm_up_seconds"] = round(time.perf_counter() - started, 4)
+            print(f"🔥 Warmed up {len(registry.loaded)} tools in {startup_timings['warm_up_seconds']:.2f}s")
 
-TOOLS_PATH = "C:/Users/hp/Documents/MCP Server/tools"  # Path to your tools
-app = FastAPI()
-loaded_tools = {}
+        asyncio.get_running_loop().run_in_executor(None, record_warm_up)
+    process_sources = list(registry.cpu_bound_sources().values())
+    pool_starter = None
+    if process_sources and executor.process_workers > 0:
+        pool_starter = asyncio.create_task(start_process_pool(process_sources))
+    watcher = asyncio.create_task(watch_tools(MCP_TOOLS_WATCH_SECONDS)) if MCP_TOOLS_WATCH_SECONDS > 0 else None
+    await jobs.start()
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await jobs.stop()
+    if pool_starter is not None:
+        # A pool still starting up would be created after executor.shutdown() and leak
+        await pool_starter
+    executor.shutdown()
 
-# Load all tools from TOOLS_PATH
+app = FastAPI(lifespan=lifespan)
+
+# Discover tools in TOOLS_PATH; modules are imported when first called (or now, if not lazy)
 def load_tools():
-    global loaded_tools
-    loaded_tools = {}
-
-    for filename in os.listdir(TOOLS_PATH):
-        if filename.endswith(".py") and not filename.startswith("__"):
-            module_name = filename[:-3]
-            file_path = os.path.join(TOOLS_PATH, filename)
-            spec = importlib.util.spec_from_file_location(module_name, file_path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-
-            # Look for instances of BaseTool (already instantiated)
-            for name, obj in inspect.getmembers(module):
-                if isinstance(obj, BaseTool):
-                    loaded_tools[obj.name] = obj
+    global registry
+
+    registry = ToolRegistry(TOOLS_PATH)
+    registry.scan()
+    if not MCP_LAZY_TOOLS:
+        registry.load_all()
 
 # Initial load
 load_tools()
+startup_timings["load_tools_seconds"] = round(time.perf_counter() - SERVER_IMPORT_STARTED, 4)
+
+async def resolve_tool(tools: ToolRegistry, name: str):
+    # First call to a tool pays for its import, off the event loop
+    if name in tools.loaded:
+        return tools.loaded[name]
+    try:
+        return await asyncio.to_thread(tools.get, name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load tool '{name}': {e}")
 
 @app.get("/tools/list")
 def list_tools() -> List[str]:
-    return list(loaded_tools.keys())
+    return registry.names()
+
+def cached_json(request: Request, document: Tuple[str, bytes]) -> Response:
+    etag, body = document
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={MCP_SPEC_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 @app.get("/tools/spec")
-def tool_spec(tool: str = Query(..., description="Tool name")):
-    if tool not in loaded_tools:
+def tool_spec(request: Request, tool: str = Query(..., description="Tool name")):
+    tools = registry
+    if tool not in tools:
         raise HTTPException(status_code=404, detail="Tool not found")
 
-    tool_obj = loaded_tools[tool]
-    schema = tool_obj.args_schema
-    args_fields = {}
-
-    for field_name, field in schema.model_fields.items():  # Pydantic v2
-        field_type = str(field.annotation.__name__) if hasattr(field.annotation, "__name__") else str(field.annotation)
-        args_fields[field_name] = {
-            "type": field_type,
-            "description": field.description or ""
-        }
+    # The first request for a never-imported tool imports it to build the JSON Schema
+    try:
+        return cached_json(request, tools.spec_document(tool))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load tool '{tool}': {e}")
 
-    return {
-        "name": tool_obj.name,
-        "description": tool_obj.description,
-        "args_schema": args_fields
-    }
+@app.get("/tools/specs")
+def tool_specs(request: Request):
+    # Every tool's spec in one response, for agents that fetch them all at session start
+    try:
+        return cached_json(request, registry.specs_document())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load tool specs: {e}")
 
 class ToolCall(BaseModel):
     tool: str
     input: Dict[str, Any]
 
-@app.post("/tools/call")
-def call_tool(body: ToolCall):
-    if body.tool not in loaded_tools:
+class BatchCall(BaseModel):
+    calls: List[ToolCall]
+    parallelism: int = Field(4, ge=1, le=64, description="Maximum number of calls running at once")
+    stream: bool = Field(False, description="Stream results as NDJSON in completion order")
+
+class JobSubmit(ToolCall):
+    priority: int = Field(0, ge=-100, le=100, description="Higher-priority jobs run first; ties run in submission order")
+
+class PipelineRun(BaseModel):
+    urls: List[str]
+    stages: List[str] = Field(default_factory=lambda: list(DEFAULT_PIPELINE), description="Tools to chain; order is inferred from their inputs/outputs")
+    concurrency: int = Field(4, ge=1, le=64, description="Maximum number of URLs in flight at once")
+    write_artifacts: bool = Field(False, description="Also write each stage's output file to disk")
+    skip_unchanged: bool = Field(True, description="Skip stages downstream of a source whose content has not changed since the last run")
+
+async def execute_call(body: ToolCall, wait: bool = False) -> Any:
+    tools = registry
+    if body.tool not in tools:
         raise HTTPException(status_code=404, detail="Tool not found")
 
-    tool_obj = loaded_tools[body.tool]
+    # A reload during the call swaps the registry; this call keeps its tool instance
+    tool_obj = await resolve_tool(tools, body.tool)
 
     try:
-        result = tool_obj.run(**body.input)
-        return {"output": result}
+        return await executor.run(tool_obj, body.input, tools.source(body.tool), wait=wait)
+    except ToolQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+async def run_job(tool: str, kwargs: Dict[str, Any]) -> Any:
+    # Jobs wait for a slot in the tool's lane instead of failing with 429
+    return jsonable_encoder(await execute_call(ToolCall(tool=tool, input=kwargs), wait=True))
+
+jobs = JobQueue(run_job)
+
+@app.post("/tools/call")
+async def call_tool(body: ToolCall):
+    result = await execute_call(body)
+    return {"output": result}
+
+@app.post("/tools/batch")
+async def batch_call(body: BatchCall):
+    semaphore = asyncio.Semaphore(body.parallelism)
+
+    async def run_item(index: int, call: ToolCall) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                output = await execute_call(call)
+                return {"index": index, "tool": call.tool, "output": output}
+            except HTTPException as e:
+                return {"index": index, "tool": call.tool, "error": e.detail, "status_code": e.status_code}
+
+    tasks = [asyncio.ensure_future(run_item(i, call)) for i, call in enumerate(body.calls)]
+
+    if body.stream:
+        async def ndjson():
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    item = await next_done
+                    yield json.dumps(jsonable_encoder(item)) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    results = await asyncio.gather(*tasks)
+    return {"results": results}
+
+@app.get("/tools/stats")
+def tool_stats() -> Dict[str, Dict[str, Any]]:
+    # Per-tool in-flight/queued counts for sizing the pools (imported tools only)
+    return {name: executor.lane(tool_obj).stats() for name, tool_obj in dict(registry.loaded).items()}
+
+@app.post("/tools/reload")
+async def tools_reload() -> Dict[str, Any]:
+    return await reload_tools()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    # Prometheus text format; process-mode tools record their spans in worker processes, not here
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm/usage")
+def llm_usage() -> Dict[str, Any]:
+    # The gateway is imported by the first LLM tool that loads; until then nothing has been used
+    gateway_module = sys.modules.get("shared.llm_gateway")
+    if gateway_module is None:
+        return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "in_flight": 0, "by_tool": {}}
+    return gateway_module.get_gateway().usage()
+
+@app.get("/artifacts/stats")
+def artifacts_stats() -> Dict[str, Any]:
+    from shared.artifact_store import get_artifact_store
+
+    return get_artifact_store().stats()
+
+@app.post("/artifacts/gc")
+async def artifacts_gc() -> Dict[str, Any]:
+    from shared.artifact_store import get_artifact_store
+
+    # Deletes files under the index lock; keep it off the event loop
+    return await asyncio.to_thread(get_artifact_store().gc)
+
+@app.post("/jobs", status_code=202)
+async def jobs_submit(body: JobSubmit) -> Dict[str, Any]:
+    if body.tool not in registry:
+        raise HTTPException(status_code=404, detail="Tool not found")
+    return await jobs.submit(body.tool, body.input, body.priority)
+
+@app.get("/jobs")
+async def jobs_list(status: Optional[str] = Query(None, description="Only jobs in this status"), limit: int = Query(50, ge=1, le=1000)) -> Dict[str, Any]:
+    # Newest first, without results
+    listed = await asyncio.to_thread(jobs.store.list, status, limit)
+    return {"counts": await asyncio.to_thread(jobs.store.counts), "jobs": listed}
+
+async def get_job(job_id: str, with_result: bool = False) -> Dict[str, Any]:
+    job = await jobs.get(job_id, with_result)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def jobs_status(job_id: str) -> Dict[str, Any]:
+    return await get_job(job_id)
+
+@app.get("/jobs/{job_id}/result")
+async def jobs_result(job_id: str):
+    job = await get_job(job_id, with_result=True)
+    if job["status"] == SUCCEEDED:
+        return {"output": job.get("result")}
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=job["status_code"] or 500, detail=job["error"])
+    if job["status"] == CANCELLED:
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    # Not finished yet: same body as the status endpoint, poll again later
+    return JSONResponse(jsonable_encoder(job), status_code=202, headers={"Retry-After": "1"})
+
+@app.get("/jobs/{job_id}/events")
+async def jobs_events(job_id: str):
+    # Subscribe before reading the status so no change falls in between
+    updates = jobs.subscribe(job_id)
+    try:
+        job = await get_job(job_id)
+    except HTTPException:
+        jobs.unsubscribe(job_id, updates)
+        raise
+
+    def event(current: Dict[str, Any]) -> str:
+        return f"event: status\ndata: {json.dumps(jsonable_encoder(current))}\n\n"
+
+    async def stream():
+        current = job
+        try:
+            yield event(current)
+            while current["status"] not in FINISHED:
+                try:
+                    update = await asyncio.wait_for(updates.get(), MCP_SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # A job run by another server process sends no updates here
+                    update = await jobs.get(job_id)
+                    if update is None:
+                        break  # pruned
+                    if update["status"] == current["status"]:
+                        yield ": keep-alive\n\n"
+                        continue
+                current = update
+                yield event(current)
+        finally:
+            jobs.unsubscribe(job_id, updates)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.delete("/jobs/{job_id}")
+async def jobs_cancel(job_id: str) -> Dict[str, Any]:
+    # Finished jobs are returned unchanged
+    job = await jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/server/startup")
+def server_startup() -> Dict[str, Any]:
+    # Import-to-ready timings and which tools have been imported so far
+    return {**startup_timings, "lazy": MCP_LAZY_TOOLS, "registry": registry.stats()}
+
+@app.post("/pipelines/run")
+async def pipelines_run(body: PipelineRun):
+    current = registry
+    tools = {name: await resolve_tool(current, name) for name in dict.fromkeys(body.stages) if name in current}
+    try:
+        stages = build_pipeline(body.stages, tools, current.sources())
+    except PipelineError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await run_pipeline(body.urls, stages, executor, body.concurrency, body.write_artifacts, body.skip_unchanged)
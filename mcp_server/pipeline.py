@@ -0,0 +1,235 @@
+import asyncio
+import json
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from tool_executor import ToolExecutor
+
+if TYPE_CHECKING:
+    from crewai.tools import BaseTool
+
+# scraper -> html_extractor (cleans while extracting) -> llm_extractor -> llm_exclusion;
+# add "cleaner_tool" to also produce cleaned_html, on a branch parallel to extraction
+DEFAULT_PIPELINE = [
+    "scraper_tool",
+    "html_extractor_tool",
+    "llm_extractor_tool",
+    "llm_exclusion_tool",
+]
+
+# Values every URL starts with; everything else must be produced by a stage
+SEED_KEYS = ("url",)
+
+
+class PipelineError(ValueError):
+    """Raised when the requested stages do not form a valid pipeline."""
+
+
+class PipelineStage:
+    def __init__(self, tool_obj: "BaseTool", source_file: Optional[str]):
+        self.name = tool_obj.name
+        self.tool_obj = tool_obj
+        self.source_file = source_file
+        self.consumes = tuple(getattr(tool_obj, "consumes", ()))
+        self.produces = tuple(getattr(tool_obj, "produces", ()))
+        self.depends_on: List[str] = []
+
+
+def build_pipeline(
+    stage_names: List[str], tools: Dict[str, "BaseTool"], sources: Dict[str, str]
+) -> List[PipelineStage]:
+    """Resolve stage names into a DAG ordered so every stage follows its producers.
+
+    Edges come from data flow: a stage depends on whichever stage produces each
+    key in its `consumes`, so independent branches (e.g. two consumers of
+    cleaned_html) run side by side.
+    """
+    if not stage_names:
+        raise PipelineError("Pipeline has no stages")
+    if len(set(stage_names)) != len(stage_names):
+        raise PipelineError("Pipeline stages must be unique")
+
+    stages = []
+    producers: Dict[str, str] = {}
+    for name in stage_names:
+        if name not in tools:
+            raise PipelineError(f"Tool not found: {name}")
+        tool_obj = tools[name]
+        if not callable(getattr(tool_obj, "run_in_memory", None)):
+            raise PipelineError(f"{name} does not support in-memory pipeline execution")
+        stage = PipelineStage(tool_obj, sources.get(name))
+        for key in stage.produces:
+            if key in producers:
+                raise PipelineError(f"{key} is produced by both {producers[key]} and {name}")
+            producers[key] = name
+        stages.append(stage)
+
+    for stage in stages:
+        for key in stage.consumes:
+            if key in SEED_KEYS:
+                continue
+            if key not in producers:
+                raise PipelineError(f"{stage.name} needs '{key}' but no stage produces it")
+            if producers[key] not in stage.depends_on:
+                stage.depends_on.append(producers[key])
+
+    # Kahn's algorithm; anything left over is part of a cycle
+    ordered, placed = [], set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(d in placed for d in s.depends_on)]
+        if not ready:
+            raise PipelineError(f"Pipeline has a cycle between: {[s.name for s in remaining]}")
+        for stage in ready:
+            ordered.append(stage)
+            placed.add(stage.name)
+            remaining.remove(stage)
+    return ordered
+
+
+def _json_safe(value: Any) -> Any:
+    # DataFrames go out as records (NaN -> null); everything else is left to FastAPI
+    if hasattr(value, "to_json") and hasattr(value, "columns"):
+        return json.loads(value.to_json(orient="records"))
+    return value
+
+
+# Stage task outcomes
+OK, FAILED, UNCHANGED = "ok", "failed", "unchanged"
+
+
+def incomplete_output(output: Dict[str, Any]) -> Optional[str]:
+    # LLM tools keep what they got instead of raising when calls fail; report it as an error so
+    # the page's fetch state is forgotten and the next run does not skip it as unchanged
+    chunking = output.get("chunking") or {}
+    lost = chunking.get("failed_chunks", 0) + chunking.get("truncated_chunks", 0)
+    if lost:
+        return f"incomplete: {lost} of {chunking.get('chunks', lost)} chunks failed or were truncated"
+    if output.get("llm_errors"):
+        return f"incomplete: {output['llm_errors']} rows could not be classified"
+    return None
+
+
+async def run_url(
+    url: str, stages: List[PipelineStage], executor: ToolExecutor, write_artifacts: bool, skip_unchanged: bool = True
+) -> Dict[str, Any]:
+    data: Dict[str, Any] = {"url": url}
+    timings: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    skipped: List[str] = []
+    unchanged: List[str] = []
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_stage(stage: PipelineStage) -> str:
+        deps = await asyncio.gather(*(tasks[d] for d in stage.depends_on))
+        if FAILED in deps:
+            errors.setdefault(stage.name, "skipped: upstream stage failed")
+            return FAILED
+        if UNCHANGED in deps:
+            # Source content is the same as last run; downstream results would be too
+            skipped.append(stage.name)
+            return UNCHANGED
+
+        kwargs = {key: data[key] for key in stage.consumes}
+        kwargs["write_artifacts"] = write_artifacts
+        start = time.perf_counter()
+        try:
+            output = await executor.run(stage.tool_obj, kwargs, stage.source_file, "run_in_memory", wait=True)
+        except Exception as e:
+            errors[stage.name] = str(e)
+            return FAILED
+        finally:
+            timings[stage.name] = round(time.perf_counter() - start, 4)
+        data.update(output)
+        incomplete = incomplete_output(output)
+        if incomplete:
+            # Partial results still flow downstream, but the run counts as failed
+            errors[stage.name] = incomplete
+        if output.get("unchanged"):
+            unchanged.append(stage.name)
+            if skip_unchanged:
+                return UNCHANGED
+        return OK
+
+    start = time.perf_counter()
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+    await asyncio.gather(*tasks.values())
+
+    if errors:
+        # The source was recorded as seen when it was fetched; forget it so the
+        # next run does not skip a page whose downstream stages never finished
+        for stage in stages:
+            forget = getattr(stage.tool_obj, "forget_fetch_state", None)
+            if callable(forget) and stage.name in timings and stage.name not in errors:
+                # A SQLite delete; kept off the event loop like the other fetch-state calls
+                await asyncio.to_thread(forget, url)
+
+    consumed = {key for stage in stages for key in stage.consumes}
+    outputs = {
+        key: _json_safe(data[key])
+        for stage in stages
+        for key in stage.produces
+        if key not in consumed and key in data
+    }
+    # Paths and handles (path, size, sha256) of the files stages wrote
+    artifacts = {key: value for key, value in data.items() if key.endswith(("_file", "_artifact"))}
+
+    return {
+        "url": url,
+        "ok": not errors,
+        "unchanged": bool(unchanged),
+        "skipped": skipped,
+        "outputs": outputs,
+        "artifacts": artifacts,
+        "timings": timings,
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "errors": errors,
+    }
+
+
+def summarize_timings(results: List[Dict[str, Any]], stages: List[PipelineStage]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for stage in stages:
+        samples = [r["timings"][stage.name] for r in results if stage.name in r["timings"]]
+        if not samples:
+            continue
+        summary[stage.name] = {
+            "count": len(samples),
+            "total_seconds": round(sum(samples), 4),
+            "mean_seconds": round(sum(samples) / len(samples), 4),
+            "max_seconds": round(max(samples), 4),
+        }
+    return summary
+
+
+async def run_pipeline(
+    urls: List[str],
+    stages: List[PipelineStage],
+    executor: ToolExecutor,
+    concurrency: int = 4,
+    write_artifacts: bool = False,
+    skip_unchanged: bool = True,
+) -> Dict[str, Any]:
+    """Push every URL through the stage DAG, `concurrency` URLs at a time.
+
+    Stages of different URLs overlap freely; how many calls of one stage run at
+    once is bounded by that tool's executor lane, same as for /tools/call.
+    When a stage reports "unchanged": True, everything downstream of it is
+    skipped for that URL unless skip_unchanged is False.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(url: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await run_url(url, stages, executor, write_artifacts, skip_unchanged)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(url) for url in urls))
+    return {
+        "stages": [{"tool": s.name, "depends_on": s.depends_on} for s in stages],
+        "results": results,
+        "unchanged_urls": sum(r["unchanged"] for r in results),
+        "stage_timings": summarize_timings(results, stages),
+        "wall_seconds": round(time.perf_counter() - start, 4),
+    }
@@ -0,0 +1,316 @@
+import asyncio
+import contextvars
+import functools
+import importlib.util
+import inspect
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+from shared import metrics
+
+if TYPE_CHECKING:
+    # crewai takes seconds to import; the server only needs it once a tool is loaded
+    from crewai.tools import BaseTool
+
+# Defaults for every tool; override per tool with MCP_TOOL_LIMITS, e.g.
+# MCP_TOOL_LIMITS='{"scraper_tool": {"max_concurrency": 8}, "llm_exclusion_tool": {"mode": "process"}}'
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "4"))
+DEFAULT_MAX_QUEUE = int(os.getenv("MCP_TOOL_QUEUE", "32"))
+TOOL_LIMITS: Dict[str, Dict[str, Any]] = json.loads(os.getenv("MCP_TOOL_LIMITS", "{}"))
+# Worker processes shared by every process-mode tool; tools declaring cpu_bound = True
+# run there by default. 0 = no shared pool (cpu_bound tools run on threads).
+MCP_PROCESS_WORKERS = int(os.getenv("MCP_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+# Imported once by the forkserver, so every worker forked from it starts with them loaded
+PROCESS_PRELOAD = ("crewai.tools", "bs4", "lxml.html", "pandas", "shared.metrics", "shared.html_engine")
+
+EXECUTION_MODES = ("auto", "async", "thread", "process")
+
+
+class ToolQueueFull(Exception):
+    """Raised when a tool already has `max_queue` calls waiting for a slot."""
+
+
+def is_async_tool(tool_obj: "BaseTool") -> bool:
+    from crewai.tools import BaseTool
+
+    # crewai tools are async-capable when they override BaseTool._arun
+    return type(tool_obj)._arun is not BaseTool._arun
+
+
+# Process workers load tool modules by path once and keep them for later calls,
+# re-importing when the file's mtime changes (the server hot-reloaded it)
+_process_tools: Dict[str, "BaseTool"] = {}
+_process_versions: Dict[str, int] = {}
+
+
+def _load_in_process(source_file: str) -> None:
+    from crewai.tools import BaseTool
+
+    version = os.stat(source_file).st_mtime_ns
+    module_name = os.path.splitext(os.path.basename(source_file))[0]
+    spec = importlib.util.spec_from_file_location(module_name, source_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for _, obj in inspect.getmembers(module):
+        if isinstance(obj, BaseTool):
+            _process_tools[obj.name] = obj
+    _process_versions[source_file] = version
+
+
+def _init_process_worker(source_files: Iterable[str]) -> None:
+    # Import the tools before the first call reaches this worker
+    for source_file in source_files:
+        try:
+            _load_in_process(source_file)
+        except Exception as e:
+            print(f"⚠️ Worker {os.getpid()} failed to import {source_file}: {e}")
+
+
+def _run_in_process(source_file: str, tool_name: str, method: str, kwargs: Dict[str, Any]) -> Any:
+    tool_obj = _process_tools.get(tool_name)
+    if tool_obj is None or _process_versions.get(source_file) != os.stat(source_file).st_mtime_ns:
+        _load_in_process(source_file)
+        tool_obj = _process_tools[tool_name]
+    # Label artifact refs and spans with the tool, as the server does for thread calls
+    token = metrics.current_tool.set(tool_name)
+    try:
+        return getattr(tool_obj, method)(**kwargs)
+    finally:
+        metrics.current_tool.reset(token)
+
+
+class ToolLane:
+    """Concurrency limit, wait queue and worker pool for one tool.
+
+    Process lanes send only `run` calls to worker processes. In-memory
+    methods (run_in_memory) take and return page strings, parsed text and
+    DataFrames, so they run on the lane's threads in this process rather
+    than being pickled to a worker and back.
+    """
+
+    def __init__(
+        self, name: str, mode: str, max_concurrency: int, max_queue: int, shared_pool: Optional[Executor] = None
+    ):
+        if mode not in EXECUTION_MODES or mode == "auto":
+            raise ValueError(f"Invalid execution mode for {name}: {mode}")
+        self.name = name
+        self.mode = mode
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.in_flight = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pool: Optional[Executor] = None
+        # The executor's process pool; owned (and shut down) by the executor, not the lane
+        self._shared_pool = shared_pool
+        # Process lanes only: threads for the in-memory methods
+        self._threads: Optional[ThreadPoolExecutor] = None
+
+    def _get_pool(self) -> Executor:
+        if self._shared_pool is not None:
+            return self._shared_pool
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_concurrency)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix=f"tool-{self.name}"
+                )
+        return self._pool
+
+    def _get_thread_pool(self) -> Executor:
+        if self.mode != "process":
+            return self._get_pool()
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"tool-{self.name}")
+        return self._threads
+
+    async def run(
+        self,
+        tool_obj: "BaseTool",
+        kwargs: Dict[str, Any],
+        source_file: Optional[str] = None,
+        method: str = "run",
+        wait: bool = False,
+    ) -> Any:
+        # wait=True queues past max_queue instead of rejecting (for server-internal callers)
+        if not wait and self._semaphore.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            metrics.TOOL_REJECTED.inc(tool=self.name)
+            raise ToolQueueFull(
+                f"{self.name} is at capacity ({self.in_flight} running, {self.queued} queued)"
+            )
+
+        self.queued += 1
+        metrics.TOOL_QUEUED.inc(tool=self.name)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+            metrics.TOOL_QUEUED.dec(tool=self.name)
+
+        self.in_flight += 1
+        try:
+            with metrics.tool_call(self.name):
+                result = await self._dispatch(tool_obj, kwargs, source_file, method)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def _dispatch(
+        self, tool_obj: "BaseTool", kwargs: Dict[str, Any], source_file: Optional[str], method: str
+    ) -> Any:
+        if self.mode == "async":
+            # run -> arun, run_in_memory -> arun_in_memory, ...; falls back to the pool if missing
+            async_method = tool_obj.arun if method == "run" else getattr(tool_obj, f"a{method}", None)
+            if async_method is not None:
+                return await async_method(**kwargs)
+
+        loop = asyncio.get_running_loop()
+        if self.mode == "process" and method == "run":
+            if source_file is None:
+                raise RuntimeError(f"{self.name} has no source file to load in a worker process")
+            return await loop.run_in_executor(
+                self._get_pool(), _run_in_process, source_file, self.name, method, kwargs
+            )
+        # Copy the context so spans in the worker thread are labelled with this tool
+        call = functools.partial(contextvars.copy_context().run, getattr(tool_obj, method), **kwargs)
+        return await loop.run_in_executor(self._get_thread_pool(), call)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "shared_pool": self._shared_pool is not None,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        for pool in (self._pool, self._threads):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._threads = None
+
+    def retire(self) -> None:
+        # Replaced by a new lane: let submitted work finish, then release the workers
+        for pool in (self._pool, self._threads):
+            if pool is not None:
+                pool.shutdown(wait=False)
+
+
+class ToolExecutor:
+    """Runs tool calls on the server's event loop without tying up Starlette's threadpool.
+
+    Async-capable tools are awaited directly; blocking tools go to a bounded
+    per-tool thread pool. Once start_process_pool() has run, tools declaring
+    `cpu_bound = True` (and tools configured with mode "process") send their
+    `run` calls to one shared pool of `process_workers` processes instead, so
+    parsing is not serialized by the GIL. Each tool
+    admits `max_concurrency` calls at once and at most `max_queue` waiting
+    callers; beyond that calls are rejected with ToolQueueFull so the server
+    can answer 429.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, Any]]] = None, process_workers: int = MCP_PROCESS_WORKERS):
+        self.limits = TOOL_LIMITS if limits is None else limits
+        self.process_workers = max(0, process_workers)
+        self._lanes: Dict[str, ToolLane] = {}
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._process_pool_lock = threading.Lock()
+
+    def start_process_pool(self, preload_sources: Iterable[str] = ()) -> Optional[ProcessPoolExecutor]:
+        """Create the shared worker-process pool once and block until every worker is up.
+
+        Workers are forked from a forkserver that has PROCESS_PRELOAD imported
+        (spawned and importing them where there is no forkserver, e.g. Windows),
+        then each imports `preload_sources` before taking calls. The server
+        calls this in the background once it is ready; until it returns,
+        cpu_bound tools run on threads. Returns None if process_workers is 0.
+        """
+        with self._process_pool_lock:
+            if self._process_pool is not None or self.process_workers == 0:
+                return self._process_pool
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(list(PROCESS_PRELOAD))
+            else:
+                context = multiprocessing.get_context("spawn")
+            pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=context,
+                initializer=_init_process_worker,
+                initargs=(tuple(dict.fromkeys(preload_sources)),),
+            )
+            try:
+                # ProcessPoolExecutor starts a worker per submit while none is idle
+                for future in [pool.submit(os.getpid) for _ in range(self.process_workers)]:
+                    future.result()
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            self._process_pool = pool
+            return pool
+
+    def lane(self, tool_obj: "BaseTool") -> ToolLane:
+        config = self.limits.get(tool_obj.name, {})
+        mode = config.get("mode", "auto")
+        if mode == "auto":
+            if getattr(tool_obj, "cpu_bound", False) and self._process_pool is not None:
+                mode = "process"
+            else:
+                mode = "async" if is_async_tool(tool_obj) else "thread"
+        lane = self._lanes.get(tool_obj.name)
+        if lane is not None and lane.mode != mode:
+            # A reloaded tool gained or lost _arun; calls already in the old lane finish there
+            lane.retire()
+            lane = None
+        if lane is None:
+            shared_pool = self._process_pool if mode == "process" else None
+            # A process-mode tool may keep the whole shared pool busy
+            default_concurrency = self.process_workers if shared_pool is not None else DEFAULT_MAX_CONCURRENCY
+            lane = ToolLane(
+                tool_obj.name,
+                mode,
+                config.get("max_concurrency", default_concurrency),
+                config.get("max_queue", DEFAULT_MAX_QUEUE),
+                shared_pool,
+            )
+            self._lanes[tool_obj.name] = lane
+        return lane
+
+    async def run(
+        self,
+        tool_obj: "BaseTool",
+        kwargs: Dict[str, Any],
+        source_file: Optional[str] = None,
+        method: str = "run",
+        wait: bool = False,
+    ) -> Any:
+        return await self.lane(tool_obj).run(tool_obj, kwargs, source_file, method, wait)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: lane.stats() for name, lane in self._lanes.items()}
+
+    def shutdown(self) -> None:
+        for lane in self._lanes.values():
+            lane.shutdown()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
@@ -0,0 +1,416 @@
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from crewai.tools import BaseTool
+
+# Names, descriptions and arg schemas read from tool sources without importing
+# them; cached per file (keyed by mtime and size) so restarts skip the parse.
+# Each tool's full JSON Schema is added once the tool has been imported.
+TOOL_MANIFEST_PATH = Path(os.getenv("MCP_TOOL_MANIFEST", "regulatory_outputs/tool_manifest.json"))
+MANIFEST_VERSION = 3
+
+
+def _constant(node: Optional[ast.AST]) -> Any:
+    return node.value if isinstance(node, ast.Constant) else None
+
+
+def _type_name(annotation: ast.AST) -> str:
+    # Same as the imported spec: generics report their origin name (Optional[str] -> "Optional")
+    if isinstance(annotation, ast.Subscript):
+        return ast.unparse(annotation.value).split(".")[-1]
+    return ast.unparse(annotation)
+
+
+def _field_spec(node: ast.AnnAssign) -> Dict[str, Any]:
+    # x: T = Field(default, description="...")  or  x: T = default
+    description = ""
+    if isinstance(node.value, ast.Call) and getattr(node.value.func, "id", None) == "Field":
+        for keyword in node.value.keywords:
+            if keyword.arg == "description":
+                description = _constant(keyword.value) or ""
+    return {"type": _type_name(node.annotation), "description": description}
+
+
+def _class_assignments(class_node: ast.ClassDef) -> Dict[str, ast.AST]:
+    values = {}
+    for node in class_node.body:
+        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.value is not None:
+            values[node.target.id] = node.value
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    values[target.id] = node.value
+    return values
+
+
+def scan_tool_file(path: str) -> Optional[List[Dict[str, Any]]]:
+    """Describe the tool instances a module defines, from its AST alone.
+
+    Returns None when the file cannot be described statically (e.g. a computed
+    tool name); such files are imported at startup instead.
+    """
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"), filename=path)
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+
+    def is_tool_class(name: str, seen=()) -> bool:
+        node = classes.get(name)
+        if node is None or name in seen:
+            return False
+        base_names = [ast.unparse(base).split(".")[-1] for base in node.bases]
+        return "BaseTool" in base_names or any(is_tool_class(b, (*seen, name)) for b in base_names)
+
+    # Only instantiated tools are registered, same as the eager loader
+    instantiated = [
+        node.value.func.id
+        for node in tree.body
+        if isinstance(node, ast.Assign)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Name)
+        and is_tool_class(node.value.func.id)
+    ]
+
+    tools = []
+    for class_name in dict.fromkeys(instantiated):
+        values = _class_assignments(classes[class_name])
+        name = _constant(values.get("name"))
+        description = _constant(values.get("description")) if "description" in values else ""
+        if not isinstance(name, str) or not isinstance(description, str):
+            return None
+        args = {}
+        schema_node = values.get("args_schema")
+        if isinstance(schema_node, ast.Name) and schema_node.id in classes:
+            for node in classes[schema_node.id].body:
+                if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+                    if not ast.unparse(node.annotation).startswith("ClassVar"):
+                        args[node.target.id] = _field_spec(node)
+        elif schema_node is not None:
+            return None
+        tools.append({
+            "name": name,
+            "description": description,
+            "args_schema": args,
+            "cpu_bound": _constant(values.get("cpu_bound")) is True,
+        })
+    return tools
+
+
+class ToolRegistry:
+    """Tool catalogue that imports each tool module on first use.
+
+    scan() fills in names and specs without importing anything; get() imports
+    the tool's module (once, under a per-file lock) and returns the instance.
+    A registry is never changed by a reload: reload() builds a new one for the
+    caller to swap in, so calls holding the old one finish undisturbed.
+    """
+
+    def __init__(self, tools_path: str, manifest_path: Path = TOOL_MANIFEST_PATH):
+        self.tools_path = tools_path
+        self.manifest_path = Path(manifest_path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.loaded: Dict[str, "BaseTool"] = {}
+        self.import_seconds: Dict[str, float] = {}
+        self.scan_seconds = 0.0
+        self.file_stats: Dict[str, Tuple[int, int]] = {}
+        # Versions of files whose reload failed; not retried until edited again
+        self.failed_stats: Dict[str, Tuple[int, int]] = {}
+        self._loaded_files: set = set()
+        self._file_locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        # Serialized spec responses: name -> (etag, body); None key for the bulk document
+        self._documents: Dict[Optional[str], Tuple[str, bytes]] = {}
+
+    # ---- discovery -------------------------------------------------------
+
+    def tool_files(self) -> List[str]:
+        return sorted(
+            os.path.join(self.tools_path, filename)
+            for filename in os.listdir(self.tools_path)
+            if filename.endswith(".py") and not filename.startswith("__")
+        )
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return manifest.get("files", {}) if manifest.get("version") == MANIFEST_VERSION else {}
+
+    def _write_manifest(self, files: Dict[str, Any]) -> None:
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.manifest_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "files": files}, indent=1), encoding="utf-8")
+            os.replace(tmp, self.manifest_path)
+        except OSError as e:
+            print(f"⚠️ Could not write tool manifest {self.manifest_path}: {e}")
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed_files(self) -> List[str]:
+        """Tool files added, edited or removed since this registry was scanned."""
+        current = {}
+        for path in self.tool_files():
+            try:
+                current[path] = self._stat(path)
+            except FileNotFoundError:
+                continue
+        return sorted(
+            path for path in current.keys() | self.file_stats.keys()
+            if current.get(path) != self.file_stats.get(path)
+            and not (path in self.failed_stats and current.get(path) == self.failed_stats[path])
+        )
+
+    def scan(self, previous: Optional["ToolRegistry"] = None) -> None:
+        """Discover tools; with `previous`, reuse its imported instances for unchanged files."""
+        start = time.perf_counter()
+        cached = self._read_manifest()
+        files: Dict[str, Any] = {}
+        dynamic = []
+        for path in self.tool_files():
+            stat = os.stat(path)
+            self.file_stats[path] = (stat.st_mtime_ns, stat.st_size)
+            if previous is not None and previous.file_stats.get(path) == self.file_stats[path]:
+                self._adopt(previous, path)
+            entry = cached.get(path)
+            if not entry or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                try:
+                    tools = scan_tool_file(path)
+                except SyntaxError as e:
+                    print(f"⚠️ Skipping {path}: {e}")
+                    continue
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "tools": tools}
+            files[path] = entry
+            if entry["tools"] is None:
+                dynamic.append(path)
+                continue
+            for tool in entry["tools"]:
+                self.entries[tool["name"]] = {**tool, "source_file": path}
+        if files != cached:
+            with self._manifest_lock:
+                self._write_manifest(files)
+        self.scan_seconds = time.perf_counter() - start
+
+        # Files the scan could not describe are imported now so their tools are listed
+        for path in dynamic:
+            self.load_file(path)
+
+    def _adopt(self, previous: "ToolRegistry", path: str) -> None:
+        # Same file as before: keep its tool instances (and whatever they hold warm)
+        if path not in previous._loaded_files:
+            return
+        for name, tool_obj in list(previous.loaded.items()):
+            if previous.source(name) == path:
+                self.loaded[name] = tool_obj
+                if os.path.basename(path) in previous.import_seconds:
+                    self.import_seconds[os.path.basename(path)] = previous.import_seconds[os.path.basename(path)]
+        self._loaded_files.add(path)
+
+    def reload(self) -> Tuple["ToolRegistry", Dict[str, List[str]]]:
+        """Build a registry reflecting the tool files as they are now.
+
+        Unchanged files keep their imported instances. Changed files that were
+        imported are re-imported here, so the swap never exposes a half-loaded
+        tool; a file that fails to import keeps its previous version.
+        """
+        fresh = ToolRegistry(self.tools_path, self.manifest_path)
+        fresh.scan(previous=self)
+        changes: Dict[str, List[str]] = {"added": [], "changed": [], "removed": [], "reimported": [], "failed": []}
+        for path in sorted(fresh.file_stats.keys() | self.file_stats.keys()):
+            if path not in self.file_stats:
+                changes["added"].append(path)
+            elif path not in fresh.file_stats:
+                changes["removed"].append(path)
+            elif fresh.file_stats[path] != self.file_stats[path]:
+                changes["changed"].append(path)
+                if path in self._loaded_files and path not in fresh._loaded_files:
+                    try:
+                        fresh.load_file(path)
+                        changes["reimported"].append(path)
+                    except Exception as e:
+                        print(f"⚠️ Reload of {path} failed, keeping the previous version: {e}")
+                        changes["failed"].append(path)
+                        fresh._restore(self, path)
+        return fresh, changes
+
+    def _restore(self, previous: "ToolRegistry", path: str) -> None:
+        for name in [n for n, entry in self.entries.items() if entry["source_file"] == path]:
+            del self.entries[name]
+        for name, entry in previous.entries.items():
+            if entry["source_file"] == path:
+                self.entries[name] = entry
+        self.failed_stats[path] = self.file_stats[path]
+        self.file_stats[path] = previous.file_stats[path]
+        self._adopt(previous, path)
+
+    # ---- lookups -----------------------------------------------------------
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.entries
+
+    def names(self) -> List[str]:
+        return list(self.entries)
+
+    def spec(self, name: str) -> Dict[str, Any]:
+        entry = self.entries[name]
+        spec = {"name": entry["name"], "description": entry["description"], "args_schema": entry["args_schema"]}
+        if "input_schema" in entry:
+            spec["input_schema"] = entry["input_schema"]
+        return spec
+
+    def _ensure_schemas(self, names: Iterable[str]) -> None:
+        # Full JSON Schema needs the pydantic model, so import tools that lack one
+        missing = [name for name in names if "input_schema" not in self.entries[name]]
+        for path in dict.fromkeys(self.source(name) for name in missing):
+            self.load_file(path)
+
+    def spec_document(self, name: str) -> Tuple[str, bytes]:
+        """(etag, JSON body) for one tool's spec, serialized once."""
+        document = self._documents.get(name)
+        if document is None:
+            self._ensure_schemas([name])
+            document = self._documents[name] = _json_document(self.spec(name))
+        return document
+
+    def specs_document(self) -> Tuple[str, bytes]:
+        """(etag, JSON body) for every tool's spec in one response."""
+        document = self._documents.get(None)
+        if document is None:
+            names = self.names()
+            self._ensure_schemas(names)
+            document = self._documents[None] = _json_document({"tools": [self.spec(name) for name in names]})
+        return document
+
+    def source(self, name: str) -> Optional[str]:
+        entry = self.entries.get(name)
+        return entry["source_file"] if entry else None
+
+    def sources(self) -> Dict[str, str]:
+        return {name: entry["source_file"] for name, entry in self.entries.items()}
+
+    def cpu_bound_sources(self) -> Dict[str, str]:
+        # Tools that declare cpu_bound = True, known without importing them
+        return {name: entry["source_file"] for name, entry in self.entries.items() if entry.get("cpu_bound")}
+
+    # ---- loading -----------------------------------------------------------
+
+    def get(self, name: str) -> "BaseTool":
+        tool_obj = self.loaded.get(name)
+        if tool_obj is not None:
+            return tool_obj
+        if name not in self.entries:
+            raise KeyError(name)
+        self.load_file(self.entries[name]["source_file"])
+        if name not in self.loaded:
+            raise RuntimeError(f"{self.entries[name]['source_file']} did not define tool '{name}'")
+        return self.loaded[name]
+
+    def _file_lock(self, path: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._file_locks.setdefault(path, threading.Lock())
+
+    def load_file(self, path: str) -> None:
+        with self._file_lock(path):
+            if path in self._loaded_files:
+                return
+            # The first file also pays for importing crewai itself
+            start = time.perf_counter()
+            from crewai.tools import BaseTool
+
+            module_name = os.path.splitext(os.path.basename(path))[0]
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+
+            # Look for instances of BaseTool (already instantiated)
+            schemas = {}
+            for _, obj in inspect.getmembers(module):
+                if isinstance(obj, BaseTool):
+                    self.loaded[obj.name] = obj
+                    entry = self.entries.get(obj.name)
+                    if entry is None:
+                        entry = self.entries[obj.name] = {**describe_tool(obj), "source_file": path}
+                    if "input_schema" not in entry:
+                        entry["input_schema"] = schemas[obj.name] = input_schema(obj)
+            self._loaded_files.add(path)
+            self.import_seconds[os.path.basename(path)] = round(time.perf_counter() - start, 4)
+        if schemas:
+            self._documents.pop(None, None)
+            self._save_schemas(path, schemas)
+
+    def _save_schemas(self, path: str, schemas: Dict[str, Any]) -> None:
+        # Persist into this file's manifest entry so later startups need no import
+        with self._manifest_lock:
+            files = self._read_manifest()
+            entry = files.get(path)
+            if not entry or entry["tools"] is None or (entry["mtime_ns"], entry["size"]) != self.file_stats.get(path):
+                return
+            for tool in entry["tools"]:
+                if tool["name"] in schemas:
+                    tool["input_schema"] = schemas[tool["name"]]
+            self._write_manifest(files)
+
+    def load_all(self, names: Optional[Iterable[str]] = None) -> None:
+        paths = self.tool_files() if names is None else [self.source(n) for n in names if n in self.entries]
+        for path in dict.fromkeys(paths):
+            try:
+                self.load_file(path)
+            except Exception as e:
+                print(f"⚠️ Failed to import {path}: {e}")
+
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """Import tools on a background thread so first calls do not pay for it."""
+        names = list(names) if names is not None else None
+        thread = threading.Thread(target=self.load_all, args=(names,), name="tool-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "discovered": len(self.entries),
+            "loaded": sorted(self.loaded),
+            "scan_seconds": round(self.scan_seconds, 4),
+            "import_seconds": dict(self.import_seconds),
+        }
+
+
+def input_schema(tool_obj: "BaseTool") -> Optional[Dict[str, Any]]:
+    try:
+        return tool_obj.args_schema.model_json_schema()
+    except Exception as e:
+        print(f"⚠️ No JSON Schema for {tool_obj.name}: {e}")
+        return None
+
+
+def _json_document(payload: Any) -> Tuple[str, bytes]:
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"', body
+
+
+def describe_tool(tool_obj: "BaseTool") -> Dict[str, Any]:
+    # Spec from an imported tool, for tools the AST scan could not describe
+    args_fields = {}
+    for field_name, field in tool_obj.args_schema.model_fields.items():  # Pydantic v2
+        field_type = str(field.annotation.__name__) if hasattr(field.annotation, "__name__") else str(field.annotation)
+        args_fields[field_name] = {
+            "type": field_type,
+            "description": field.description or ""
+        }
+    return {
+        "name": tool_obj.name,
+        "description": tool_obj.description,
+        "args_schema": args_fields,
+        "cpu_bound": getattr(tool_obj, "cpu_bound", False) is True,
+    }
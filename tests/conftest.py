@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# Tools import their helpers as `shared.*`, as they do when the server loads them
+for path in (ROOT, ROOT / "tools", ROOT / "mcp_server"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def llm_cache(tmp_path, monkeypatch):
+    """A fresh LLM response cache in tmp_path, installed as the process-wide one."""
+    from shared import llm_cache
+
+    cache = llm_cache.LLMCache(tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def fake_openai(monkeypatch, llm_cache):
+    """fake_openai_server, reached in-process through the shared LLM gateway.
+
+    Latency and failure rates start at zero; tests raise them with
+    monkeypatch. Yields the server module, whose `stats` count requests.
+    """
+    import fake_openai_server
+    from shared import llm_gateway
+
+    for name in ("LATENCY_SECONDS", "RATE_LIMIT_PROBABILITY", "SERVER_ERROR_PROBABILITY",
+                 "BATCH_DROP_PROBABILITY", "TRUNCATE_PROBABILITY"):
+        monkeypatch.setattr(fake_openai_server, name, 0.0)
+    monkeypatch.setattr(fake_openai_server, "stats", {"requests": 0, "rate_limited": 0, "server_errors": 0})
+
+    gateway = llm_gateway.LLMGateway(
+        base_url="http://fake-openai/v1",
+        api_key="fake",
+        requests_per_minute=1_000_000,
+        tokens_per_minute=1_000_000_000,
+        max_retries=3,
+        transport=httpx.ASGITransport(app=fake_openai_server.app),
+    )
+    # monkeypatch puts the previous gateway back afterwards
+    monkeypatch.setattr(llm_gateway, "_gateway", llm_gateway._gateway)
+    llm_gateway.set_gateway(gateway)
+    yield fake_openai_server
+    gateway.close()
@@ -0,0 +1,29 @@
+from benchmarks.link_match_cases import ACCURACY_ITEMS, ACCURACY_LINKS
+from shared.link_index import LinkIndex
+
+# Below this share of the labelled topics matched to the right link, unlinked updates lose their links
+MIN_ACCURACY = 0.9
+
+
+def page_text(links) -> str:
+    # HTMLExtractor output: anchors read "text (href)"
+    return " ".join(f"Posted 3 March. {text} ({href})" for text, href in links)
+
+
+def accuracy(index: LinkIndex) -> float:
+    correct = sum(index.best_match(topic) == ACCURACY_LINKS[i][1] for topic, i in ACCURACY_ITEMS)
+    return correct / len(ACCURACY_ITEMS)
+
+
+def test_labelled_topics_match_their_links():
+    assert accuracy(LinkIndex(ACCURACY_LINKS)) >= MIN_ACCURACY
+
+
+def test_labelled_topics_match_links_parsed_from_page_text():
+    assert accuracy(LinkIndex.from_text(page_text(ACCURACY_LINKS))) >= MIN_ACCURACY
+
+
+def test_unrelated_topic_has_no_match():
+    index = LinkIndex(ACCURACY_LINKS)
+    assert index.best_match("Quarterly cafeteria menu") is None
+    assert LinkIndex([]).best_match("Basel III endgame capital proposal") is None
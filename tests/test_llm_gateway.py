@@ -0,0 +1,149 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import openai
+import pandas as pd
+import pytest
+
+from llm_exclusion_tool import build_prompt, classify_updates_async, row_fields
+from llm_extractor_tool import extract_updates
+from shared.llm_gateway import get_gateway
+
+
+class ScriptedRolls:
+    """Stands in for the fake server's `random`: returns `rolls` first, then never fails."""
+
+    def __init__(self, rolls):
+        self.rolls = list(rolls)
+
+    def random(self) -> float:
+        return self.rolls.pop(0) if self.rolls else 0.99
+
+    def __getattr__(self, name):
+        return getattr(random, name)
+
+
+def updates(count: int) -> pd.DataFrame:
+    # Topics of varying length, so the fake classifier's verdicts differ from row to row
+    return pd.DataFrame(
+        {
+            "topic": [f"Notice {i} " + "x" * (i % 7) for i in range(count)],
+            "additional_context": [f"Context for notice {i}" for i in range(count)],
+            "regulator": "FAKE",
+            "link": [f"https://regulator.example/notices/{i}" for i in range(count)],
+        },
+        # Non-default labels: results must land by position, not by label
+        index=[f"row-{i}" for i in reversed(range(count))],
+    )
+
+
+def single_verdict(row: pd.Series) -> str:
+    # fake_openai_server.fake_answer's rule for one-row prompts
+    return "Include" if len(build_prompt(row_fields(row))) % 2 == 0 else "Exclude"
+
+
+def ask(prompt: str):
+    return get_gateway().acomplete(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}])
+
+
+def test_results_keep_row_order_under_concurrency(fake_openai, monkeypatch):
+    async def jittered_sleep(_seconds):
+        # Answers come back in a different order than the requests went out
+        await asyncio.sleep(random.uniform(0, 0.05))
+
+    monkeypatch.setattr(fake_openai, "asyncio", SimpleNamespace(sleep=jittered_sleep))
+    df = updates(40)
+
+    result = asyncio.run(classify_updates_async(df, concurrency=16, batch_tokens=0))
+
+    assert list(result.index) == list(df.index)
+    assert list(result["topic"]) == list(df["topic"])
+    assert list(result["Recommendation"]) == [single_verdict(row) for _, row in df.iterrows()]
+    assert set(result["Reason"]) == {"fake classifier verdict"}
+    assert fake_openai.stats["requests"] == len(df)
+
+
+def test_results_land_on_rows_with_duplicate_labels(fake_openai):
+    # e.g. per-page frames concatenated without ignore_index
+    df = pd.concat([updates(5), updates(12).iloc[5:]]).set_axis(["dup"] * 12)
+
+    result = asyncio.run(classify_updates_async(df, concurrency=4, batch_tokens=0))
+
+    assert len(result) == len(df)
+    assert list(result["Recommendation"]) == [single_verdict(row) for _, row in df.iterrows()]
+    assert set(result["Reason"]) == {"fake classifier verdict"}
+
+
+def test_retries_rate_limits_and_server_errors(fake_openai, monkeypatch):
+    monkeypatch.setattr(fake_openai, "RATE_LIMIT_PROBABILITY", 0.5)
+    monkeypatch.setattr(fake_openai, "SERVER_ERROR_PROBABILITY", 0.25)
+    # First attempt 429 (Retry-After: 0.1), second 500, third answers
+    monkeypatch.setattr(fake_openai, "random", ScriptedRolls([0.0, 0.6]))
+
+    started = time.perf_counter()
+    response = asyncio.run(ask("Say hello."))
+
+    assert response.choices[0].message.content == "Fake completion."
+    assert fake_openai.stats == {"requests": 3, "rate_limited": 1, "server_errors": 1}
+    # The backoff never retries sooner than the 429's Retry-After
+    assert time.perf_counter() - started >= 0.1
+    assert get_gateway().usage()["requests"] == 1
+
+
+def test_gives_up_after_max_retries(fake_openai, monkeypatch):
+    monkeypatch.setattr(fake_openai, "RATE_LIMIT_PROBABILITY", 1.0)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(ask("Say hello."))
+
+    assert fake_openai.stats["rate_limited"] == get_gateway().max_retries + 1
+
+
+def test_batch_drops_fall_back_to_single_rows(fake_openai, monkeypatch):
+    monkeypatch.setattr(fake_openai, "BATCH_DROP_PROBABILITY", 0.5)
+    df = updates(40)
+
+    result = asyncio.run(classify_updates_async(df, concurrency=8, batch_tokens=3000))
+
+    batching = result.attrs["batching"]
+    from_batch = result["Reason"] == "fake batch verdict"
+    from_single = result["Reason"] == "fake classifier verdict"
+    assert batching["batch_requests"] > 0
+    assert (from_batch | from_single).all()
+    assert from_batch.any() and from_single.any()
+    assert batching["single_requests"] == from_single.sum()
+    assert fake_openai.stats["requests"] == batching["batch_requests"] + batching["single_requests"]
+    assert result.attrs["llm_errors"] == 0
+    for position, (_, row) in enumerate(result.iterrows()):
+        # Batched verdicts go by row id (odd ids are included), single ones by the prompt
+        expected = ("Include" if position % 2 else "Exclude") if from_batch.iloc[position] else single_verdict(row)
+        assert row["Recommendation"] == expected
+
+
+def test_truncated_answers_are_not_cached(fake_openai, monkeypatch, llm_cache):
+    monkeypatch.setattr(fake_openai, "TRUNCATE_PROBABILITY", 1.0)
+    df = updates(6)
+
+    asyncio.run(classify_updates_async(df, concurrency=4, batch_tokens=0))
+    assert llm_cache.stats()["entries"] == 0
+
+    # The same rows answered in full are cached, and replayed without new requests
+    monkeypatch.setattr(fake_openai, "TRUNCATE_PROBABILITY", 0.0)
+    asyncio.run(classify_updates_async(df, concurrency=4, batch_tokens=0))
+    assert llm_cache.stats()["entries"] == len(df)
+    requests = fake_openai.stats["requests"]
+    replayed = asyncio.run(classify_updates_async(df, concurrency=4, batch_tokens=0))
+    assert fake_openai.stats["requests"] == requests
+    assert replayed.attrs["llm_errors"] == 0
+
+
+def test_truncated_streams_are_not_cached(fake_openai, monkeypatch, llm_cache):
+    monkeypatch.setattr(fake_openai, "TRUNCATE_PROBABILITY", 1.0)
+    text = "\n".join(f"Notice {i} published (https://regulator.example/notices/{i})" for i in range(5))
+
+    extract_updates(text)
+
+    assert fake_openai.stats["requests"] == 1
+    assert llm_cache.stats()["entries"] == 0
@@ -1,22 +1,30 @@
 import traceback
-from bs4 import BeautifulSoup
 from pathlib import Path
-from urllib.parse import urlparse
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
-from typing import Dict, Type
-
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-# Tags to remove
-TAGS_TO_REMOVE = ["script", "style", "noscript", "footer", "header", "nav", "aside"]
+from typing import ClassVar, Dict, Tuple, Type
+from shared.artifact_store import get_artifact_store
+from shared.artifacts import ArtifactHandle, is_blank, read_text
+from shared.html_engine import clean_html, clean_html_file
+from shared.metrics import span
 
 # Input schema
 class CleanerInput(BaseModel):
     url: str = Field(..., description="Original URL of the scraped site")
     scraped_file: str = Field(..., description="Path to the scraped HTML file on disk")
+    prettify: bool = Field(False, description="Pretty-print the cleaned HTML (slower on large pages)")
+    inline: bool = Field(False, description="Also return the cleaned HTML in the response, not just the cleaned_file handle")
+
+def save_cleaned_html(url: str, cleaned_html: str) -> ArtifactHandle:
+    with span("write"):
+        return get_artifact_store().put_text(cleaned_html, ".html", "cleaned", url)
+
+def clean_file_to_file(url: str, scraped_file: Path) -> ArtifactHandle:
+    # Parsed in chunks and serialized straight to disk: neither page is held as a string
+    writer = get_artifact_store().writer(".html", "cleaned", url, binary=True)
+    with span("parse"), writer as f:
+        clean_html_file(scraped_file, f)
+    return writer.handle
 
 # Tool class
 class CleanerTool(BaseTool):
@@ -24,6 +32,23 @@ class CleanerTool(BaseTool):
     description: str = "Cleans HTML file content by removing unnecessary tags and outputs cleaned file"
     args_schema: Type[BaseModel] = CleanerInput
 
+    # In-memory pipeline contract (see mcp_server/pipeline.py)
+    consumes: ClassVar[Tuple[str, ...]] = ("url", "scraped_html")
+    produces: ClassVar[Tuple[str, ...]] = ("cleaned_html",)
+    # Parsing holds the GIL; the server runs it in its worker-process pool (see mcp_server/tool_executor.py)
+    cpu_bound: ClassVar[bool] = True
+
+    def run_in_memory(self, url: str, scraped_html: str, write_artifacts: bool = False, prettify: bool = False) -> Dict:
+        if not scraped_html.strip():
+            raise ValueError("Received empty HTML from scraper")
+        with span("parse"):
+            cleaned_html = clean_html(scraped_html, prettify)
+        result = {"cleaned_html": cleaned_html}
+        if write_artifacts:
+            handle = save_cleaned_html(url, cleaned_html)
+            result.update(cleaned_file=handle.path, cleaned_artifact=handle._asdict())
+        return result
+
     def _run(self, **kwargs) -> Dict:
         try:
             input = CleanerInput(**kwargs)
@@ -33,34 +58,31 @@ class CleanerTool(BaseTool):
             if not file_path.exists():
                 raise FileNotFoundError(f"File not found: {file_path}")
 
-            scraped_html = file_path.read_text(encoding="utf-8").strip()
             print(f"🔧 CleanerTool _run invoked for file: {file_path}", flush=True)
-            print(f"URL: {url} | HTML length: {len(scraped_html)}", flush=True)
+            print(f"URL: {url} | HTML size: {file_path.stat().st_size} bytes", flush=True)
 
-            if not scraped_html:
+            if is_blank(file_path):
                 raise ValueError("Received empty HTML from scraped file")
 
-            soup = BeautifulSoup(scraped_html, "html.parser")
-            for tag in TAGS_TO_REMOVE:
-                for el in soup.find_all(tag):
-                    el.decompose()
-            for tag in soup.find_all():
-                if not tag.get_text(strip=True) and tag.name not in ["br", "hr"]:
-                    tag.decompose()
-
-            cleaned_html = soup.prettify()
-            domain = urlparse(url).netloc.replace(".", "_")
-            output_path = OUTPUT_DIR / f"{domain}_cleaned.html"
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(cleaned_html)
+            if input.prettify:
+                # prettify() needs the whole document as a string anyway
+                with span("parse"):
+                    cleaned_html = clean_html(read_text(file_path).strip(), True)
+                handle = save_cleaned_html(url, cleaned_html)
+            else:
+                handle = clean_file_to_file(url, file_path)
+                cleaned_html = read_text(handle.path) if input.inline else None
 
-            print(f"✅ Cleaned HTML saved to: {output_path}", flush=True)
+            print(f"✅ Cleaned HTML saved to: {handle.path} ({handle.size} bytes)", flush=True)
 
-            return {
+            result = {
                 "url": url,
-                "cleaned_html": cleaned_html,
-                "cleaned_file": str(output_path)
+                "cleaned_file": handle.path,
+                "cleaned_artifact": handle._asdict()
             }
+            if input.inline:
+                result["cleaned_html"] = cleaned_html
+            return result
 
         except Exception:
             print("❌ Error in CleanerTool:", flush=True)
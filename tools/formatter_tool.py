@@ -1,51 +1,103 @@
-import pdfkit
+import asyncio
 from pathlib import Path
-from urllib.parse import urlparse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from crewai.tools import BaseTool
-from typing import Dict
+from typing import Dict, List, Optional
+from shared.artifact_store import get_artifact_store
+from shared.pdf_render import PDF_WORKERS, get_renderer, render_many
 
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-
-class FormatterInput(BaseModel):
+class FormatterItem(BaseModel):
     url: str = Field(..., description="The URL of the page")
     cleaned_file: str = Field(..., description="The path to the cleaned HTML file")
 
 
+class FormatterInput(BaseModel):
+    url: Optional[str] = Field(None, description="The URL of the page")
+    cleaned_file: Optional[str] = Field(None, description="The path to the cleaned HTML file")
+    items: Optional[List[FormatterItem]] = Field(None, description="Several pages to render concurrently")
+    workers: int = Field(PDF_WORKERS, ge=1, le=64, description="Maximum PDFs rendered at once in batch mode")
+    backend: Optional[str] = Field(None, description="PDF backend: 'chromium' (pooled, default) or 'wkhtmltopdf'")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if not self.items and not (self.url and self.cleaned_file):
+            raise ValueError("Provide 'url' and 'cleaned_file', or 'items'")
+        return self
+
+
 class FormatterTool(BaseTool):
     name: str = "formatter_tool"
-    description: str = "Converts a cleaned HTML file into a formatted PDF using wkhtmltopdf"
+    description: str = "Converts cleaned HTML files into formatted PDFs (pooled Chromium renderer by default)"
     args_schema: type = FormatterInput
 
-    def _run(self, url: str, cleaned_file: str) -> Dict:
-        domain = urlparse(url).netloc.replace('.', '_')
-        pdf_output_path = OUTPUT_DIR / f"{domain}_formatted.pdf"
+    def _run(
+        self,
+        url: Optional[str] = None,
+        cleaned_file: Optional[str] = None,
+        items: Optional[List] = None,
+        workers: int = PDF_WORKERS,
+        backend: Optional[str] = None,
+    ) -> Dict:
+        if items:
+            return self._batch_result(asyncio.run(self._render_batch(items, workers, backend)))
 
-        wkhtmltopdf_path = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-        if not Path(wkhtmltopdf_path).exists():
-            raise FileNotFoundError(f"wkhtmltopdf not found at: {wkhtmltopdf_path}")
-
-        config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
-        options = {
-            'encoding': 'UTF-8',
-            'enable-local-file-access': ''
-        }
+        if not Path(cleaned_file).exists():
+            raise FileNotFoundError(f"Cleaned HTML file not found: {cleaned_file}")
 
+        # Rendered to a temp file, then moved into the artifact store under its hash
+        store = get_artifact_store()
+        target = store.temp_path(".pdf")
         try:
-            pdfkit.from_file(cleaned_file, str(pdf_output_path), configuration=config, options=options)
-            print(f"✅ PDF created: {pdf_output_path}")
+            get_renderer(backend).render(Path(cleaned_file), target)
+            handle = store.put_file(target, ".pdf", "formatted", url)
+            print(f"✅ PDF created: {handle.path}")
         except Exception as e:
+            target.unlink(missing_ok=True)
             print(f"❌ PDF conversion failed for {cleaned_file}: {e}")
             raise RuntimeError(f"PDF conversion failed: {e}")
 
         return {
             "url": url,
             "cleaned_file": cleaned_file,
-            "pdf_file": str(pdf_output_path)
+            "pdf_file": handle.path
         }
 
-formatter_tool = FormatterTool()
+    async def _arun(
+        self,
+        url: Optional[str] = None,
+        cleaned_file: Optional[str] = None,
+        items: Optional[List] = None,
+        workers: int = PDF_WORKERS,
+        backend: Optional[str] = None,
+    ) -> Dict:
+        # Batches wait on the browser pool, so the server can await them on its loop
+        if items:
+            return self._batch_result(await self._render_batch(items, workers, backend))
+        return await asyncio.to_thread(self._run, url, cleaned_file, None, workers, backend)
+
+    async def _render_batch(self, items: List, workers: int, backend: Optional[str]) -> List[Dict]:
+        items = [FormatterItem.model_validate(item) for item in items]
+        store = get_artifact_store()
+        # Every job renders to its own temp file, so pages of one domain cannot collide
+        jobs = [(Path(item.cleaned_file), store.temp_path(".pdf")) for item in items]
 
+        results = await render_many(jobs, workers, backend)
+        for item, (_, target), result in zip(items, jobs, results):
+            result["url"] = item.url
+            if result["pdf_file"] is not None:
+                # Hashing and moving the PDF is blocking file I/O; keep it off the event loop
+                handle = await asyncio.to_thread(store.put_file, target, ".pdf", "formatted", item.url)
+                result["pdf_file"] = handle.path
+            else:
+                target.unlink(missing_ok=True)
+        return results
+
+    def _batch_result(self, results: List[Dict]) -> Dict:
+        failed = [r for r in results if r["pdf_file"] is None]
+        for r in failed:
+            print(f"❌ PDF conversion failed for {r['source']}: {r['error']}")
+        print(f"✅ Rendered {len(results) - len(failed)}/{len(results)} PDFs")
+        return {"results": results, "rendered": len(results) - len(failed), "failed": len(failed)}
+
+formatter_tool = FormatterTool()
@@ -1,77 +1,87 @@
 from pydantic import BaseModel, Field
-from bs4 import BeautifulSoup
-from bs4.element import Tag, NavigableString
-from urllib.parse import urlparse, urljoin
 from pathlib import Path
-from typing import List, Dict
+from typing import ClassVar, List, Dict, Optional, Tuple
 from crewai.tools import BaseTool
-
-# ✅ Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from shared.artifact_store import get_artifact_store
+from shared.artifacts import ArtifactHandle, is_blank
+from shared.html_engine import Extraction, extract_content, extract_file
+from shared.metrics import span
 
 # ✅ Input schema
 class HTMLExtractorInput(BaseModel):
     url: str = Field(..., description="The URL of the page")
-    cleaned_file: str = Field(..., description="The path to the cleaned HTML file")
+    cleaned_file: Optional[str] = Field(None, description="The path to the cleaned HTML file")
+    scraped_file: Optional[str] = Field(None, description="The path to the raw scraped HTML file; cleaned in the same pass, so cleaner_tool can be skipped")
+    inline: bool = Field(False, description="Also return the extracted text in the response, not just the extracted_file handle")
+
+def extract_to_file(html: str, url: str) -> Tuple[Extraction, ArtifactHandle]:
+    # Works on cleaned or raw HTML; text is written to disk as the page is walked
+    writer = get_artifact_store().writer(".txt", "extracted", url)
+    # Text is streamed to the file while parsing, so this one span covers both
+    with span("parse"), writer as f:
+        extraction = extract_content(html, url, out=f)
+    return extraction, writer.handle
+
+def extract_file_to_file(source_file: str, url: str, keep_text: bool = False) -> Tuple[Extraction, ArtifactHandle]:
+    # The page is streamed through the parser, no tree or page string is built;
+    # the text is only kept in memory when keep_text is set
+    writer = get_artifact_store().writer(".txt", "extracted", url)
+    with span("parse"), writer as f:
+        extraction = extract_file(source_file, url, out=f, keep_text=keep_text)
+    return extraction, writer.handle
+
+def link_records(extraction: Extraction) -> List[Dict[str, str]]:
+    return [link._asdict() for link in extraction.links]
 
 # ✅ Tool class
 class HTMLExtractorTool(BaseTool):
     name: str = "html_extractor_tool"
-    description: str = "Extracts visible text and links from cleaned HTML content"
+    description: str = "Extracts visible text and links from cleaned or raw scraped HTML content"
     args_schema: type = HTMLExtractorInput
 
-    def _run(self, url: str, cleaned_file: str) -> Dict:
-        print(f"🔍 Extracting from: {cleaned_file}")
-
-        if not Path(cleaned_file).exists():
-            raise FileNotFoundError(f"❌ File does not exist: {cleaned_file}")
-
-        with open(cleaned_file, "r", encoding="utf-8") as f:
-            html = f.read()
-
-        if not html.strip():
-            raise ValueError("❌ Cleaned HTML file is empty")
+    # In-memory pipeline contract (see mcp_server/pipeline.py); takes the raw page, no cleaner stage needed
+    consumes: ClassVar[Tuple[str, ...]] = ("url", "scraped_html")
+    produces: ClassVar[Tuple[str, ...]] = ("extracted_text", "extracted_links")
+    # Parsing holds the GIL; the server runs it in its worker-process pool (see mcp_server/tool_executor.py)
+    cpu_bound: ClassVar[bool] = True
 
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style", "noscript", "footer", "header", "nav", "aside"]):
-            tag.decompose()
+    def run_in_memory(self, url: str, scraped_html: str, write_artifacts: bool = False) -> Dict:
+        if write_artifacts:
+            extraction, handle = extract_to_file(scraped_html, url)
+        else:
+            with span("parse"):
+                extraction, handle = extract_content(scraped_html, url), None
+        result = {"extracted_text": extraction.text, "extracted_links": link_records(extraction)}
+        if handle is not None:
+            result.update(extracted_file=handle.path, extracted_artifact=handle._asdict())
+        return result
 
-        result = []
+    def _run(self, url: str, cleaned_file: Optional[str] = None, scraped_file: Optional[str] = None, inline: bool = False) -> Dict:
+        source_file = cleaned_file or scraped_file
+        if not source_file:
+            raise ValueError("❌ Input must include 'cleaned_file' or 'scraped_file'")
 
-        def traverse(node):
-            if isinstance(node, NavigableString):
-                text = node.strip()
-                if text:
-                    result.append(text)
-            elif isinstance(node, Tag):
-                if node.name == "a" and node.get("href"):
-                    text = node.get_text(strip=True)
-                    href = urljoin(url, node["href"])
-                    if text:
-                        result.append(f"{text} ({href})")
-                else:
-                    for child in node.children:
-                        traverse(child)
+        print(f"🔍 Extracting from: {source_file}")
 
-        traverse(soup.body or soup)
-        visible_text = " ".join(result)
-        links = [part.split(" (")[-1].rstrip(")") for part in result if " (" in part]
+        if not Path(source_file).exists():
+            raise FileNotFoundError(f"❌ File does not exist: {source_file}")
 
-        domain = urlparse(url).netloc.replace(".", "_")
-        output_path = OUTPUT_DIR / f"{domain}_extracted.txt"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(visible_text)
+        if is_blank(source_file):
+            raise ValueError("❌ HTML file is empty")
 
-        print(f"✅ Saved extracted content to: {output_path}")
-        print(f"🧪 Extracted text length: {len(visible_text)} | Links found: {len(links)}")
+        extraction, handle = extract_file_to_file(source_file, url, keep_text=inline)
+        print(f"✅ Saved extracted content to: {handle.path}")
+        print(f"🧪 Extracted text size: {handle.size} bytes | Links found: {len(extraction.links)}")
 
-        return {
+        result = {
             "url": url,
-            "extracted_text": visible_text,
-            "extracted_links": links,
-            "extracted_file": str(output_path)
+            "extracted_links": link_records(extraction),
+            "extracted_file": handle.path,
+            "extracted_artifact": handle._asdict()
         }
+        if inline:
+            result["extracted_text"] = extraction.text
+        return result
 
 # ✅ Instantiating the tool
 html_extractor_tool = HTMLExtractorTool()
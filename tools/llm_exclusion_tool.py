@@ -1,58 +1,48 @@
 import os
 import json
+import time
+import asyncio
 import pandas as pd
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
-from urllib.parse import urlparse
-from datetime import datetime
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
 from openpyxl.worksheet.datavalidation import DataValidation
 from openpyxl.utils import get_column_letter
-from typing import Dict, Type
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple, Type
+from shared.artifact_store import get_artifact_store
+from shared.artifacts import ArtifactHandle
+from shared.llm_cache import acached_completion
+from shared.metrics import span
+from shared.llm_gateway import get_gateway
+from shared.rate_limit import estimate_tokens
 
+# Requests in flight per classification run; RPM/TPM limits and retries are
+# process-wide, in the LLM gateway (LLM_RPM, LLM_TPM, LLM_MAX_RETRIES)
+EXCLUSION_CONCURRENCY = int(os.getenv("EXCLUSION_CONCURRENCY", "8"))
+# Budget reserved per call for the JSON answer
+RESPONSE_TOKEN_ESTIMATE = 100
+# Rows packed into one prompt, up to this many estimated tokens (0 = one request per row)
+EXCLUSION_BATCH_TOKENS = int(os.getenv("EXCLUSION_BATCH_TOKENS", "3000"))
+EXCLUSION_BATCH_MAX_ROWS = int(os.getenv("EXCLUSION_BATCH_MAX_ROWS", "20"))
 
-# Load environment variables
-load_dotenv("C:/Users/hp/Documents/Agent Router Tools/.env")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
+SYSTEM_PROMPT = "You are a compliance content classifier."
+VALID_RECOMMENDATIONS = {"include": "Include", "exclude": "Exclude"}
 
 class LLMExclusionInput(BaseModel):
     url: str = Field(..., description="URL of the regulator site")
     extracted_file: str = Field(..., description="Path to the CSV file with extracted data")
+    bypass_cache: bool = Field(False, description="Skip the LLM response cache (the fresh answer is still stored)")
 
 
-class LLMExclusionTool(BaseTool):
-    name: str = "llm_exclusion_tool"
-    description: str = "Uses an LLM to classify regulatory updates as relevant or excluded for compliance."
-    args_schema: Type[BaseModel] = LLMExclusionInput
-
-    def _run(self, url: str, extracted_file: str) -> dict:
-        file_path = Path(extracted_file)
-        if not file_path.exists():
-            raise FileNotFoundError(f"❌ Extracted file not found at: {file_path}")
-
-        df = pd.read_csv(file_path)
-        required_cols = {"topic", "additional_context", "regulator", "link"}
-        if not required_cols.issubset(df.columns):
-            raise ValueError(f"❌ Required columns missing: {required_cols - set(df.columns)}")
-
-        df["Recommendation"] = ""
-        df["Reason"] = ""
+def row_fields(row: pd.Series) -> Dict[str, str]:
+    topic = str(row.get("topic", "")).strip()
+    context = str(row.get("additional_context", "")).strip()
+    regulator = str(row.get("regulator", "")).strip()
+    return {"topic": topic[:300], "context": context[:1000], "regulator": regulator}
 
-        print(f"🔍 Reviewing {len(df)} updates for exclusion...")
 
-        for i, row in df.iterrows():
-            topic = str(row.get("topic", "")).strip()
-            context = str(row.get("additional_context", "")).strip()
-            regulator = str(row.get("regulator", "")).strip()
-
-            prompt = f"""
+def build_prompt(fields: Dict[str, str]) -> str:
+    return f"""
 You are a compliance filtering assistant for a U.S. bank.
 
 Given the topic, supporting context, and regulator source, decide whether this content is relevant for compliance monitoring.
@@ -63,71 +53,294 @@ Respond in JSON format like this:
   "reason": "short explanation"
 }}
 
-Topic: {topic[:300]}
-Context: {context[:1000]}
-Regulator: {regulator}
+Topic: {fields["topic"]}
+Context: {fields["context"]}
+Regulator: {fields["regulator"]}
+"""
+
+
+def build_batch_prompt(items: List[Tuple[int, Dict[str, str]]]) -> str:
+    updates = "\n---\n".join(
+        f"Update ID: {row_id}\nTopic: {fields['topic']}\nContext: {fields['context']}\nRegulator: {fields['regulator']}"
+        for row_id, fields in items
+    )
+    return f"""
+You are a compliance filtering assistant for a U.S. bank.
+
+For each update below, decide from its topic, supporting context, and regulator source whether it is relevant for compliance monitoring.
+
+Respond with a JSON array containing exactly one object per update, like this:
+[
+  {{"id": 0, "recommendation": "Include" or "Exclude", "reason": "short explanation"}}
+]
+
+{updates}
 """
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a compliance content classifier."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.2
-                )
-                content = response.choices[0].message.content.strip()
-                json_start = content.find('{')
-                json_end = content.rfind('}') + 1
-                parsed = json.loads(content[json_start:json_end])
-            except Exception as e:
-                print(f"⚠️ Failed to parse LLM output: {e}")
-                parsed = {
-                    "recommendation": "Exclude",
-                    "reason": f"⚠️ LLM error or invalid output: {str(e)}"
-                }
-
-            df.at[i, "Recommendation"] = parsed.get("recommendation", "Exclude")
-            df.at[i, "Reason"] = parsed.get("reason", "No reason provided")
-
-        # Format hyperlink
-        df["Link"] = df["link"].apply(
-            lambda x: f'=HYPERLINK("{x}", "Open Link")' if pd.notna(x) and str(x).startswith("http") else ""
+
+
+def pack_batches(fields: List[Dict[str, str]], token_budget: int, max_rows: int) -> List[List[int]]:
+    # Greedy packing in row order; the shared instructions are paid once per batch
+    overhead = estimate_tokens(build_batch_prompt([]))
+    batches, current, used = [], [], overhead
+    for row_id, row in enumerate(fields):
+        cost = estimate_tokens(build_batch_prompt([(row_id, row)])) - overhead + RESPONSE_TOKEN_ESTIMATE
+        if current and (used + cost > token_budget or len(current) >= max_rows):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(row_id)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def validate_item(item, expected_ids: set) -> Optional[Tuple[int, Dict]]:
+    if not isinstance(item, dict):
+        return None
+    try:
+        row_id = int(item.get("id"))
+    except (TypeError, ValueError):
+        return None
+    recommendation = VALID_RECOMMENDATIONS.get(str(item.get("recommendation", "")).strip().lower())
+    reason = item.get("reason")
+    if row_id not in expected_ids or recommendation is None or not isinstance(reason, str):
+        return None
+    return row_id, {"recommendation": recommendation, "reason": reason}
+
+
+def parse_object(content: str) -> Dict:
+    parsed = json.loads(content[content.find('{'):content.rfind('}') + 1])
+    if not isinstance(parsed, dict):
+        raise ValueError("expected a JSON object")
+    return parsed
+
+
+def parse_array(content: str) -> List:
+    parsed = json.loads(content[content.find('['):content.rfind(']') + 1])
+    if not isinstance(parsed, list):
+        raise ValueError("expected a JSON array")
+    return parsed
+
+
+def parses(parse: Callable[[str], Any]) -> Callable[[str], bool]:
+    # Cache validator: answers that would fail to parse are not stored
+    def validate(content: str) -> bool:
+        try:
+            parse(content)
+            return True
+        except ValueError:
+            return False
+    return validate
+
+
+async def complete(prompt: str, expected_tokens: int, bypass_cache: bool = False, parse: Callable[[str], Any] = parse_object) -> Any:
+    async def create(**request):
+        # Only cache misses reach the gateway and spend rate-limit budget
+        return await get_gateway().acomplete(expected_tokens=expected_tokens, **request)
+
+    content = await acached_completion(
+        create,
+        bypass_cache=bypass_cache,
+        validate=parses(parse),
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2
+    )
+    return parse(content.strip())
+
+
+async def classify_row(semaphore: asyncio.Semaphore, prompt: str, bypass_cache: bool = False) -> Dict:
+    async with semaphore:
+        try:
+            return await complete(prompt, RESPONSE_TOKEN_ESTIMATE, bypass_cache)
+        except Exception as e:
+            print(f"⚠️ Failed to parse LLM output: {e}")
+            return {
+                "recommendation": "Exclude",
+                "reason": f"⚠️ LLM error or invalid output: {str(e)}",
+                "llm_error": True
+            }
+
+
+async def classify_batch(
+    semaphore: asyncio.Semaphore,
+    items: List[Tuple[int, Dict[str, str]]],
+    bypass_cache: bool = False,
+) -> Dict[int, Dict]:
+    # Returns only the items that came back valid; the caller retries the rest one by one
+    expected_ids = {row_id for row_id, _ in items}
+    async with semaphore:
+        try:
+            parsed = await complete(build_batch_prompt(items), RESPONSE_TOKEN_ESTIMATE * len(items), bypass_cache, parse_array)
+        except Exception as e:
+            print(f"⚠️ Batch of {len(items)} failed, falling back to single rows: {e}")
+            return {}
+
+    results = {}
+    for item in parsed if isinstance(parsed, list) else []:
+        valid = validate_item(item, expected_ids)
+        if valid is not None and valid[0] not in results:
+            results[valid[0]] = valid[1]
+    return results
+
+
+async def classify_updates_async(
+    df: pd.DataFrame,
+    concurrency: int = EXCLUSION_CONCURRENCY,
+    batch_tokens: int = EXCLUSION_BATCH_TOKENS,
+    bypass_cache: bool = False,
+) -> pd.DataFrame:
+    required_cols = {"topic", "additional_context", "regulator", "link"}
+    if not required_cols.issubset(df.columns):
+        raise ValueError(f"❌ Required columns missing: {required_cols - set(df.columns)}")
+
+    df = df.copy()
+
+    print(f"🔍 Reviewing {len(df)} updates for exclusion...")
+
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    fields = [row_fields(row) for _, row in df.iterrows()]
+    results: Dict[int, Dict] = {}
+    batches = pack_batches(fields, batch_tokens, EXCLUSION_BATCH_MAX_ROWS) if batch_tokens > 0 else []
+    batches = [batch for batch in batches if len(batch) > 1]
+
+    batch_results = await asyncio.gather(
+        *(classify_batch(semaphore, [(i, fields[i]) for i in batch], bypass_cache) for batch in batches)
+    )
+    for batch_result in batch_results:
+        results.update(batch_result)
+
+    # Rows not batched, or missing/invalid in their batch's answer, go one request per row
+    single = [i for i in range(len(fields)) if i not in results]
+    single_results = await asyncio.gather(
+        *(classify_row(semaphore, build_prompt(fields[i]), bypass_cache) for i in single)
+    )
+    results.update(zip(single, single_results))
+
+    report_batching(df, fields, batches, single)
+
+    # results are keyed by position; assigning whole columns is also safe for duplicate index labels
+    ordered = [results[position] for position in range(len(df))]
+    df["Recommendation"] = [parsed.get("recommendation", "Exclude") for parsed in ordered]
+    df["Reason"] = [parsed.get("reason", "No reason provided") for parsed in ordered]
+
+    elapsed = time.perf_counter() - start
+    rows_per_second = len(df) / elapsed if elapsed > 0 else 0.0
+    df.attrs["throughput"] = {"rows": len(df), "seconds": round(elapsed, 3), "rows_per_second": round(rows_per_second, 2)}
+    # Rows defaulted to Exclude because the LLM failed; the pipeline reprocesses such pages
+    df.attrs["llm_errors"] = sum(1 for parsed in results.values() if parsed.get("llm_error"))
+    print(f"⏱️ Classified {len(df)} rows in {elapsed:.1f}s ({rows_per_second:.2f} rows/sec, concurrency={concurrency})")
+    return df
+
+
+def report_batching(df: pd.DataFrame, fields: List[Dict[str, str]], batches: List[List[int]], single: List[int]) -> None:
+    # Estimated prompt tokens vs. the one-request-per-row baseline
+    overhead = estimate_tokens(SYSTEM_PROMPT)
+    baseline_tokens = sum(estimate_tokens(build_prompt(f)) + overhead for f in fields)
+    used_tokens = sum(
+        estimate_tokens(build_batch_prompt([(i, fields[i]) for i in batch])) + overhead for batch in batches
+    ) + sum(estimate_tokens(build_prompt(fields[i])) + overhead for i in single)
+    requests = len(batches) + len(single)
+    df.attrs["batching"] = {
+        "batch_requests": len(batches),
+        "single_requests": len(single),
+        "requests_saved": len(fields) - requests,
+        "estimated_prompt_tokens": used_tokens,
+        "estimated_prompt_tokens_saved": baseline_tokens - used_tokens,
+    }
+    if batches:
+        print(
+            f"📦 Batched {len(fields)} rows into {requests} requests "
+            f"({len(fields) - requests} requests and ~{baseline_tokens - used_tokens} prompt tokens saved)"
         )
-        df.drop(columns=["link"], inplace=True)
 
-        # Add action column
-        df["action"] = ""
 
-        domain = urlparse(url).netloc.replace('.', '_')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_path = OUTPUT_DIR / f"{domain}_llm_exclusion_checked_{timestamp}.xlsx"
+def classify_updates(df: pd.DataFrame, bypass_cache: bool = False) -> pd.DataFrame:
+    return asyncio.run(classify_updates_async(df, bypass_cache=bypass_cache))
+
+
+def save_exclusion_workbook(url: str, df: pd.DataFrame) -> ArtifactHandle:
+    df = df.copy()
+
+    # Format hyperlink
+    df["Link"] = df["link"].apply(
+        lambda x: f'=HYPERLINK("{x}", "Open Link")' if pd.notna(x) and str(x).startswith("http") else ""
+    )
+    df.drop(columns=["link"], inplace=True)
+
+    # Add action column
+    df["action"] = ""
 
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Exclusion Results")
-            workbook = writer.book
-            sheet = writer.sheets["Exclusion Results"]
+    # openpyxl writes the file itself; it is moved into the artifact store once complete
+    store = get_artifact_store()
+    output_path = store.temp_path(".xlsx")
 
-            action_col_idx = df.columns.get_loc("action") + 1
-            action_col_letter = get_column_letter(action_col_idx)
+    with span("write"), pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        df.to_excel(writer, index=False, sheet_name="Exclusion Results")
+        workbook = writer.book
+        sheet = writer.sheets["Exclusion Results"]
 
-            dv = DataValidation(
-                type="list",
-                formula1='"summarize,custom prompt,no action"',
-                allow_blank=True,
-                showDropDown=False
-            )
-            dv.error = "Invalid input. Choose from summarize, custom prompt, or no action."
-            dv.errorTitle = "Invalid Action"
+        action_col_idx = df.columns.get_loc("action") + 1
+        action_col_letter = get_column_letter(action_col_idx)
+
+        dv = DataValidation(
+            type="list",
+            formula1='"summarize,custom prompt,no action"',
+            allow_blank=True,
+            showDropDown=False
+        )
+        dv.error = "Invalid input. Choose from summarize, custom prompt, or no action."
+        dv.errorTitle = "Invalid Action"
+
+        dv.add(f"{action_col_letter}2:{action_col_letter}101")
+        sheet.add_data_validation(dv)
+
+    return store.put_file(output_path, ".xlsx", "exclusion", url)
+
+
+class LLMExclusionTool(BaseTool):
+    name: str = "llm_exclusion_tool"
+    description: str = "Uses an LLM to classify regulatory updates as relevant or excluded for compliance."
+    args_schema: Type[BaseModel] = LLMExclusionInput
+
+    # In-memory pipeline contract (see mcp_server/pipeline.py)
+    consumes: ClassVar[Tuple[str, ...]] = ("url", "updates")
+    produces: ClassVar[Tuple[str, ...]] = ("classified_updates",)
+
+    def run_in_memory(self, url: str, updates: pd.DataFrame, write_artifacts: bool = False, bypass_cache: bool = False) -> Dict:
+        df = classify_updates(updates, bypass_cache)
+        result = {
+            "classified_updates": df,
+            "throughput": df.attrs.get("throughput"),
+            "batching": df.attrs.get("batching"),
+            "llm_errors": df.attrs.get("llm_errors", 0),
+        }
+        if write_artifacts:
+            handle = save_exclusion_workbook(url, df)
+            result.update(exclusion_file=handle.path, exclusion_artifact=handle._asdict())
+        return result
+
+    def _run(self, url: str, extracted_file: str, bypass_cache: bool = False) -> dict:
+        file_path = Path(extracted_file)
+        if not file_path.exists():
+            raise FileNotFoundError(f"❌ Extracted file not found at: {file_path}")
 
-            dv.add(f"{action_col_letter}2:{action_col_letter}101")
-            sheet.add_data_validation(dv)
+        df = classify_updates(pd.read_csv(file_path), bypass_cache)
+        handle = save_exclusion_workbook(url, df)
 
-        print(f"✅ Exclusion results saved to: {output_path}")
+        print(f"✅ Exclusion results saved to: {handle.path}")
 
         return {
             "url": url,
-            "exclusion_file": str(output_path)
+            "exclusion_file": handle.path,
+            "exclusion_artifact": handle._asdict(),
+            "throughput": df.attrs.get("throughput"),
+            "batching": df.attrs.get("batching"),
+            "llm_errors": df.attrs.get("llm_errors", 0)
         }
 
 llm_exclusion_tool = LLMExclusionTool()
@@ -1,48 +1,38 @@
 import os
-import re
+import csv
+import contextvars
 import json
+import queue
+import time
 import pandas as pd
-from datetime import datetime
-from pathlib import Path
-from urllib.parse import urlparse
-from difflib import get_close_matches
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
-from typing import List, Dict
-from openai import OpenAI
+from typing import ClassVar, Dict, Iterator, List, Optional, TextIO, Tuple
 from crewai.tools import BaseTool
+from shared.artifact_store import get_artifact_store
+from shared.artifacts import ArtifactHandle, read_text
+from shared.json_stream import JSONArrayStream
+from shared.link_index import LINK_PATTERN, LinkIndex
+from shared.llm_cache import stream_completion
+from shared.llm_gateway import get_gateway
+from shared.text_chunker import split_into_chunks
 
-# Load API key
-load_dotenv("C:/Users/hp/Documents/Agent Router Tools/.env")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+UPDATE_COLUMNS = ["date", "topic", "additional_context", "link", "regulator"]
 
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Long pages are split into chunks that are extracted concurrently and merged
+EXTRACTOR_CHUNK_TOKENS = int(os.getenv("EXTRACTOR_CHUNK_TOKENS", "6000"))
+EXTRACTOR_CHUNK_OVERLAP_TOKENS = int(os.getenv("EXTRACTOR_CHUNK_OVERLAP_TOKENS", "300"))
+EXTRACTOR_CONCURRENCY = int(os.getenv("EXTRACTOR_CONCURRENCY", "4"))
 
 # Input model
 class LLMExtractorInput(BaseModel):
     url: str = Field(..., description="Original URL")
     extracted_file: str = Field(..., description="Path to .txt file generated by HTML Extractor")
+    bypass_cache: bool = Field(False, description="Skip the LLM response cache (the fresh answer is still stored)")
 
-# Tool
-class LLMExtractorTool(BaseTool):
-    name: str = "llm_extractor_tool"
-    description: str = "Extracts structured regulatory updates from extracted text and inferred links"
-    args_schema: type = LLMExtractorInput
 
-    def _run(self, url: str, extracted_file: str) -> Dict:
-        if not os.path.exists(extracted_file):
-            raise FileNotFoundError(f"❌ Extracted .txt file not found: {extracted_file}")
-
-        with open(extracted_file, "r", encoding="utf-8") as f:
-            extracted_text = f.read()
-
-        # Extract links using regex
-        extracted_links = re.findall(r'\((https?://[^\s)]+)\)', extracted_text)
-
-        # Construct prompt for LLM
-        prompt = f"""
+def build_prompt(text: str, known_links: List[str]) -> str:
+    return f"""
 You are a regulatory update extraction assistant.
 
 From the following DOCUMENT CONTENT, extract each distinct regulatory update.
@@ -56,52 +46,191 @@ Return the output as a strict JSON array of objects, each with the following key
 ⚠️ Do not include any explanatory text or markdown. Output must start with [ and end with ].
 ⚠️ Ensure all string values are wrapped in double quotes. Escape any internal quotes.
 
-Known links to choose from: {json.dumps(extracted_links)}
+Known links to choose from: {json.dumps(known_links)}
 
 DOCUMENT CONTENT:
 \"\"\"
-{extracted_text}
+{text}
 \"\"\"
 """
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You extract structured regulatory updates from documents."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=4096
-            )
-            raw = response.choices[0].message.content.strip()
-            cleaned = re.sub(r"^```json|```$", "", raw.strip(), flags=re.MULTILINE).strip()
-            parsed = json.loads(cleaned)
-
-            # Patch missing values and fuzzy match if link is blank
-            for item in parsed:
-                if "additional_context" not in item:
-                    item["additional_context"] = ""
-                if "link" not in item or not item["link"].strip():
-                    topic = item.get("topic", "").lower()
-                    match = get_close_matches(topic, extracted_links, n=1, cutoff=0.3)
-                    item["link"] = match[0] if match else ""
-
-            df = pd.DataFrame(parsed, columns=["date", "topic", "additional_context", "link", "regulator"])
 
+class TruncatedOutput(Exception):
+    def __init__(self, salvaged: int):
+        super().__init__(f"response truncated, salvaged {salvaged} complete updates")
+        self.salvaged = salvaged
+
+
+def iter_chunk_updates(chunk: str, bypass_cache: bool = False) -> Iterator[Dict]:
+    # Yields each update object as soon as the streamed answer completes it
+    # Only this chunk's links are offered, which also keeps the prompt small
+    known_links = list(dict.fromkeys(LINK_PATTERN.findall(chunk)))
+    parser = JSONArrayStream()
+    for piece in stream_completion(
+        get_gateway().stream,
+        bypass_cache=bypass_cache,
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You extract structured regulatory updates from documents."},
+            {"role": "user", "content": build_prompt(chunk, known_links)}
+        ],
+        temperature=0.2,
+        max_tokens=4096
+    ):
+        for item in parser.feed(piece):
+            if isinstance(item, dict):
+                yield item
+    if not parser.started:
+        raise ValueError("no JSON array in the response")
+    if not parser.complete:
+        # Truncated (e.g. max_tokens): everything complete was already yielded
+        raise TruncatedOutput(parser.count)
+
+
+def _normalize(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def update_key(item: Dict) -> Tuple[str, str, str]:
+    return (_normalize(item.get("date")), _normalize(item.get("topic")), _normalize(item.get("link")).rstrip("/"))
+
+
+def extract_updates(
+    extracted_text: str,
+    bypass_cache: bool = False,
+    chunk_tokens: int = EXTRACTOR_CHUNK_TOKENS,
+    overlap_tokens: int = EXTRACTOR_CHUNK_OVERLAP_TOKENS,
+    concurrency: int = EXTRACTOR_CONCURRENCY,
+    out: Optional[TextIO] = None,
+) -> pd.DataFrame:
+    """Extract updates chunk by chunk; when `out` is given, CSV rows are written as they arrive."""
+    started = time.perf_counter()
+    # Built once per page; answers the link lookups for items the LLM left unlinked
+    link_index = LinkIndex.from_text(extracted_text)
+    chunks = split_into_chunks(extracted_text, chunk_tokens, overlap_tokens)
+
+    writer = None
+    if out is not None:
+        writer = csv.DictWriter(out, fieldnames=UPDATE_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        out.flush()
+    if not chunks:
+        return pd.DataFrame(columns=UPDATE_COLUMNS)
+
+    # Chunk workers push (index, item) and finally (index, None); failures are recorded per chunk
+    arrivals: "queue.Queue[Tuple[int, Optional[Dict]]]" = queue.Queue()
+    failed, truncated = set(), set()
+
+    def run_chunk(index: int, chunk: str) -> None:
+        try:
+            for item in iter_chunk_updates(chunk, bypass_cache):
+                arrivals.put((index, item))
+        except TruncatedOutput as e:
+            truncated.add(index)
+            print(f"⚠️ Chunk {index + 1}/{len(chunks)}: {e}")
         except Exception as e:
-            print(f"⚠️ LLM extraction failed: {e}")
-            df = pd.DataFrame(columns=["date", "topic", "additional_context", "link", "regulator"])
+            # A malformed answer only loses its own chunk
+            failed.add(index)
+            print(f"⚠️ LLM extraction failed for chunk {index + 1}/{len(chunks)}: {e}")
+        finally:
+            arrivals.put((index, None))
+
+    updates: List[Dict] = []
+    seen = set()
+    raw_items = 0
+    first_row_seconds = None
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks)))) as pool:
+        for index, chunk in enumerate(chunks):
+            # Each chunk gets a copy of the caller's context, so its spans keep the tool label
+            pool.submit(contextvars.copy_context().run, run_chunk, index, chunk)
+
+        pending = len(chunks)
+        while pending:
+            _, item = arrivals.get()
+            if item is None:
+                pending -= 1
+                continue
+            raw_items += 1
+
+            # Patch missing values and match the topic against anchor texts if link is blank
+            if "additional_context" not in item:
+                item["additional_context"] = ""
+            if not str(item.get("link") or "").strip():
+                item["link"] = link_index.best_match(str(item.get("topic") or "")) or ""
+
+            # Overlapping chunks report the same update twice; the first one wins
+            key = update_key(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            updates.append(item)
+            if writer is not None:
+                writer.writerow(item)
+                out.flush()
+            if first_row_seconds is None:
+                first_row_seconds = round(time.perf_counter() - started, 3)
+
+    if len(chunks) > 1 or truncated:
+        print(
+            f"🧩 Extracted {len(updates)} updates from {len(chunks)} chunks "
+            f"({raw_items - len(updates)} duplicates merged, {len(failed)} chunks failed, {len(truncated)} truncated)"
+        )
+
+    df = pd.DataFrame(updates, columns=UPDATE_COLUMNS)
+    df.attrs["chunking"] = {
+        "chunks": len(chunks),
+        "failed_chunks": len(failed),
+        "truncated_chunks": len(truncated),
+        "raw_items": raw_items,
+        "merged_items": len(updates),
+        "first_row_seconds": first_row_seconds,
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+    return df
+
+
+def extract_updates_to_file(url: str, extracted_text: str, bypass_cache: bool = False) -> Tuple[pd.DataFrame, ArtifactHandle]:
+    writer = get_artifact_store().writer(".csv", "updates", url or None, encoding="utf-8-sig", newline="")
+    with writer as f:
+        df = extract_updates(extracted_text, bypass_cache, out=f)
+    return df, writer.handle
+
+# Tool
+class LLMExtractorTool(BaseTool):
+    name: str = "llm_extractor_tool"
+    description: str = "Extracts structured regulatory updates from extracted text and inferred links"
+    args_schema: type = LLMExtractorInput
+
+    # In-memory pipeline contract (see mcp_server/pipeline.py)
+    consumes: ClassVar[Tuple[str, ...]] = ("url", "extracted_text")
+    produces: ClassVar[Tuple[str, ...]] = ("updates",)
+
+    def run_in_memory(self, url: str, extracted_text: str, write_artifacts: bool = False, bypass_cache: bool = False) -> Dict:
+        if write_artifacts:
+            df, handle = extract_updates_to_file(url, extracted_text, bypass_cache)
+            return {
+                "updates": df,
+                "chunking": df.attrs.get("chunking"),
+                "output_file": handle.path,
+                "output_artifact": handle._asdict(),
+            }
+        df = extract_updates(extracted_text, bypass_cache)
+        return {"updates": df, "chunking": df.attrs.get("chunking")}
+
+    def _run(self, url: str, extracted_file: str, bypass_cache: bool = False) -> Dict:
+        if not os.path.exists(extracted_file):
+            raise FileNotFoundError(f"❌ Extracted .txt file not found: {extracted_file}")
+
+        extracted_text = read_text(extracted_file)
 
-        domain = urlparse(url).netloc.replace('.', '_') if url else "unknown"
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_path = OUTPUT_DIR / f"{domain}_llm_output_{timestamp}.csv"
-        df.to_csv(output_path, index=False, encoding="utf-8-sig")
+        df, handle = extract_updates_to_file(url, extracted_text, bypass_cache)
 
-        print(f"✅ LLM-extracted data saved to: {output_path}")
+        print(f"✅ LLM-extracted data saved to: {handle.path}")
         return {
             "url": url,
-            "output_file": str(output_path)
+            "output_file": handle.path,
+            "output_artifact": handle._asdict(),
+            "chunking": df.attrs.get("chunking")
         }
 
 # Optional instance
@@ -1,17 +1,30 @@
+import asyncio
 import feedparser
-from pydantic import BaseModel, Field
-from typing import List, Dict
-from urllib.parse import urlparse
-from pathlib import Path
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Optional
 from crewai.tools import BaseTool
-
-# ✅ Absolute path to save RSS outputs
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from shared.artifact_store import get_artifact_store
+from shared.artifacts import ArtifactHandle, read_text
+from shared.feeds import fetch_new_entries
+from shared.fetch_state import content_hash, get_fetch_state_store
+from shared.metrics import span
 
 
 class RSSFetcherInput(BaseModel):
-    url: str = Field(..., description="URL of the RSS or Atom feed")
+    url: Optional[str] = Field(None, description="URL of the RSS or Atom feed")
+    urls: Optional[List[str]] = Field(None, description="Several feeds to fetch concurrently; only entries not seen on earlier runs are returned")
+    max_entries: int = Field(25, ge=1, le=1000, description="Maximum entries read from each feed")
+    force: bool = Field(False, description="Fetch unconditionally and report the feed as changed")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if not self.url and not self.urls:
+            raise ValueError("Provide 'url' or 'urls'")
+        return self
+
+
+def format_entry(title: str, date: str, summary: str, link: str) -> str:
+    return f"Title: {title}\nDate: {date}\nSummary: {summary}\nLink: {link}\n---\n"
 
 
 class RSSFetcherTool(BaseTool):
@@ -19,9 +32,42 @@ class RSSFetcherTool(BaseTool):
     description: str = "Fetches and parses RSS/Atom feed content for LLM extraction"
     args_schema: type = RSSFetcherInput
 
-    def _run(self, url: str) -> Dict:
-        parsed = feedparser.parse(url)
-        entries = parsed.entries[:25]
+    def _run(
+        self, url: Optional[str] = None, urls: Optional[List[str]] = None, max_entries: int = 25, force: bool = False
+    ) -> Dict:
+        if urls:
+            return self._multi_result(asyncio.run(fetch_new_entries(urls, max_entries, force)))
+        return self._fetch_one(url, max_entries, force)
+
+    async def _arun(
+        self, url: Optional[str] = None, urls: Optional[List[str]] = None, max_entries: int = 25, force: bool = False
+    ) -> Dict:
+        # Multi-feed fetches are I/O-bound; await them on the server's loop
+        if urls:
+            fetched = await fetch_new_entries(urls, max_entries, force)
+            # The artifact write hashes the text and commits to SQLite; not on the loop
+            return await asyncio.to_thread(self._multi_result, fetched)
+        return await asyncio.to_thread(self._fetch_one, url, max_entries, force)
+
+    def _fetch_one(self, url: str, max_entries: int = 25, force: bool = False) -> Dict:
+        previous = get_artifact_store().latest(url, "rss")
+        store = get_fetch_state_store()
+
+        # Conditional request: only worth sending if last run's output is still stored
+        state = store.get(url) if not force and previous is not None else None
+        # feedparser downloads and parses in one call
+        with span("fetch"):
+            if state is not None:
+                parsed = feedparser.parse(url, etag=state.etag, modified=state.last_modified)
+            else:
+                parsed = feedparser.parse(url)
+
+        if state is not None and parsed.get("status") == 304:
+            store.touch(url)
+            print(f"✅ RSS feed not modified since last fetch: {url}")
+            return self._unchanged_result(url, previous)
+
+        entries = parsed.entries[:max_entries]
 
         result_lines = []
         links = []
@@ -31,25 +77,68 @@ class RSSFetcherTool(BaseTool):
             summary = entry.get("summary", "") or entry.get("content", [{}])[0].get("value", "")
             link = entry.get("link", "")
             date = entry.get("published", "") or entry.get("updated", "")
-            result_lines.append(f"Title: {title}\nDate: {date}\nSummary: {summary}\nLink: {link}\n---\n")
+            result_lines.append(format_entry(title, date, summary, link))
             if link:
                 links.append(link)
 
         visible_text = "\n".join(result_lines)
         unique_links = list(set(links))
 
-        domain = urlparse(url).netloc.replace('.', '_')
-        output_path = OUTPUT_DIR / f"{domain}_rss_extracted.txt"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(visible_text)
+        # Servers without validator support still get caught by the content hash
+        changed = True
+        if entries or not parsed.get("bozo"):
+            changed = store.record(url, content_hash(visible_text), parsed.get("etag"), parsed.get("modified"))
+        if state is not None and not changed:
+            print(f"✅ RSS feed content unchanged since last fetch: {url}")
+            return self._unchanged_result(url, previous)
 
-        print(f"✅ RSS content saved to: {output_path}")
+        with span("write"):
+            handle = get_artifact_store().put_text(visible_text, ".txt", "rss", url)
+
+        print(f"✅ RSS content saved to: {handle.path}")
 
         return {
             "url": url,
             "extracted_text": visible_text,
             "extracted_links": unique_links,
-            "extracted_file": str(output_path)
+            "extracted_file": handle.path,
+            "unchanged": False
+        }
+
+    def _unchanged_result(self, url: str, previous: ArtifactHandle) -> Dict:
+        # Same shape as a fresh fetch, served from last run's output file
+        visible_text = read_text(previous.path)
+        links = [line[len("Link: "):] for line in visible_text.splitlines() if line.startswith("Link: ") and len(line) > 6]
+        return {
+            "url": url,
+            "extracted_text": visible_text,
+            "extracted_links": list(set(links)),
+            "extracted_file": previous.path,
+            "unchanged": True
+        }
+
+    def _multi_result(self, fetched: Dict) -> Dict:
+        entries = fetched["entries"]
+        visible_text = "\n".join(format_entry(e["title"], e["date"], e["summary"], e["link"]) for e in entries)
+
+        with span("write"):
+            output_path = get_artifact_store().put_text(visible_text, ".txt", "rss_multi").path
+
+        failed = [feed for feed in fetched["feeds"] if feed["error"]]
+        print(
+            f"✅ {len(entries)} new entries from {len(fetched['feeds'])} feeds "
+            f"({len(failed)} failed) in {fetched['wall_seconds']}s, saved to: {output_path}"
+        )
+
+        return {
+            "urls": [feed["url"] for feed in fetched["feeds"]],
+            "entries": entries,
+            "feeds": fetched["feeds"],
+            "extracted_text": visible_text,
+            "extracted_links": list(dict.fromkeys(e["link"] for e in entries if e["link"])),
+            "extracted_file": output_path,
+            "unchanged": not entries,
+            "wall_seconds": fetched["wall_seconds"]
         }
 
 rss_fetcher_tool = RSSFetcherTool()
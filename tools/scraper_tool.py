@@ -1,23 +1,86 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Type
+from typing import ClassVar, Dict, Optional, Tuple, Type
 import asyncio
+import os
 import sys
-from pathlib import Path
-from urllib.parse import urlparse
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, Page
 from crewai.tools import BaseTool
+from shared.artifact_store import get_artifact_store
+from shared.browser_pool import get_browser_pool
+from shared.fetch_state import get_fetch_state_store, page_content_hash
+from shared.metrics import span
 
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Reuse warm browsers from the shared pool; set SCRAPER_BROWSER_POOL=0 to launch per call
+USE_BROWSER_POOL = os.getenv("SCRAPER_BROWSER_POOL", "1") != "0"
+
+# Time to let lazy-loaded content settle after scrolling
+SETTLE_MS = 3000
 
 # Windows-specific fix
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
+# error_html() pages start with this; they are never recorded as a fetch
+ERROR_HTML_PREFIX = "<html><body><h1>Error scraping "
+
 # Input schema
 class ScraperInput(BaseModel):
     url: str = Field(..., description="The URL of the website to scrape")
+    force: bool = Field(False, description="Report the page as changed even if its content hash matches the last scrape")
+
+
+async def load_html(page: Page, target_url: str, settle_ms: int = SETTLE_MS) -> str:
+    await page.goto(target_url, timeout=120_000)
+    await page.wait_for_selector("main", timeout=15_000)
+    await page.wait_for_load_state("networkidle")
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    await page.wait_for_timeout(settle_ms)
+    return await page.content()
+
+
+async def fetch_html_cold(target_url: str, settle_ms: int = SETTLE_MS) -> str:
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            return await load_html(page, target_url, settle_ms)
+        finally:
+            await browser.close()
+
+
+def error_html(target_url: str, e: Exception) -> str:
+    return f"{ERROR_HTML_PREFIX}{target_url}</h1><p>{str(e)}</p></body></html>"
+
+
+def check_unchanged(target_url: str, html_content: str, force: bool = False) -> Dict:
+    # Playwright renders the page regardless, so change detection is by the
+    # hash of its visible text rather than by HTTP validators
+    if html_content.startswith(ERROR_HTML_PREFIX):
+        return {"unchanged": False, "content_hash": None}
+    with span("hash"):
+        digest = page_content_hash(html_content, target_url)
+    changed = get_fetch_state_store().record(target_url, digest)
+    return {"unchanged": not (changed or force), "content_hash": digest}
+
+
+def fetch_html(target_url: str) -> str:
+    try:
+        with span("fetch"):
+            if USE_BROWSER_POOL:
+                return get_browser_pool().run(lambda page: load_html(page, target_url))
+            return asyncio.run(fetch_html_cold(target_url))
+    except Exception as e:
+        return error_html(target_url, e)
+
+
+async def afetch_html(target_url: str) -> str:
+    try:
+        with span("fetch"):
+            if USE_BROWSER_POOL:
+                return await get_browser_pool().arun(lambda page: load_html(page, target_url))
+            return await fetch_html_cold(target_url)
+    except Exception as e:
+        return error_html(target_url, e)
 
 # Tool class
 class ScraperTool(BaseTool):
@@ -25,38 +88,59 @@ class ScraperTool(BaseTool):
     description: str = "Scrapes raw HTML content from the provided URL and saves it to a file"
     args_schema: Type[BaseModel] = ScraperInput
 
-    def _run(self, url: str) -> Dict:
-        async def fetch_html(target_url: str) -> str:
-            try:
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch(headless=True)
-                    page = await browser.new_page()
-                    await page.goto(target_url, timeout=120_000)
-                    await page.wait_for_selector("main", timeout=15_000)
-                    await page.wait_for_load_state("networkidle")
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await page.wait_for_timeout(3000)
-                    html = await page.content()
-                    await browser.close()
-                    return html
-            except Exception as e:
-                return f"<html><body><h1>Error scraping {target_url}</h1><p>{str(e)}</p></body></html>"
-
-        html_content = asyncio.run(fetch_html(url))
+    # In-memory pipeline contract (see mcp_server/pipeline.py)
+    consumes: ClassVar[Tuple[str, ...]] = ("url",)
+    produces: ClassVar[Tuple[str, ...]] = ("scraped_html",)
+
+    def _run(self, url: str, force: bool = False) -> Dict:
+        html_content = fetch_html(url)
+        return {**self._save(url, html_content), **check_unchanged(url, html_content, force)}
+
+    async def _arun(self, url: str, force: bool = False) -> Dict:
+        # Lets the MCP server await the scrape on its event loop instead of a worker thread
+        html_content = await afetch_html(url)
+        # Hashing and writing the page, re-parsing it for its content hash and the
+        # SQLite writes would all block the loop, so they run on threads
+        saved = await asyncio.to_thread(self._save, url, html_content)
+        return {**saved, **await asyncio.to_thread(check_unchanged, url, html_content, force)}
+
+    def run_in_memory(self, url: str, write_artifacts: bool = False, force: bool = False) -> Dict:
+        html_content = fetch_html(url)
+        state = check_unchanged(url, html_content, force)
+        saved = self._save(url, html_content) if write_artifacts else None
+        return self._in_memory_result(html_content, state, saved)
+
+    async def arun_in_memory(self, url: str, write_artifacts: bool = False, force: bool = False) -> Dict:
+        html_content = await afetch_html(url)
+        state = await asyncio.to_thread(check_unchanged, url, html_content, force)
+        saved = await asyncio.to_thread(self._save, url, html_content) if write_artifacts else None
+        return self._in_memory_result(html_content, state, saved)
+
+    @staticmethod
+    def _in_memory_result(html_content: str, state: Dict, saved: Optional[Dict]) -> Dict:
+        # "unchanged": True lets the pipeline skip every stage downstream of the scrape
+        result = {"scraped_html": html_content, **state}
+        if saved is not None:
+            result.update(scraped_file=saved["scraped_file"], scraped_artifact=saved["scraped_artifact"])
+        return result
+
+    def forget_fetch_state(self, url: str) -> None:
+        # Called by the pipeline when a later stage failed, so the next run re-processes the page
+        get_fetch_state_store().forget(url)
 
+    def _save(self, url: str, html_content: str) -> Dict:
         print("📦 ScraperTool: HTML length =", len(html_content), flush=True)
         print("🔍 HTML preview:", repr(html_content[:300]), flush=True)
 
-        domain = urlparse(url).netloc.replace('.', '_')
-        output_path = OUTPUT_DIR / f"{domain}_scraped.html"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        with span("write"):
+            handle = get_artifact_store().put_text(html_content, ".html", "scraped", url)
 
-        print(f"✅ Scraped content saved to {output_path}", flush=True)
+        print(f"✅ Scraped content saved to {handle.path}", flush=True)
 
         return {
             "url": url,
-            "scraped_file": str(output_path)
+            "scraped_file": handle.path,
+            "scraped_artifact": handle._asdict()
         }
 
 # Instantiate
@@ -0,0 +1 @@
+# Shared runtime helpers for the MCP tools (not tools themselves).
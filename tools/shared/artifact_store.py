@@ -0,0 +1,231 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from shared import metrics
+from shared.artifacts import ArtifactHandle, ArtifactWriter, artifact_handle
+
+# Every tool output lives here as objects/<sha[:2]>/<sha[2:4]>/<sha><suffix>, so
+# concurrent runs on the same domain never share a file and identical content is stored once
+ARTIFACT_STORE_PATH = Path(os.getenv("ARTIFACT_STORE_PATH", "regulatory_outputs/artifacts"))
+ARTIFACT_RETENTION_SECONDS = float(os.getenv("ARTIFACT_RETENTION_DAYS", "30")) * 24 * 3600
+ARTIFACT_STORE_MAX_BYTES = int(float(os.getenv("ARTIFACT_STORE_MAX_MB", "4096")) * 1024 * 1024)
+
+# GC needs a table scan, so it only runs every N writes (and on POST /artifacts/gc)
+GC_EVERY_N_PUTS = 200
+# Temp files this old belong to a writer that died before committing
+STALE_TEMP_SECONDS = 3600
+
+
+class _StoreWriter(ArtifactWriter):
+    # Streams into the store's tmp/ directory; on success the file is renamed to its hash
+    def __init__(self, store: "ArtifactStore", suffix: str, kind: str, url: Optional[str], **kwargs):
+        super().__init__(store.temp_path(suffix), **kwargs)
+        self._store = store
+        self._suffix = suffix
+        self._kind = kind
+        self._url = url
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            super().__exit__(exc_type, exc, tb)
+        except BaseException:
+            self.path.unlink(missing_ok=True)
+            raise
+        if exc_type is not None:
+            self.path.unlink(missing_ok=True)
+            return False
+        self.handle = self._store._commit(self.path, self.handle, self._suffix, self._kind, self._url)
+        return False
+
+
+class ArtifactStore:
+    """Content-addressed files with a SQLite index of who produced them.
+
+    Writes go to a temp file and are renamed into place under their SHA-256, so
+    readers never see a partial file and two writers of the same content end up
+    with one copy. `refs` records which URL and tool produced each object, for
+    latest() lookups. Objects unused for `retention_seconds`, then the least
+    recently used beyond `max_bytes`, are removed by gc().
+
+    Commits and GC run in an IMMEDIATE transaction, which also serializes them
+    across processes sharing the store.
+    """
+
+    def __init__(
+        self,
+        root: Path = ARTIFACT_STORE_PATH,
+        retention_seconds: float = ARTIFACT_RETENTION_SECONDS,
+        max_bytes: int = ARTIFACT_STORE_MAX_BYTES,
+    ):
+        self.root = Path(root)
+        self.retention_seconds = retention_seconds
+        self.max_bytes = max_bytes
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        (self.root / "tmp").mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS objects (
+                path TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS refs (
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                path TEXT NOT NULL,
+                tool TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (url, kind, path)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS objects_last_used ON objects (last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_path ON refs (path)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_latest ON refs (url, kind, created_at)")
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def temp_path(self, suffix: str = "") -> Path:
+        """A fresh path in the store's tmp/ for producers that write files themselves (put_file)."""
+        return self.root / "tmp" / f"{os.getpid()}-{uuid.uuid4().hex}{suffix}"
+
+    def _object_path(self, sha256: str, suffix: str) -> str:
+        return f"objects/{sha256[:2]}/{sha256[2:4]}/{sha256}{suffix}"
+
+    # ---- writes ----------------------------------------------------------
+
+    def writer(
+        self, suffix: str, kind: str, url: Optional[str] = None, binary: bool = False,
+        encoding: str = "utf-8", newline: Optional[str] = None,
+    ) -> ArtifactWriter:
+        """An ArtifactWriter whose file is committed to the store on exit; `handle` points at the object."""
+        return _StoreWriter(self, suffix, kind, url, binary=binary, encoding=encoding, newline=newline)
+
+    def put_text(self, text: str, suffix: str, kind: str, url: Optional[str] = None) -> ArtifactHandle:
+        writer = self.writer(suffix, kind, url)
+        with writer as f:
+            f.write(text)
+        return writer.handle
+
+    def put_file(self, path: Path, suffix: str, kind: str, url: Optional[str] = None) -> ArtifactHandle:
+        """Move a finished file (ideally from temp_path(), same filesystem) into the store."""
+        return self._commit(Path(path), artifact_handle(path), suffix, kind, url)
+
+    def _commit(self, temp: Path, handle: ArtifactHandle, suffix: str, kind: str, url: Optional[str]) -> ArtifactHandle:
+        relative = self._object_path(handle.sha256, suffix)
+        target = self.root / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        with self._transaction() as conn:
+            if target.exists():
+                temp.unlink()  # identical content is already stored
+            else:
+                os.replace(temp, target)
+            conn.execute(
+                "INSERT INTO objects (path, sha256, size, created_at, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET last_used = excluded.last_used",
+                (relative, handle.sha256, handle.size, now, now),
+            )
+            if url is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO refs (url, kind, path, tool, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, kind, relative, metrics.current_tool.get() or None, now),
+                )
+            self._puts += 1
+            run_gc = self._puts % GC_EVERY_N_PUTS == 0
+        if run_gc:
+            self.gc()
+        return ArtifactHandle(str(target), handle.size, handle.sha256)
+
+    # ---- reads -----------------------------------------------------------
+
+    def latest(self, url: str, kind: str) -> Optional[ArtifactHandle]:
+        """The newest object of `kind` produced for `url`, if it is still stored (counts as a use)."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT o.path, o.size, o.sha256 FROM refs r JOIN objects o ON o.path = r.path "
+                "WHERE r.url = ? AND r.kind = ? ORDER BY r.created_at DESC LIMIT 1",
+                (url, kind),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE objects SET last_used = ? WHERE path = ?", (time.time(), row[0]))
+        if row is None or not (self.root / row[0]).exists():
+            return None
+        return ArtifactHandle(str(self.root / row[0]), row[1], row[2])
+
+    # ---- retention -------------------------------------------------------
+
+    def gc(self, retention_seconds: Optional[float] = None, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """Drop objects unused for retention_seconds, then LRU ones until under max_bytes."""
+        retention_seconds = self.retention_seconds if retention_seconds is None else retention_seconds
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        now = time.time()
+        removed, freed = 0, 0
+        with self._transaction() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            doomed = []
+            for path, size, last_used in conn.execute("SELECT path, size, last_used FROM objects ORDER BY last_used"):
+                if last_used >= now - retention_seconds and total <= max_bytes:
+                    break
+                doomed.append(path)
+                total -= size
+                freed += size
+            for path in doomed:
+                conn.execute("DELETE FROM objects WHERE path = ?", (path,))
+                conn.execute("DELETE FROM refs WHERE path = ?", (path,))
+                # Unlinked inside the transaction so a concurrent commit of the same content waits
+                (self.root / path).unlink(missing_ok=True)
+            removed = len(doomed)
+
+        for temp in (self.root / "tmp").iterdir():
+            try:
+                if now - temp.stat().st_mtime > STALE_TEMP_SECONDS:
+                    temp.unlink()
+            except FileNotFoundError:
+                pass
+        return {"removed": removed, "freed_bytes": freed, **self.stats()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            objects, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM objects").fetchone()
+            refs = self._conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+        return {"objects": objects, "bytes": size, "refs": refs, "max_bytes": self.max_bytes}
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+        return _store
@@ -0,0 +1,118 @@
+import hashlib
+import io
+import mmap
+import os
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple, Optional, Union
+
+# Tools return a handle for each file they write ("cleaned_file" -> "cleaned_artifact")
+# instead of its content; inline=True on a tool brings the content back into the response
+ARTIFACT_CHUNK_BYTES = int(os.getenv("ARTIFACT_CHUNK_BYTES", str(1 << 20)))
+
+PathLike = Union[str, Path]
+
+
+class ArtifactHandle(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+class _HashingSink(io.RawIOBase):
+    # Bottom of the writer stack: every byte that reaches the file is hashed on the way
+    def __init__(self, raw: IO[bytes]):
+        self._raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        written = self._raw.write(data)
+        self.sha256.update(memoryview(data)[:written])
+        self.size += written
+        return written
+
+
+class ArtifactWriter:
+    """Write a file in chunks while hashing it; `handle` is set once the block exits.
+
+        writer = ArtifactWriter(path)
+        with writer as f:
+            f.write(text)
+        handle = writer.handle
+
+    Yields a text file, or with binary=True a buffered binary one (e.g. for
+    lxml's ElementTree.write), so large outputs never need to be built as one
+    string first.
+    """
+
+    def __init__(self, path: PathLike, binary: bool = False, encoding: str = "utf-8", newline: Optional[str] = None):
+        self.path = Path(path)
+        self.binary = binary
+        self.encoding = encoding
+        self.newline = newline
+        self.handle: Optional[ArtifactHandle] = None
+        self._sink: Optional[_HashingSink] = None
+        self._file: Optional[IO] = None
+
+    def __enter__(self) -> IO:
+        raw = open(self.path, "wb", buffering=0)
+        self._sink = _HashingSink(raw)
+        buffered = io.BufferedWriter(self._sink, buffer_size=ARTIFACT_CHUNK_BYTES)
+        if self.binary:
+            self._file = buffered
+        else:
+            self._file = io.TextIOWrapper(buffered, encoding=self.encoding, newline=self.newline, write_through=False)
+        return self._file
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._file.flush()
+        finally:
+            self._file.close()
+            self._sink._raw.close()
+        if exc_type is None:
+            self.handle = ArtifactHandle(str(self.path), self._sink.size, self._sink.sha256.hexdigest())
+        return False
+
+
+def write_text(path: PathLike, text: str, encoding: str = "utf-8") -> ArtifactHandle:
+    writer = ArtifactWriter(path, encoding=encoding)
+    with writer as f:
+        f.write(text)
+    return writer.handle
+
+
+def iter_bytes(path: PathLike, chunk_bytes: int = ARTIFACT_CHUNK_BYTES) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            yield chunk
+
+
+def artifact_handle(path: PathLike) -> ArtifactHandle:
+    """Handle for a file already on disk, hashed in ARTIFACT_CHUNK_BYTES pieces."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter_bytes(path):
+        digest.update(chunk)
+        size += len(chunk)
+    return ArtifactHandle(str(path), size, digest.hexdigest())
+
+
+def read_text(path: PathLike, encoding: str = "utf-8") -> str:
+    """Decode a file straight from a memory map, skipping the intermediate bytes copy."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return str(mapped, encoding)
+
+
+def is_blank(path: PathLike) -> bool:
+    # Stops at the first chunk with any non-whitespace byte, so real pages cost one read
+    return not any(chunk.strip() for chunk in iter_bytes(path))
@@ -0,0 +1,266 @@
+import asyncio
+import atexit
+import os
+import sys
+import threading
+from typing import Any, Awaitable, Callable, List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+# Pool sizing (overridable via environment)
+POOL_BROWSERS = int(os.getenv("SCRAPER_POOL_BROWSERS", "1"))
+POOL_CONTEXTS_PER_BROWSER = int(os.getenv("SCRAPER_POOL_CONTEXTS", "4"))
+POOL_MAX_PAGES_PER_CONTEXT = int(os.getenv("SCRAPER_POOL_MAX_PAGES_PER_CONTEXT", "50"))
+POOL_MAX_PAGES_PER_BROWSER = int(os.getenv("SCRAPER_POOL_MAX_PAGES_PER_BROWSER", "500"))
+
+# Windows-specific fix (the pool loop spawns the browser subprocesses)
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+PageFn = Callable[[Page], Awaitable[Any]]
+
+
+class _BrowserHandle:
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.open_contexts = 0
+        self.retired = False
+
+
+class _Slot:
+    def __init__(self, index: int):
+        self.index = index  # browser index this slot is pinned to
+        self.handle: Optional[_BrowserHandle] = None
+        self.context: Optional[BrowserContext] = None
+        self.pages_served = 0
+
+
+class BrowserPool:
+    """Long-lived headless Chromium browsers shared by every caller in the process.
+
+    Playwright objects are bound to the event loop that created them, so the pool
+    owns a private loop on a background thread; sync callers go through `run()`,
+    async callers on any other loop go through `arun()`.
+    """
+
+    def __init__(
+        self,
+        browsers: int = POOL_BROWSERS,
+        contexts_per_browser: int = POOL_CONTEXTS_PER_BROWSER,
+        max_pages_per_context: int = POOL_MAX_PAGES_PER_CONTEXT,
+        max_pages_per_browser: int = POOL_MAX_PAGES_PER_BROWSER,
+        headless: bool = True,
+    ):
+        self.browsers = max(1, browsers)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_pages_per_context = max(1, max_pages_per_context)
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self.headless = headless
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._playwright = None
+        self._handles: List[Optional[_BrowserHandle]] = []
+        self._handle_locks: List[asyncio.Lock] = []
+        self._slots: Optional[asyncio.Queue] = None
+        self._all_slots: List[_Slot] = []
+
+    # ---- lifecycle -------------------------------------------------------
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.started:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run_loop, args=(loop,), name="browser-pool", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._startup(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                raise
+            self._loop, self._thread = loop, thread
+            print(
+                f"🌐 BrowserPool started: {self.browsers} browser(s) x {self.contexts_per_browser} context(s)",
+                flush=True,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if not self.started:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+            except Exception as e:
+                print(f"⚠️ BrowserPool shutdown error: {e}", flush=True)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=30)
+            self._loop = self._thread = None
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+        loop.close()
+
+    async def _startup(self) -> None:
+        self._playwright = await async_playwright().start()
+        self._handles = [None] * self.browsers
+        self._handle_locks = [asyncio.Lock() for _ in range(self.browsers)]
+        self._slots = asyncio.Queue()
+        self._all_slots = []
+        for b in range(self.browsers):
+            self._handles[b] = await self._launch()
+            for _ in range(self.contexts_per_browser):
+                slot = _Slot(b)
+                await self._open_context(slot)
+                self._all_slots.append(slot)
+                self._slots.put_nowait(slot)
+
+    async def _shutdown(self) -> None:
+        for slot in self._all_slots:
+            await self._close_context(slot)
+        for handle in self._handles:
+            if handle is not None:
+                await self._close_browser(handle)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    # ---- browsers and contexts ------------------------------------------
+
+    async def _launch(self) -> _BrowserHandle:
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        return _BrowserHandle(browser)
+
+    @staticmethod
+    async def _close_browser(handle: _BrowserHandle) -> None:
+        try:
+            await handle.browser.close()
+        except Exception:
+            pass
+
+    async def _current_handle(self, index: int) -> _BrowserHandle:
+        # Relaunch the browser behind this index if it crashed or was retired
+        handle = self._handles[index]
+        if handle is not None and not handle.retired and handle.browser.is_connected():
+            return handle
+        async with self._handle_locks[index]:
+            handle = self._handles[index]
+            if handle is None or handle.retired or not handle.browser.is_connected():
+                if handle is not None and not handle.retired:
+                    print(f"⚠️ BrowserPool: browser {index} disconnected, relaunching", flush=True)
+                    handle.retired = True
+                    await self._close_browser(handle)
+                handle = await self._launch()
+                self._handles[index] = handle
+            return handle
+
+    async def _open_context(self, slot: _Slot) -> None:
+        handle = await self._current_handle(slot.index)
+        slot.context = await handle.browser.new_context()
+        slot.handle = handle
+        slot.pages_served = 0
+        handle.open_contexts += 1
+
+    async def _close_context(self, slot: _Slot) -> None:
+        handle, context = slot.handle, slot.context
+        slot.handle = slot.context = None
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        if handle is not None:
+            handle.open_contexts -= 1
+            # A retired browser is closed once its last context is gone
+            if handle.retired and handle.open_contexts <= 0:
+                await self._close_browser(handle)
+
+    def _slot_is_healthy(self, slot: _Slot) -> bool:
+        return (
+            slot.context is not None
+            and slot.handle is not None
+            and not slot.handle.retired
+            and slot.handle.browser.is_connected()
+        )
+
+    async def _after_page(self, slot: _Slot, failed: bool) -> None:
+        slot.pages_served += 1
+        handle = slot.handle
+        if handle is not None:
+            handle.pages_served += 1
+            if handle.pages_served >= self.max_pages_per_browser and not handle.retired:
+                # Retire the browser: new contexts go to a fresh one, the old one
+                # lives until every in-flight page on it has finished
+                async with self._handle_locks[slot.index]:
+                    if self._handles[slot.index] is handle:
+                        handle.retired = True
+                        self._handles[slot.index] = await self._launch()
+        if failed or slot.pages_served >= self.max_pages_per_context or not self._slot_is_healthy(slot):
+            await self._close_context(slot)
+
+    # ---- page execution --------------------------------------------------
+
+    async def _with_page(self, page_fn: PageFn) -> Any:
+        slot = await self._slots.get()
+        try:
+            if not self._slot_is_healthy(slot):
+                await self._close_context(slot)
+                await self._open_context(slot)
+            page = await slot.context.new_page()
+            failed = False
+            try:
+                return await page_fn(page)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                try:
+                    await self._after_page(slot, failed)
+                except Exception as e:
+                    print(f"⚠️ BrowserPool: recycling failed: {e}", flush=True)
+        finally:
+            self._slots.put_nowait(slot)
+
+    def _submit(self, page_fn: PageFn):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BrowserPool.run() cannot be called from the pool's own event loop")
+        return asyncio.run_coroutine_threadsafe(self._with_page(page_fn), self._loop)
+
+    def run(self, page_fn: PageFn, timeout: Optional[float] = None) -> Any:
+        """Run `page_fn(page)` on a fresh page from the pool and return its result (blocking)."""
+        self.start()
+        return self._submit(page_fn).result(timeout)
+
+    async def arun(self, page_fn: PageFn) -> Any:
+        """Async variant of `run()` for callers living on another event loop."""
+        if not self.started:
+            await asyncio.to_thread(self.start)
+        return await asyncio.wrap_future(self._submit(page_fn))
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Process-wide pool shared by every tool; browsers are launched on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,205 @@
+import asyncio
+import atexit
+import calendar
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import feedparser
+import httpx
+
+from shared.fetch_state import content_hash, get_fetch_state_store
+from shared.metrics import span
+
+# Multi-feed fetching: bounded overall and per host, so one regulator's server
+# never sees more than a couple of our connections at once
+RSS_CONCURRENCY = int(os.getenv("RSS_CONCURRENCY", "16"))
+RSS_PER_HOST_CONCURRENCY = int(os.getenv("RSS_PER_HOST_CONCURRENCY", "2"))
+RSS_TIMEOUT_SECONDS = float(os.getenv("RSS_TIMEOUT_SECONDS", "20"))
+# feedparser is pure Python; parsing runs in worker processes (0 = parse inline)
+RSS_PARSE_WORKERS = int(os.getenv("RSS_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+USER_AGENT = "Mozilla/5.0 (compatible; RegulatoryFeedFetcher/1.0)"
+
+# Fetch state for multi-feed runs is kept apart from rss_fetcher_tool's single-URL
+# state: the two hash different things, and sharing one ETag would make either
+# mode answer "unchanged" for output the other one produced
+STATE_KEY_PREFIX = "feed:"
+
+
+def entry_id(entry: Dict[str, Any]) -> str:
+    # Prefer the feed's own GUID; fall back to the link, then to title + date
+    guid = entry.get("id") or entry.get("guid") or entry.get("link")
+    if guid:
+        return str(guid)
+    raw = f"{entry.get('title', '')}|{entry.get('published', '') or entry.get('updated', '')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def parse_feed(feed_url: str, content: bytes, content_type: Optional[str], max_entries: int) -> Dict[str, Any]:
+    """Parse raw feed bytes into plain, picklable entry dicts (runs in a worker process)."""
+    headers = {"content-type": content_type} if content_type else {}
+    parsed = feedparser.parse(content, response_headers=headers)
+    entries = []
+    for entry in parsed.entries[:max_entries]:
+        parsed_time = entry.get("published_parsed") or entry.get("updated_parsed")
+        entries.append({
+            "feed": feed_url,
+            "id": entry_id(entry),
+            "title": entry.get("title", ""),
+            "summary": entry.get("summary", "") or entry.get("content", [{}])[0].get("value", ""),
+            "link": entry.get("link", ""),
+            "date": entry.get("published", "") or entry.get("updated", ""),
+            "timestamp": calendar.timegm(parsed_time) if parsed_time else None,
+        })
+    error = None
+    if parsed.get("bozo") and not entries:
+        error = str(parsed.get("bozo_exception") or "unparseable feed")
+    return {"title": parsed.feed.get("title", ""), "entries": entries, "error": error}
+
+
+_parse_pool: Optional[Executor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[Executor]:
+    global _parse_pool
+    if RSS_PARSE_WORKERS <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # Never fork: the server process runs browser-pool and LLM gateway threads
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _parse_pool = ProcessPoolExecutor(max_workers=RSS_PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+            atexit.register(_parse_pool.shutdown, wait=False, cancel_futures=True)
+        return _parse_pool
+
+
+class HostLimiter:
+    """One semaphore per host, created on first use."""
+
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[host]
+
+
+async def fetch_feed(
+    client: httpx.AsyncClient,
+    feed_url: str,
+    host_limiter: HostLimiter,
+    global_limiter: asyncio.Semaphore,
+    max_entries: int,
+    force: bool,
+) -> Dict[str, Any]:
+    # SQLite calls go to a thread so a locked store never stalls the event loop
+    store = get_fetch_state_store()
+    state_key = STATE_KEY_PREFIX + feed_url
+    state = None if force else await asyncio.to_thread(store.get, state_key)
+    headers = {}
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+    result: Dict[str, Any] = {"url": feed_url, "status": None, "unchanged": False, "entries": [], "error": None}
+    start = time.perf_counter()
+    try:
+        async with global_limiter, host_limiter(feed_url):
+            with span("fetch"):
+                response = await client.get(feed_url, headers=headers)
+        result["status"] = response.status_code
+        if response.status_code == 304:
+            await asyncio.to_thread(store.touch, state_key)
+            result["unchanged"] = True
+            return result
+        response.raise_for_status()
+
+        digest = content_hash(response.text)
+        if state is not None and state.content_hash == digest:
+            # Server ignores validators, but the body has not changed
+            await asyncio.to_thread(store.touch, state_key)
+            result["unchanged"] = True
+            return result
+
+        pool = get_parse_pool()
+        args = (feed_url, response.content, response.headers.get("content-type"), max_entries)
+        with span("parse"):
+            if pool is None:
+                parsed = parse_feed(*args)
+            else:
+                parsed = await asyncio.get_running_loop().run_in_executor(pool, parse_feed, *args)
+        if parsed["error"]:
+            result["error"] = parsed["error"]
+            return result
+
+        await asyncio.to_thread(
+            store.record, state_key, digest, response.headers.get("etag"), response.headers.get("last-modified")
+        )
+        result["entries"] = parsed["entries"]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def fetch_new_entries(
+    feed_urls: List[str],
+    max_entries: int = 25,
+    force: bool = False,
+    concurrency: int = RSS_CONCURRENCY,
+    per_host: int = RSS_PER_HOST_CONCURRENCY,
+) -> Dict[str, Any]:
+    """Fetch feeds concurrently and return entries not seen on earlier runs, newest first.
+
+    force ignores stored validators and the seen-entry set, re-emitting every entry.
+    """
+    store = get_fetch_state_store()
+    host_limiter = HostLimiter(per_host)
+    global_limiter = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    start = time.perf_counter()
+
+    async with httpx.AsyncClient(
+        timeout=RSS_TIMEOUT_SECONDS, limits=limits, follow_redirects=True, headers={"User-Agent": USER_AGENT}
+    ) as client:
+        results = await asyncio.gather(*(
+            fetch_feed(client, url, host_limiter, global_limiter, max_entries, force)
+            for url in dict.fromkeys(feed_urls)
+        ))
+
+    new_entries = []
+    for result in results:
+        entries = result.pop("entries")
+        ids = [e["id"] for e in entries]
+        fresh = set(ids) if force else await asyncio.to_thread(store.unseen, result["url"], ids)
+        new, emitted = [], set()
+        for entry in entries:
+            # A feed can repeat an entry; emit it once
+            if entry["id"] in fresh and entry["id"] not in emitted:
+                emitted.add(entry["id"])
+                new.append(entry)
+        await asyncio.to_thread(store.mark_seen, result["url"], fresh)
+        result["total_entries"] = len(entries)
+        result["new_entries"] = len(new)
+        new_entries.extend(new)
+
+    # Undated entries go last; ties keep feed order
+    new_entries.sort(key=lambda e: e["timestamp"] if e["timestamp"] is not None else float("-inf"), reverse=True)
+    return {
+        "feeds": results,
+        "entries": new_entries,
+        "wall_seconds": round(time.perf_counter() - start, 3),
+    }
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Set
+
+from shared.html_engine import extract_content
+
+# Per-URL validators and content hashes from the last fetch, so re-runs can
+# send conditional requests and skip pages whose content has not changed
+FETCH_STATE_PATH = Path(os.getenv("FETCH_STATE_PATH", "regulatory_outputs/fetch_state.sqlite3"))
+# Seen feed entry IDs older than this are dropped; feeds rarely republish that far back
+SEEN_RETENTION_SECONDS = float(os.getenv("FETCH_SEEN_RETENTION_DAYS", "180")) * 24 * 3600
+
+
+class FetchState(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
+    checked_at: float
+    changed_at: float
+
+
+class FetchStateStore:
+    def __init__(self, path: Path = FETCH_STATE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fetch_state (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                checked_at REAL NOT NULL,
+                changed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen_entries (
+                source TEXT NOT NULL,
+                entry_id TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (source, entry_id)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[FetchState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, etag, last_modified, content_hash, checked_at, changed_at FROM fetch_state WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return FetchState(*row) if row else None
+
+    def record(
+        self,
+        url: str,
+        content_hash: Optional[str],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> bool:
+        """Store the latest fetch of `url`; returns True if its content hash changed."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash, changed_at FROM fetch_state WHERE url = ?", (url,)).fetchone()
+            changed = row is None or row[0] != content_hash
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fetch_state (url, etag, last_modified, content_hash, checked_at, changed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, now, now if changed else row[1]),
+            )
+            self._conn.commit()
+        return changed
+
+    def touch(self, url: str) -> None:
+        # A 304 or identical hash: the page was checked but nothing changed
+        with self._lock:
+            self._conn.execute("UPDATE fetch_state SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def forget(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM fetch_state WHERE url = ?", (url,))
+            self._conn.execute("DELETE FROM seen_entries WHERE source = ?", (url,))
+            self._conn.commit()
+
+    def unseen(self, source: str, entry_ids: Iterable[str]) -> Set[str]:
+        """The subset of entry_ids not yet marked seen for `source`."""
+        entry_ids = set(entry_ids)
+        if not entry_ids:
+            return set()
+        with self._lock:
+            seen = {
+                row[0]
+                for row in self._conn.execute(
+                    f"SELECT entry_id FROM seen_entries WHERE source = ? AND entry_id IN ({','.join('?' * len(entry_ids))})",
+                    (source, *entry_ids),
+                )
+            }
+        return entry_ids - seen
+
+    def mark_seen(self, source: str, entry_ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_entries (source, entry_id, first_seen) VALUES (?, ?, ?)",
+                [(source, entry_id, now) for entry_id in entry_ids],
+            )
+            self._conn.execute("DELETE FROM seen_entries WHERE first_seen < ?", (now - SEEN_RETENTION_SECONDS,))
+            self._conn.commit()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def page_content_hash(html: str, url: str) -> str:
+    # Hash what downstream stages actually read (visible text and links), so
+    # nonces, tracking scripts and attribute churn do not count as changes
+    return content_hash(extract_content(html, url).text)
+
+
+_store: Optional[FetchStateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_fetch_state_store() -> FetchStateStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FetchStateStore()
+        return _store
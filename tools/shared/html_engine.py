@@ -0,0 +1,399 @@
+from typing import IO, Any, Iterator, List, NamedTuple, Optional, Set, TextIO, Union
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from bs4.element import CData, NavigableString, Tag
+
+from shared.artifacts import PathLike, iter_bytes, read_text
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml is optional; BeautifulSoup's html.parser is the fallback
+    lxml_html = None
+
+# Tags to remove
+TAGS_TO_REMOVE = ["script", "style", "noscript", "footer", "header", "nav", "aside"]
+
+# Elements kept even though they carry no text
+KEEP_EMPTY = ("br", "hr")
+
+_REMOVE = frozenset(TAGS_TO_REMOVE)
+_KEEP_EMPTY = frozenset(KEEP_EMPTY)
+
+# Strings BeautifulSoup's get_text() counts (comments, doctypes etc. are ignored)
+_TEXT_TYPES = (NavigableString, CData)
+
+
+class Link(NamedTuple):
+    text: str
+    href: str
+
+
+class Extraction(NamedTuple):
+    text: str
+    links: List[Link]
+
+
+def parse_html(html: str) -> Any:
+    """Parse once for callers that want to hand the same tree to several steps.
+
+    Returns an lxml document when lxml is installed, otherwise a BeautifulSoup tree.
+    """
+    if lxml_html is not None:
+        try:
+            return _parse_lxml(html)
+        except (etree.ParserError, ValueError):
+            pass
+    return BeautifulSoup(html, "html.parser")
+
+
+def _parse_lxml(html: str):
+    # Parse bytes so documents carrying an XML encoding declaration are accepted
+    parser = lxml_html.HTMLParser(encoding="utf-8", huge_tree=True)
+    return lxml_html.document_fromstring(html.encode("utf-8"), parser=parser)
+
+
+def parse_html_file(path: PathLike) -> Any:
+    """parse_html() for a page on disk, fed to lxml in chunks instead of read whole.
+
+    Only the tree is held in memory, never the page text as well. Without lxml
+    (or when lxml rejects the page) the file is read and handed to BeautifulSoup.
+    """
+    if lxml_html is not None:
+        parser = lxml_html.HTMLParser(encoding="utf-8", huge_tree=True)
+        try:
+            for chunk in iter_bytes(path):
+                parser.feed(chunk)
+            root = parser.close()
+        except etree.XMLSyntaxError:
+            root = None
+        if root is not None:
+            return root
+    return BeautifulSoup(read_text(path), "html.parser")
+
+
+def clean_html(html: str, prettify: bool = False) -> str:
+    """Drop TAGS_TO_REMOVE and every element without visible text in one bottom-up pass.
+
+    Same result as decomposing each unwanted tag and then every element whose
+    get_text(strip=True) is empty, without re-walking subtrees per element.
+    Uses lxml when installed and falls back to BeautifulSoup's html.parser.
+    """
+    cleaned = None
+    if lxml_html is not None:
+        try:
+            cleaned = _clean_lxml(html)
+        except (etree.ParserError, ValueError):
+            cleaned = None
+    if cleaned is None:
+        soup = _clean_soup(BeautifulSoup(html, "html.parser"))
+        return soup.prettify() if prettify else str(soup)
+    if prettify:
+        return BeautifulSoup(cleaned, "html.parser").prettify()
+    return cleaned
+
+
+def _clean_lxml(html: str) -> str:
+    root = _clean_lxml_tree(_parse_lxml(html))
+    return "" if root is None else lxml_html.tostring(root, encoding="unicode", method="html")
+
+
+def clean_html_file(path: PathLike, out: IO[bytes]) -> None:
+    """clean_html() from one file to a binary file object without building either as a string.
+
+    The page is parsed in chunks (parse_html_file) and lxml serializes the
+    cleaned tree straight into `out`.
+    """
+    tree = parse_html_file(path)
+    if isinstance(tree, Tag):
+        out.write(str(_clean_soup(tree)).encode("utf-8"))
+        return
+    root = _clean_lxml_tree(tree)
+    if root is not None:
+        # xmlfile serializes element by element (and, like tostring(), without a doctype)
+        with etree.xmlfile(out, encoding="utf-8") as xf:
+            xf.write(root, method="html")
+
+
+def _clean_lxml_tree(root):
+    # Cleans in place; None when nothing visible is left. Post-order walk on an
+    # explicit stack, so only the current path (not every element) holds a proxy.
+    # Frame: element, its child iterator, whether it has text, children to drop.
+    stack = [[root, iter(root), bool(root.text and root.text.strip()), []]]
+    while stack:
+        frame = stack[-1]
+        child = next(frame[1], None)
+        if child is not None:
+            if child.tail and child.tail.strip():
+                frame[2] = True  # a tail stays in the parent even if the child is dropped
+            if not isinstance(child.tag, str):
+                continue  # comments / processing instructions; only their tail matters
+            if child.tag in _REMOVE:
+                frame[3].append(child)
+            else:
+                stack.append([child, iter(child), bool(child.text and child.text.strip()), []])
+            continue
+
+        stack.pop()
+        el, has_text, drop = frame[0], frame[2], frame[3]
+        # Dropped only now that iteration over el's children is done; drop_tree keeps tails
+        for dropped in reversed(drop):
+            dropped.drop_tree()
+        if has_text:
+            if stack:
+                stack[-1][2] = True
+        elif not stack:
+            return None
+        elif el.tag not in _KEEP_EMPTY:
+            stack[-1][3].append(el)
+    return root
+
+
+def _clean_soup(soup: BeautifulSoup) -> BeautifulSoup:
+    tags: List[Tag] = soup.find_all()
+    has_text: Set[int] = set()  # ids stay unique: `tags` keeps every element alive
+    for tag in reversed(tags):
+        if tag.name in _REMOVE:
+            tag.decompose()
+            continue
+        if _soup_has_text(tag, has_text):
+            has_text.add(id(tag))
+        elif tag.name not in _KEEP_EMPTY:
+            tag.decompose()
+    return soup
+
+
+def _soup_has_text(tag: Tag, has_text: Set[int]) -> bool:
+    for child in tag.children:
+        if isinstance(child, Tag):
+            if id(child) in has_text:
+                return True
+        elif type(child) in _TEXT_TYPES and child.strip():
+            return True
+    return False
+
+
+def iter_content(source: Union[str, Any], base_url: str) -> Iterator[Union[str, Link]]:
+    """Yield visible text chunks and Link records in document order.
+
+    `source` is raw (uncleaned) HTML or a tree from parse_html(). TAGS_TO_REMOVE
+    subtrees are skipped instead of removed and empty elements contribute no
+    text, so this matches extracting from clean_html() output. The walk uses an
+    explicit stack, so deeply nested pages cannot hit the recursion limit.
+    """
+    tree = parse_html(source) if isinstance(source, str) else source
+    if isinstance(tree, Tag):
+        walk, strings, root = _walk_soup, _soup_strings, tree.body or tree
+    else:
+        body = tree.find("body") if tree.tag == "html" else None
+        walk, strings, root = _walk_lxml, _lxml_strings, tree if body is None else body
+
+    for item in walk(root):
+        if isinstance(item, str):
+            text = item.strip()
+            if text:
+                yield text
+        else:
+            # Anchor text the way get_text(strip=True) builds it
+            text = "".join(s.strip() for s in strings(item))
+            if text:
+                yield Link(text, urljoin(base_url, item.get("href")))
+
+
+class _ContentTarget:
+    """lxml parser target that produces iter_content()'s items without building a tree.
+
+    Text arriving in several data() calls is joined back into the text node the
+    tree would hold; start/end/comment events end a node. Items outside <body>
+    are held back and used only when the page turns out to have no body.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.items: List[Union[str, Link]] = []
+        self._outside: List[Union[str, Link]] = []
+        self._text: List[str] = []
+        self._depth = 0
+        self._body_depth: Optional[int] = None
+        self._seen_body = False
+        self._removed = 0  # depth inside a TAGS_TO_REMOVE subtree
+        self._anchor: Optional[list] = None  # [href, depth, strings]
+
+    def drain(self) -> List[Union[str, Link]]:
+        items, self.items = self.items, []
+        return items
+
+    def _emit(self, item: Union[str, Link]) -> None:
+        if self._body_depth is not None:
+            self.items.append(item)
+        elif not self._seen_body:
+            self._outside.append(item)
+
+    def _flush(self) -> None:
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if self._removed or not text:
+            return
+        if self._anchor is not None:
+            self._anchor[2].append(text)
+        else:
+            self._emit(text)
+
+    def start(self, tag, attrib) -> None:
+        self._flush()
+        self._depth += 1
+        if self._removed or tag in _REMOVE:
+            self._removed += 1
+        elif tag == "body" and self._depth == 2 and not self._seen_body:
+            self._body_depth, self._seen_body = self._depth, True
+        elif self._anchor is None and _is_anchor(tag, attrib):
+            self._anchor = [attrib.get("href"), self._depth, []]
+
+    def end(self, tag) -> None:
+        self._flush()
+        if self._removed:
+            self._removed -= 1
+        elif self._depth == self._body_depth:
+            self._body_depth = None
+        elif self._anchor is not None and self._depth == self._anchor[1]:
+            href, _, strings = self._anchor
+            self._anchor = None
+            if strings:
+                self._emit(Link("".join(strings), urljoin(self.base_url, href)))
+        self._depth -= 1
+
+    def data(self, text: str) -> None:
+        self._text.append(text)
+
+    def comment(self, text: str) -> None:
+        self._flush()
+
+    def pi(self, target: str, data: str = None) -> None:
+        self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        if not self._seen_body:
+            self.items.extend(self._outside)
+        self._outside = []
+
+
+def iter_content_file(path: PathLike, base_url: str) -> Iterator[Union[str, Link]]:
+    """iter_content() for a page on disk, streamed instead of parsed into a tree.
+
+    The file is fed to lxml in chunks and items are yielded as the parser
+    produces them, so memory stays flat however large the page is. Without lxml
+    this is iter_content(parse_html_file(path)).
+    """
+    if lxml_html is None:
+        yield from iter_content(parse_html_file(path), base_url)
+        return
+    target = _ContentTarget(base_url)
+    parser = etree.HTMLParser(target=target, encoding="utf-8", huge_tree=True)
+    for chunk in iter_bytes(path):
+        parser.feed(chunk)
+        yield from target.drain()
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass  # empty document: nothing to yield
+    yield from target.drain()
+
+
+def extract_content(
+    source: Union[str, Any], base_url: str, out: Optional[TextIO] = None, keep_text: bool = True
+) -> Extraction:
+    """Collect iter_content() into page text and de-duplicated links.
+
+    Anchors appear in the text as "text (href)". When `out` is given, the text
+    is written to it chunk by chunk as the walk proceeds; keep_text=False then
+    skips building it in memory too (Extraction.text is "").
+    """
+    return _collect(iter_content(source, base_url), out, keep_text)
+
+
+def extract_file(path: PathLike, base_url: str, out: Optional[TextIO] = None, keep_text: bool = True) -> Extraction:
+    """extract_content() for a page on disk, streamed through iter_content_file()."""
+    return _collect(iter_content_file(path, base_url), out, keep_text)
+
+
+def _collect(items: Iterator[Union[str, Link]], out: Optional[TextIO], keep_text: bool) -> Extraction:
+    parts: List[str] = []
+    links: List[Link] = []
+    seen: Set[str] = set()
+    keep_text = keep_text or out is None
+    written = False
+
+    for item in items:
+        if isinstance(item, Link):
+            chunk = f"{item.text} ({item.href})"
+            if item.href not in seen:
+                seen.add(item.href)
+                links.append(item)
+        else:
+            chunk = item
+        if out is not None:
+            out.write(f" {chunk}" if written else chunk)
+            written = True
+        if keep_text:
+            parts.append(chunk)
+
+    return Extraction(" ".join(parts), links)
+
+
+def _is_anchor(tag_name: str, attrs) -> bool:
+    return tag_name == "a" and bool(attrs.get("href"))
+
+
+def _walk_lxml(root, stop_at_anchors: bool = True) -> Iterator[Any]:
+    # Yields raw strings and, when stop_at_anchors, anchor elements (not descended into)
+    if root.text:
+        yield root.text
+    stack = [(iter(root), None)]
+    while stack:
+        children, tail = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if tail:
+                yield tail
+            continue
+        if isinstance(child.tag, str) and child.tag not in _REMOVE:
+            if stop_at_anchors and _is_anchor(child.tag, child.attrib):
+                yield child
+            else:
+                if child.text:
+                    yield child.text
+                stack.append((iter(child), child.tail))
+                continue
+        # Comments, removed tags and anchors: only the tail belongs to the parent
+        if child.tail:
+            yield child.tail
+
+
+def _lxml_strings(el) -> Iterator[str]:
+    return _walk_lxml(el, stop_at_anchors=False)
+
+
+def _walk_soup(root: Tag, stop_at_anchors: bool = True) -> Iterator[Any]:
+    stack = [iter(root.children)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+        elif isinstance(child, Tag):
+            if child.name in _REMOVE:
+                continue
+            if stop_at_anchors and _is_anchor(child.name, child.attrs):
+                yield child
+            else:
+                stack.append(iter(child.children))
+        elif type(child) in _TEXT_TYPES:
+            yield child
+
+
+def _soup_strings(node: Tag) -> Iterator[str]:
+    return _walk_soup(node, stop_at_anchors=False)
@@ -0,0 +1,92 @@
+import json
+from typing import Any, List
+
+_decoder = json.JSONDecoder()
+
+
+class JSONArrayStream:
+    """Incremental parser for a JSON array arriving in arbitrary text pieces.
+
+    feed() returns the elements completed by that piece. Anything before the
+    opening "[" (e.g. a ```json fence) is ignored. If the text stops early,
+    every element completed so far has already been returned and `complete`
+    stays False.
+    """
+
+    def __init__(self):
+        self.complete = False
+        self.started = False
+        self.count = 0
+        self._buffer = ""
+        self._pos = 0          # scan position in _buffer
+        self._start = None     # start of the element being scanned
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[Any]:
+        if self.complete or not text:
+            return []
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        i = self._pos
+
+        if not self.started:
+            i = buffer.find("[", i)
+            if i < 0:
+                self._pos = len(buffer)
+                return []
+            self.started = True
+            i += 1
+
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+                if self._start is None:
+                    self._start = i
+            elif ch in "{[":
+                if self._start is None:
+                    self._start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the outer array
+                    self._emit(buffer[self._start:i] if self._start is not None else "", items)
+                    self.complete = True
+                    i += 1
+                    break
+                self._depth -= 1
+            elif ch == "," and self._depth == 0:
+                self._emit(buffer[self._start:i] if self._start is not None else "", items)
+            elif self._start is None and not ch.isspace():
+                # Scalar element (number, true, null...)
+                self._start = i
+            i += 1
+
+        # Drop consumed text so long streams do not grow the buffer
+        cut = self._start if self._start is not None else i
+        self._buffer = buffer[cut:]
+        self._pos = i - cut
+        if self._start is not None:
+            self._start -= cut
+        return items
+
+    def _emit(self, raw: str, items: List[Any]) -> None:
+        self._start = None
+        raw = raw.strip()
+        if not raw:
+            return
+        value, end = _decoder.raw_decode(raw)
+        if raw[end:].strip():
+            raise ValueError(f"unexpected text after array element: {raw[end:end + 40]!r}")
+        items.append(value)
+        self.count += 1
@@ -0,0 +1,116 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+
+LINK_PATTERN = re.compile(r"\((https?://[^\s)]+)\)")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Matches scoring below this cosine similarity are treated as "no link"
+DEFAULT_MIN_SCORE = 0.2
+# Features present in more than this share of links say little and have long postings
+MAX_DOCUMENT_FREQUENCY = 0.5
+# Anchor text is whatever precedes "(href)", back to the previous link, capped
+MAX_ANCHOR_CHARS = 200
+
+
+def features(text: str) -> Counter:
+    # Whole words plus character trigrams of each word, so plurals, typos and
+    # word-order changes still share most features
+    counts: Counter = Counter()
+    for word in WORD_PATTERN.findall(text.lower()):
+        counts[word] += 1
+        if len(word) > 3:
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                counts["#" + padded[i:i + 3]] += 1
+    return counts
+
+
+def url_words(href: str) -> str:
+    # "https://x.gov/news/2024/capital-rule_update.pdf" -> "news 2024 capital rule update pdf"
+    path = unquote(urlparse(href).path)
+    return re.sub(r"[/_\-.+]+", " ", path)
+
+
+def links_from_text(extracted_text: str) -> List[Tuple[str, str]]:
+    """(anchor text, href) pairs from HTMLExtractor output, where anchors read "text (href)"."""
+    links = []
+    previous_end = 0
+    for match in LINK_PATTERN.finditer(extracted_text):
+        anchor = extracted_text[previous_end:match.start()][-MAX_ANCHOR_CHARS:].strip()
+        links.append((anchor, match.group(1)))
+        previous_end = match.end()
+    return links
+
+
+class LinkIndex:
+    """TF-IDF inverted index over a page's links, built once per document.
+
+    Each link is indexed by its anchor text and the words in its URL path;
+    best_match() returns the href whose features are most cosine-similar to
+    the query.
+    """
+
+    def __init__(self, links: Iterable[Tuple[str, str]]):
+        # Repeated hrefs pool their anchor texts
+        texts: Dict[str, List[str]] = {}
+        for text, href in links:
+            texts.setdefault(href, []).append(text)
+        self.hrefs: List[str] = list(texts)
+
+        doc_features = [features(" ".join(texts[href]) + " " + url_words(href)) for href in self.hrefs]
+        document_frequency: Counter = Counter()
+        for counts in doc_features:
+            document_frequency.update(counts.keys())
+
+        total = len(self.hrefs)
+        max_df = max(1, int(total * MAX_DOCUMENT_FREQUENCY)) if total > 2 else total
+        self.idf: Dict[str, float] = {
+            feature: math.log((1 + total) / (1 + df)) + 1
+            for feature, df in document_frequency.items()
+            if df <= max_df
+        }
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = defaultdict(lambda: ([], []))
+        for doc_id, counts in enumerate(doc_features):
+            weights = {f: (1 + math.log(c)) * self.idf[f] for f, c in counts.items() if f in self.idf}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for feature, weight in weights.items():
+                doc_ids, doc_weights = postings[feature]
+                doc_ids.append(doc_id)
+                doc_weights.append(weight / norm)
+        # Arrays let a query score every candidate with one bincount instead of a Python loop
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            feature: (np.array(doc_ids, dtype=np.int32), np.array(doc_weights))
+            for feature, (doc_ids, doc_weights) in postings.items()
+        }
+
+    @classmethod
+    def from_text(cls, extracted_text: str) -> "LinkIndex":
+        return cls(links_from_text(extracted_text))
+
+    def __len__(self) -> int:
+        return len(self.hrefs)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        weights = {f: (1 + math.log(c)) * self.idf[f] for f, c in features(query).items() if f in self.idf}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        if not norm:
+            return []
+        doc_ids = np.concatenate([self.postings[f][0] for f in weights])
+        doc_weights = np.concatenate([self.postings[f][1] * w for f, w in weights.items()])
+        scores = np.bincount(doc_ids, weights=doc_weights, minlength=len(self.hrefs))
+        limit = min(limit, len(scores))
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best])]
+        return [(self.hrefs[doc_id], float(scores[doc_id]) / norm) for doc_id in best if scores[doc_id] > 0]
+
+    def best_match(self, query: str, min_score: float = DEFAULT_MIN_SCORE) -> Optional[str]:
+        results = self.search(query, limit=1)
+        if results and results[0][1] >= min_score:
+            return results[0][0]
+        return None
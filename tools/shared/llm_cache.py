@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from shared import metrics
+
+# Persistent cache of chat completion responses, shared by every OpenAI-calling tool
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "regulatory_outputs/llm_cache.sqlite3"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Eviction needs a table scan, so it only runs every N writes
+EVICT_EVERY_N_PUTS = 50
+
+
+class LLMCache:
+    """Content-addressed response store keyed by model, messages and sampling params.
+
+    Entries expire after `ttl_seconds`; once the stored content exceeds
+    `max_bytes`, least recently used entries are evicted first.
+    """
+
+    def __init__(self, path: Path = LLM_CACHE_PATH, ttl_seconds: float = LLM_CACHE_TTL_SECONDS, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(request: Dict[str, Any]) -> str:
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, len(content.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self._puts += 1
+            if self._puts % EVICT_EVERY_N_PUTS == 0:
+                self._evict(now)
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            stale = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+                stale.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide cache, or None when LLM_CACHE_ENABLED=0."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+Validator = Callable[[str], bool]
+
+
+def _lookup(cache: Optional[LLMCache], key: Optional[str], request: Dict[str, Any], validate: Optional[Validator]) -> Optional[str]:
+    if cache is None:
+        return None
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    if validate is not None and not validate(cached):
+        # Stored before the caller validated its answers; ask again
+        cache.forget(key)
+        return None
+    metrics.record_llm_response(request.get("model", ""), cached=True)
+    return cached
+
+
+def _store(cache: Optional[LLMCache], key: Optional[str], request: Dict[str, Any], response, validate: Optional[Validator]) -> Optional[str]:
+    choice = response.choices[0]
+    content = choice.message.content
+    # Cut-off answers (finish_reason "length") and answers the caller cannot use are not replayed
+    if cache is not None and content is not None and choice.finish_reason == "stop":
+        if validate is None or validate(content):
+            cache.put(key, request.get("model", ""), content)
+    return content
+
+
+def cached_completion(
+    create: Callable[..., Any], bypass_cache: bool = False, validate: Optional[Validator] = None, **request
+) -> str:
+    """Return the completion text for `request`, calling `create(**request)` on a miss.
+
+    `create` is e.g. `get_gateway().complete`. bypass_cache skips the
+    lookup but still stores the fresh answer. Only answers that finished
+    normally, and that `validate(content)` accepts when given, are stored.
+    """
+    cache = get_llm_cache()
+    key = LLMCache.key(request) if cache is not None else None
+    cached = None if bypass_cache else _lookup(cache, key, request, validate)
+    if cached is not None:
+        return cached
+    with metrics.span("llm"):
+        response = create(**request)
+    return _store(cache, key, request, response, validate)
+
+
+async def acached_completion(
+    create: Callable[..., Awaitable[Any]], bypass_cache: bool = False, validate: Optional[Validator] = None, **request
+) -> str:
+    """Async variant of cached_completion()."""
+    cache = get_llm_cache()
+    key = LLMCache.key(request) if cache is not None else None
+    cached = None if bypass_cache else _lookup(cache, key, request, validate)
+    if cached is not None:
+        return cached
+    with metrics.span("llm"):
+        response = await create(**request)
+    return _store(cache, key, request, response, validate)
+
+
+def stream_completion(create: Callable[..., Any], bypass_cache: bool = False, **request) -> Iterator[str]:
+    """Yield the completion text for `request` piece by piece.
+
+    A cache hit yields the stored text in one piece. On a miss the request is
+    sent with stream=True; the text is stored only if the answer finished
+    normally, so truncated output is never replayed from the cache.
+    """
+    cache = get_llm_cache()
+    key = LLMCache.key(request) if cache is not None else None
+    if cache is not None and not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.record_llm_response(request.get("model", ""), cached=True)
+            yield cached
+            return
+    pieces = []
+    finish_reason = None
+    # Spans the whole stream, including time the caller spends between pieces
+    with metrics.span("llm"):
+        for event in create(stream=True, **request):
+            if not event.choices:
+                continue
+            choice = event.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if choice.delta and choice.delta.content:
+                pieces.append(choice.delta.content)
+                yield choice.delta.content
+    if cache is not None and finish_reason == "stop":
+        cache.put(key, request.get("model", ""), "".join(pieces))
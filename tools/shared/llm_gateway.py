@@ -0,0 +1,264 @@
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Dict, Iterator, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from shared import metrics
+from shared.rate_limit import RateLimiter, estimate_tokens, with_retries
+
+# Every LLM tool reads its settings from here, by default the repo's .env
+# (OPENAI_BASE_URL may point at fake_openai_server.py for testing)
+load_dotenv(os.getenv("LLM_ENV_FILE", str(Path(__file__).resolve().parents[2] / ".env")))
+
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or os.getenv("OPENAI_BASE_URL") or None
+LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+# Connection pool shared by all tools; kept-alive connections skip the TLS handshake
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+# Limits across every tool in the process (the EXCLUSION_* names are still honoured)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_RPM = float(os.getenv("LLM_RPM", os.getenv("EXCLUSION_RPM", "500")))
+LLM_TPM = float(os.getenv("LLM_TPM", os.getenv("EXCLUSION_TPM", "200000")))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", os.getenv("EXCLUSION_MAX_RETRIES", "5")))
+# Budgeted against the TPM limit for calls that set no max_tokens
+DEFAULT_RESPONSE_TOKENS = 500
+
+_DONE = object()
+
+
+class _StreamError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class LLMGateway:
+    """One AsyncOpenAI client, connection pool and set of limits shared by every LLM tool.
+
+    httpx connections belong to the event loop that opened them, so the client
+    lives on a private loop on a background thread (as in BrowserPool). Sync
+    callers, async callers on any other loop and streaming callers are all
+    bridged onto it, so the concurrency cap, the RPM/TPM limiter and usage
+    accounting apply across tools.
+
+    Pass `transport` (e.g. httpx.ASGITransport(app=fake_openai_server.app)) to
+    run against an in-process fake backend; set_gateway() swaps it in.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = LLM_BASE_URL,
+        api_key: Optional[str] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: float = LLM_RPM,
+        tokens_per_minute: float = LLM_TPM,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self.transport = transport
+
+        self._lock = threading.Lock()
+        self._usage_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[AsyncOpenAI] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._limiter: Optional[RateLimiter] = None
+        self.in_flight = 0
+        self._usage: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    # ---- lifecycle -------------------------------------------------------
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.started:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run_loop, args=(loop,), name="llm-gateway", daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._startup(), loop).result()
+            self._loop, self._thread = loop, thread
+
+    def close(self) -> None:
+        with self._lock:
+            if not self.started:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.close(), loop).result(timeout=30)
+            except Exception as e:
+                print(f"⚠️ LLMGateway shutdown error: {e}", flush=True)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=30)
+            self._loop = self._thread = self._client = None
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+        loop.close()
+
+    async def _startup(self) -> None:
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        http_client = httpx.AsyncClient(transport=self.transport, limits=limits, timeout=self.timeout)
+        # Retries are ours (jittered, Retry-After aware), so the SDK's are off
+        self._client = AsyncOpenAI(
+            api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=self.base_url,
+            max_retries=0,
+            http_client=http_client,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._limiter = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+
+    def _submit(self, coro: Awaitable[Any]):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("LLMGateway cannot be called from its own event loop")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # ---- requests --------------------------------------------------------
+
+    def _budget(self, request: Dict[str, Any], expected_tokens: Optional[int]) -> int:
+        prompt = "".join(str(m.get("content", "")) for m in request.get("messages", []))
+        return estimate_tokens(prompt) + (expected_tokens or request.get("max_tokens") or DEFAULT_RESPONSE_TOKENS)
+
+    async def _create(self, request: Dict[str, Any], budget: int) -> Any:
+        # Each attempt, retries included, spends rate-limit budget
+        async def call():
+            await self._limiter.acquire(budget)
+            return await self._client.chat.completions.create(**request)
+
+        return await with_retries(call, max_retries=self.max_retries)
+
+    async def _complete(self, request: Dict[str, Any], budget: int, tool: str) -> Any:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                response = await self._create(request, budget)
+            finally:
+                self.in_flight -= 1
+        self._account(tool, request.get("model", ""), getattr(response, "usage", None))
+        return response
+
+    def complete(self, expected_tokens: Optional[int] = None, **request) -> Any:
+        """chat.completions.create(**request) through the shared client and limits (blocking)."""
+        self.start()
+        request.setdefault("model", LLM_DEFAULT_MODEL)
+        return self._submit(self._complete(request, self._budget(request, expected_tokens), metrics.current_tool.get())).result()
+
+    async def acomplete(self, expected_tokens: Optional[int] = None, **request) -> Any:
+        """Async variant of complete() for callers on any event loop."""
+        if not self.started:
+            await asyncio.to_thread(self.start)
+        request.setdefault("model", LLM_DEFAULT_MODEL)
+        coro = self._complete(request, self._budget(request, expected_tokens), metrics.current_tool.get())
+        return await asyncio.wrap_future(self._submit(coro))
+
+    async def _pump(self, request: Dict[str, Any], budget: int, tool: str, events: queue.Queue) -> None:
+        usage = None
+        stream = None
+        try:
+            async with self._semaphore:
+                self.in_flight += 1
+                try:
+                    stream = await self._create(request, budget)
+                    async with stream:
+                        async for event in stream:
+                            usage = getattr(event, "usage", None) or usage
+                            events.put(event)
+                finally:
+                    self.in_flight -= 1
+        except BaseException as e:
+            events.put(_StreamError(e))
+            raise
+        finally:
+            if stream is not None:
+                self._account(tool, request.get("model", ""), usage)
+            events.put(_DONE)
+
+    def stream(self, expected_tokens: Optional[int] = None, **request) -> Iterator[Any]:
+        """Yield chat completion chunks for `request` (sent with stream=True) as they arrive."""
+        self.start()
+        request = {"model": LLM_DEFAULT_MODEL, **request, "stream": True}
+        # Streams report usage only when asked, in a last chunk without choices
+        request.setdefault("stream_options", {"include_usage": True})
+        events: queue.Queue = queue.Queue()
+        future = self._submit(self._pump(request, self._budget(request, expected_tokens), metrics.current_tool.get(), events))
+        try:
+            while True:
+                event = events.get()
+                if event is _DONE:
+                    break
+                if isinstance(event, _StreamError):
+                    raise event.error
+                yield event
+        finally:
+            # Caller stopped early: cancel the request so its connection and slot are freed
+            future.cancel()
+
+    # ---- accounting ------------------------------------------------------
+
+    def _account(self, tool: str, model: str, usage: Optional[Any]) -> None:
+        metrics.record_llm_response(model, usage, tool=tool)
+        with self._usage_lock:
+            totals = self._usage.setdefault(tool or "-", {}).setdefault(
+                model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            )
+            totals["requests"] += 1
+            if usage is not None:
+                totals["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                totals["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def usage(self) -> Dict[str, Any]:
+        """API requests and token usage per tool and model since startup (cache hits excluded)."""
+        with self._usage_lock:
+            by_tool = {tool: {model: dict(t) for model, t in models.items()} for tool, models in self._usage.items()}
+        totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        for models in by_tool.values():
+            for t in models.values():
+                for key in totals:
+                    totals[key] += t[key]
+        return {**totals, "in_flight": self.in_flight, "by_tool": by_tool}
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway shared by every LLM tool; the client is created on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+            atexit.register(_gateway.close)
+        return _gateway
+
+
+def set_gateway(gateway: LLMGateway) -> Optional[LLMGateway]:
+    """Replace the process-wide gateway (e.g. with a fake backend); returns the previous one."""
+    global _gateway
+    with _gateway_lock:
+        previous, _gateway = _gateway, gateway
+        atexit.register(gateway.close)
+    return previous
@@ -0,0 +1,206 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Tool call, span and LLM token metrics in the Prometheus text format (served at
+# /metrics). MCP_METRICS=0 turns every recording call into a no-op.
+METRICS_ENABLED = os.getenv("MCP_METRICS", "1") != "0"
+# Also print one JSON object per tool call, span and LLM response, for log shippers
+JSON_LOGS = os.getenv("MCP_JSON_LOGS", "0") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Tool whose call is running in this context; spans are labelled with it
+current_tool: contextvars.ContextVar[str] = contextvars.ContextVar("current_tool", default="")
+
+_metrics: List["_Metric"] = []
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = [*zip(self.labelnames, key), *extra]
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}" if pairs else ""
+
+    def _snapshot(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def _samples(self, items) -> List[str]:
+        return [f"{self.name}{self._labels(key)} {_format(value)}" for key, value in items]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples(self._snapshot())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (not cumulative), sum, count
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _snapshot(self):
+        with self._lock:
+            return [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+
+    def _samples(self, items) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _format(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+TOOL_CALLS = Counter("mcp_tool_calls_total", "Tool calls finished, successful or not", ["tool"])
+TOOL_ERRORS = Counter("mcp_tool_errors_total", "Tool calls that raised, by exception type", ["tool", "error"])
+TOOL_REJECTED = Counter("mcp_tool_rejected_total", "Tool calls rejected because the tool's queue was full", ["tool"])
+TOOL_LATENCY = Histogram("mcp_tool_latency_seconds", "Tool call duration, excluding time queued", ["tool"])
+TOOL_IN_FLIGHT = Gauge("mcp_tool_in_flight", "Tool calls currently running", ["tool"])
+TOOL_QUEUED = Gauge("mcp_tool_queued", "Tool calls waiting for a concurrency slot", ["tool"])
+SPAN_LATENCY = Histogram("mcp_span_seconds", "Duration of steps inside tools (fetch, parse, llm, write, ...)", ["tool", "span"])
+LLM_REQUESTS = Counter("mcp_llm_requests_total", "Chat completions answered, by source (api or cache)", ["model", "source"])
+LLM_TOKENS = Counter("mcp_llm_tokens_total", "OpenAI token usage reported in response.usage", ["model", "kind"])
+JOBS_FINISHED = Counter("mcp_jobs_finished_total", "Background jobs finished, by final status", ["tool", "status"])
+JOB_WAIT = Histogram("mcp_job_wait_seconds", "Time background jobs spent queued before a worker took them", ["tool"])
+
+
+def log_event(event: str, **fields) -> None:
+    if JSON_LOGS:
+        print(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str), flush=True)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        tool = current_tool.get()
+        SPAN_LATENCY.observe(seconds, tool=tool, span=self.name)
+        log_event("span", tool=tool, span=self.name, seconds=round(seconds, 4), error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def span(name: str):
+    """Time a step inside a tool: `with span("fetch"): ...` (works in async code too)."""
+    if not (METRICS_ENABLED or JSON_LOGS):
+        return _NO_SPAN
+    return _Span(name)
+
+
+class tool_call:
+    """Counts, times and labels one tool call; spans inside it are attributed to `tool`."""
+
+    __slots__ = ("tool", "start", "token")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+
+    def __enter__(self):
+        self.token = current_tool.set(self.tool)
+        TOOL_IN_FLIGHT.inc(tool=self.tool)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        TOOL_IN_FLIGHT.dec(tool=self.tool)
+        TOOL_LATENCY.observe(seconds, tool=self.tool)
+        TOOL_CALLS.inc(tool=self.tool)
+        if exc_type is not None:
+            TOOL_ERRORS.inc(tool=self.tool, error=exc_type.__name__)
+        current_tool.reset(self.token)
+        log_event("tool_call", tool=self.tool, seconds=round(seconds, 4), error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+def record_llm_response(model: str, usage: Optional[Any] = None, cached: bool = False, tool: Optional[str] = None) -> None:
+    LLM_REQUESTS.inc(model=model, source="cache" if cached else "api")
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion, model=model, kind="completion")
+    tool = current_tool.get() if tool is None else tool
+    log_event("llm_usage", tool=tool, model=model, prompt_tokens=prompt, completion_tokens=completion)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from playwright.async_api import Page
+
+from shared.browser_pool import get_browser_pool
+from shared.metrics import span
+
+# "chromium" renders through the shared browser pool (no process start per PDF);
+# "wkhtmltopdf" keeps the old pdfkit output for anyone who depends on it
+PDF_BACKEND = os.getenv("PDF_BACKEND", "chromium")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+PDF_PAGE_FORMAT = os.getenv("PDF_PAGE_FORMAT", "A4")
+
+# Searched in order when WKHTMLTOPDF_PATH is not set and wkhtmltopdf is not on PATH
+WKHTMLTOPDF_CANDIDATES = [
+    r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe",
+    "/usr/local/bin/wkhtmltopdf",
+    "/usr/bin/wkhtmltopdf",
+]
+
+
+class ChromiumRenderer:
+    """Prints HTML files to PDF with page.pdf() on the shared, already-running browser pool."""
+
+    name = "chromium"
+
+    def __init__(self, page_format: str = PDF_PAGE_FORMAT):
+        self.page_format = page_format
+
+    async def _print(self, page: Page, source: Path, target: Path) -> None:
+        # Loading by file URI lets relative images and stylesheets resolve
+        await page.goto(source.resolve().as_uri(), wait_until="load")
+        await page.emulate_media(media="print")
+        await page.pdf(path=str(target), format=self.page_format, print_background=True)
+
+    async def arender(self, source: Path, target: Path) -> None:
+        await get_browser_pool().arun(lambda page: self._print(page, source, target))
+
+    def render(self, source: Path, target: Path) -> None:
+        get_browser_pool().run(lambda page: self._print(page, source, target))
+
+
+class WkhtmltopdfRenderer:
+    """pdfkit/wkhtmltopdf, one process per PDF."""
+
+    name = "wkhtmltopdf"
+
+    def __init__(self, executable: Optional[str] = None):
+        import pdfkit
+
+        executable = executable or find_wkhtmltopdf()
+        if executable is None:
+            raise FileNotFoundError(
+                "wkhtmltopdf not found; set WKHTMLTOPDF_PATH or install it on PATH "
+                f"(also searched {WKHTMLTOPDF_CANDIDATES})"
+            )
+        self._pdfkit = pdfkit
+        self.config = pdfkit.configuration(wkhtmltopdf=executable)
+        self.options = {
+            'encoding': 'UTF-8',
+            'enable-local-file-access': ''
+        }
+
+    def render(self, source: Path, target: Path) -> None:
+        self._pdfkit.from_file(str(source), str(target), configuration=self.config, options=self.options)
+
+    async def arender(self, source: Path, target: Path) -> None:
+        await asyncio.to_thread(self.render, source, target)
+
+
+def find_wkhtmltopdf() -> Optional[str]:
+    configured = os.getenv("WKHTMLTOPDF_PATH")
+    if configured:
+        return configured
+    on_path = shutil.which("wkhtmltopdf")
+    if on_path:
+        return on_path
+    return next((candidate for candidate in WKHTMLTOPDF_CANDIDATES if Path(candidate).exists()), None)
+
+
+RENDERERS: Dict[str, Type] = {
+    ChromiumRenderer.name: ChromiumRenderer,
+    WkhtmltopdfRenderer.name: WkhtmltopdfRenderer,
+}
+
+_renderers: Dict[str, Any] = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(backend: Optional[str] = None):
+    backend = backend or PDF_BACKEND
+    if backend not in RENDERERS:
+        raise ValueError(f"Unknown PDF backend '{backend}'; choose from {sorted(RENDERERS)}")
+    with _renderers_lock:
+        if backend not in _renderers:
+            _renderers[backend] = RENDERERS[backend]()
+        return _renderers[backend]
+
+
+async def render_many(
+    jobs: List[Tuple[Path, Path]], workers: int = PDF_WORKERS, backend: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Render (source, target) pairs concurrently, at most `workers` at a time.
+
+    One failed document does not stop the batch; results come back in job order.
+    """
+    renderer = get_renderer(backend)
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async def render_one(source: Path, target: Path) -> Dict[str, Any]:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if not source.exists():
+                    raise FileNotFoundError(f"HTML file not found: {source}")
+                with span("render"):
+                    await renderer.arender(source, target)
+                return {"source": str(source), "pdf_file": str(target), "seconds": round(time.perf_counter() - start, 3)}
+            except Exception as e:
+                return {"source": str(source), "pdf_file": None, "error": f"{type(e).__name__}: {e}"}
+
+    return await asyncio.gather(*(render_one(Path(source), Path(target)) for source, target in jobs))
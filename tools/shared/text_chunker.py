@@ -0,0 +1,73 @@
+import re
+from typing import List
+
+from shared.rate_limit import estimate_tokens
+
+# Boundaries tried in order, coarsest first. Extracted page text is mostly one
+# line, so after paragraphs/lines the useful boundary is the end of an anchor
+# ("text (https://...)"), which usually closes one news item.
+SEPARATORS = [
+    re.compile(r"\n\s*\n"),
+    re.compile(r"\n"),
+    re.compile(r"\(https?://[^\s)]+\)\s*"),
+    re.compile(r"[.!?]\s+"),
+    re.compile(r"\s+"),
+]
+
+
+def _split_with(text: str, separator: re.Pattern) -> List[str]:
+    # Keep each separator attached to the piece before it so pieces re-join losslessly
+    pieces, start = [], 0
+    for match in separator.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    pieces.append(text[start:])
+    return [piece for piece in pieces if piece]
+
+
+def _units(text: str, max_tokens: int, level: int = 0) -> List[str]:
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    if level >= len(SEPARATORS):
+        # No boundary left: hard cut (a single "word" longer than a chunk)
+        size = max_tokens * 4
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    units = []
+    for piece in _split_with(text, SEPARATORS[level]):
+        units.extend(_units(piece, max_tokens, level + 1))
+    return units
+
+
+def split_into_chunks(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """Split text into chunks of at most ~max_tokens on structural boundaries.
+
+    Each chunk after the first starts with the trailing units of the previous
+    one (up to overlap_tokens) so items cut at a boundary appear whole in at
+    least one chunk.
+    """
+    if not text.strip():
+        return []
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for unit in _units(text, max_tokens):
+        cost = estimate_tokens(unit)
+        if current and used + cost > max_tokens:
+            chunks.append("".join(current).strip())
+            # Carry the tail of the finished chunk into the next one
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                if carried_tokens + previous_tokens > overlap_tokens or carried_tokens + previous_tokens + cost > max_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            current, used = carried, carried_tokens
+        current.append(unit)
+        used += cost
+    if current:
+        chunks.append("".join(current).strip())
+    return chunks
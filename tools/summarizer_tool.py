@@ -2,20 +2,11 @@
 
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from pathlib import Path
-from urllib.parse import urlparse
 from typing import Dict, Type
-from datetime import datetime
-from dotenv import load_dotenv
-from openai import OpenAI
-import os
-
-# Load environment variables
-load_dotenv("C:/Users/hp/Documents/Agent Router Tools/.env")
-
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from shared.artifact_store import get_artifact_store
+from shared.llm_cache import cached_completion
+from shared.llm_gateway import get_gateway
+from shared.metrics import span
 
 # Input schema
 class SummarizerInput(BaseModel):
@@ -23,6 +14,7 @@ class SummarizerInput(BaseModel):
     extracted_text: str | None = Field(None, description="Alternative to 'text' if provided by extractor")
     source_url: str | None = Field(None, description="The original source URL of the content")
     url: str | None = Field(None, description="Alternative to 'source_url'")
+    bypass_cache: bool = Field(False, description="Skip the LLM response cache (the fresh answer is still stored)")
 
 # Tool class
 class SummarizerTool(BaseTool):
@@ -30,7 +22,7 @@ class SummarizerTool(BaseTool):
     description: str = "Summarizes regulatory text with compliance-specific focus for large banks like Wells Fargo"
     args_schema: Type[BaseModel] = SummarizerInput
 
-    def _run(self, text: str = None, extracted_text: str = None, source_url: str = None, url: str = None) -> Dict:
+    def _run(self, text: str = None, extracted_text: str = None, source_url: str = None, url: str = None, bypass_cache: bool = False) -> Dict:
         # Handle flexible input variants
         if text and source_url:
             content = text
@@ -58,27 +50,24 @@ Content:
 """
 
         # Run OpenAI call
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
+        summary = cached_completion(
+            get_gateway().complete,
+            bypass_cache=bypass_cache,
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
-        )
-        summary = response.choices[0].message.content.strip()
+        ).strip()
 
         # Save summary to file
-        domain = urlparse(final_url).netloc.replace(".", "_")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        summary_file = OUTPUT_DIR / f"{domain}_summary_{timestamp}.txt"
-        with open(summary_file, "w", encoding="utf-8") as f:
-            f.write(summary)
+        with span("write"):
+            handle = get_artifact_store().put_text(summary, ".txt", "summary", final_url)
 
-        print(f"✅ Saved summary to: {summary_file}")
+        print(f"✅ Saved summary to: {handle.path}")
 
         return {
             "source_url": final_url,
             "summary": summary,
-            "summary_file": str(summary_file)
+            "summary_file": handle.path
         }
 
 # Tool instance (needed for MCP server discovery)